@@ -1,8 +1,8 @@
 import os
-from flask import Flask, render_template
+from flask import Flask, render_template, flash, redirect, request, url_for
 from flask_wtf.csrf import CSRFProtect
 from flask_login import LoginManager
-from app.extensions import db, mail, migrate
+from app.extensions import db, mail, migrate, cache, auditoria, renderizador_pdf, fila_jobs, cache_usuarios
 from config import get_config   # ✅ importa a função que decide o ambiente
 import pytz                     # 🔹 adicionado para timezone
 
@@ -19,8 +19,14 @@ def create_app(config_class=None):
     # -----------------------------
     db.init_app(app)
     mail.init_app(app)
-    migrate.init_app(app, db)
+    from utils.migracoes import incluir_no_autogenerate
+    migrate.init_app(app, db, include_object=incluir_no_autogenerate)
     csrf.init_app(app)
+    cache.init_app(app)
+    auditoria.init_app(app)
+    renderizador_pdf.init_app(app)
+    fila_jobs.init_app(app)
+    cache_usuarios.init_app(app)
 
     # -----------------------------
     # 👤 Configuração do LoginManager
@@ -32,10 +38,10 @@ def create_app(config_class=None):
     login_manager.init_app(app)
 
     # 🔹 Função para carregar usuário pelo ID (necessário para Flask-Login)
-    from app.models import User
+    # cache curto por processo: sem consulta ao banco na maioria das requisições
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return cache_usuarios.carregar(user_id)
 
     # -----------------------------
     # 📌 Importa e registra os Blueprints
@@ -49,6 +55,7 @@ def create_app(config_class=None):
     from app.routes.configuracoes import config_bp
     from app.routes.perfil.perfil import perfil_bp
     from app.routes.documentos import documentos_bp
+    from app.routes.jobs import jobs_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
@@ -59,6 +66,16 @@ def create_app(config_class=None):
     app.register_blueprint(config_bp)
     app.register_blueprint(perfil_bp)
     app.register_blueprint(documentos_bp)
+    app.register_blueprint(jobs_bp)
+
+    # -----------------------------
+    # 📊 Rollups do dashboard e comandos CLI
+    # -----------------------------
+    import utils.estatisticas  # noqa: F401  (registra os eventos que mantêm os rollups)
+    import utils.busca  # noqa: F401  (mantém o índice de busca de membros)
+    import utils.tarefas  # noqa: F401  (registra as tarefas da fila de jobs)
+    from app.cli import register_commands
+    register_commands(app)
     
     # -----------------------------
     # 📅 Context processor para ano atual e timezone
@@ -88,6 +105,12 @@ def create_app(config_class=None):
         tz = pytz.timezone(tz_name)
         return dt.astimezone(tz)
 
+    # -----------------------------
+    # 🖼️ Filtro Jinja para escolher a variante reduzida da foto (avatar, cartao, impressao)
+    # -----------------------------
+    from utils.imagens import foto_variante
+    app.add_template_filter(foto_variante, 'foto_variante')
+
     # -----------------------------
     # ⚠️ Handlers globais de erro
     # -----------------------------
@@ -103,4 +126,12 @@ def create_app(config_class=None):
     def internal_error(e):
         return render_template("errors/500.html"), 500
 
+    # PDF que estourou PDF_TIMEOUT: volta para a página de origem com o aviso
+    from utils.pdf import ErroPDF
+
+    @app.errorhandler(ErroPDF)
+    def pdf_indisponivel(e):
+        flash(str(e), "danger")
+        return redirect(request.referrer or url_for("dashboard.dashboard"))
+
     return app
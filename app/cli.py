@@ -0,0 +1,385 @@
+import os
+
+import click
+from flask.cli import AppGroup
+
+# -----------------------------
+# 📊 flask estatisticas ...
+# -----------------------------
+estatisticas_cli = AppGroup("estatisticas", help="Rollups mensais usados pelo dashboard.")
+
+
+@estatisticas_cli.command("reconstruir")
+def reconstruir_estatisticas_cmd():
+    """Recalcula member_stats_monthly e financeiro_stats_monthly do zero."""
+    from utils.estatisticas import reconstruir_estatisticas
+
+    meses_members, linhas_financeiro = reconstruir_estatisticas()
+    click.echo(f"✅ Rollups reconstruídos: {meses_members} mês(es) de membros, "
+               f"{linhas_financeiro} linha(s) do financeiro.")
+
+
+@estatisticas_cli.command("verificar")
+def verificar_estatisticas_cmd():
+    """Compara os rollups com os agregados calculados direto das tabelas."""
+    from utils.estatisticas import verificar_estatisticas
+
+    divergencias = verificar_estatisticas()
+    if not divergencias:
+        click.echo("✅ Rollups consistentes com os dados atuais.")
+        return
+
+    for tabela, chave, campo, rollup, ao_vivo in divergencias:
+        click.echo(f"⚠️ {tabela} {chave} {campo}: rollup={rollup} ao_vivo={ao_vivo}")
+    click.echo(f"{len(divergencias)} divergência(s). Rode `flask estatisticas reconstruir`.")
+    raise SystemExit(1)
+
+
+# -----------------------------
+# 🔎 flask indices ...
+# -----------------------------
+indices_cli = AppGroup("indices", help="Diagnóstico de índices do banco.")
+
+
+@indices_cli.command("verificar")
+@click.option("--plano", is_flag=True, help="Mostra o plano completo de cada consulta.")
+def verificar_indices_cmd(plano):
+    """Roda EXPLAIN nas consultas principais e aponta varreduras completas."""
+    from utils.indices import analisar_indices
+
+    total_completas = 0
+    for blueprint, descricao, linhas_plano, completas in analisar_indices():
+        marcador = "⚠️" if completas else "✅"
+        click.echo(f"{marcador} [{blueprint}] {descricao}")
+        for varredura in completas:
+            click.echo(f"     varredura completa: {varredura}")
+        if plano:
+            for linha in linhas_plano:
+                click.echo(f"     {linha}")
+        total_completas += len(completas)
+
+    if total_completas:
+        click.echo(f"{total_completas} varredura(s) completa(s). "
+                   "Confira se as migrations de índices foram aplicadas (`flask db upgrade`).")
+    else:
+        click.echo("✅ Nenhuma varredura completa encontrada.")
+
+
+# -----------------------------
+# 📝 flask logs ...
+# -----------------------------
+logs_cli = AppGroup("logs", help="Partições e retenção dos logs de auditoria.")
+
+
+@logs_cli.command("particionar")
+@click.option("--meses-futuros", default=2, show_default=True, help="Meses à frente a criar.")
+def particionar_logs_cmd(meses_futuros):
+    """Converte a tabela de logs em partições mensais e cria os próximos meses."""
+    from utils.logs import particionar_logs
+
+    meses = particionar_logs(meses_futuros)
+    if meses is None:
+        click.echo("⚠️ Particionamento disponível apenas para MySQL/MariaDB e SQLite; "
+                   "`flask logs purgar` usará remoção em lotes.")
+        return
+    click.echo(f"✅ {len(meses)} partição(ões) mensal(is): "
+               f"{meses[0]:%m/%Y} a {meses[-1]:%m/%Y}.")
+
+
+@logs_cli.command("purgar")
+@click.option("--dias", type=int, default=None, help="Retenção em dias (padrão: LOG_RETENCAO_DIAS).")
+def purgar_logs_cmd(dias):
+    """Remove os logs fora da retenção (descartando meses inteiros quando particionado)."""
+    from utils.logs import particionar_logs, purgar_logs
+
+    meses, linhas = purgar_logs(dias)
+    if linhas is None:
+        particionar_logs()   # garante as partições dos próximos meses
+        click.echo(f"✅ {len(meses)} mês(es) removido(s){': ' + ', '.join(meses) if meses else ''}.")
+    else:
+        click.echo(f"✅ {linhas} log(s) removido(s).")
+
+
+@logs_cli.command("verificar")
+def verificar_logs_cmd():
+    """Confere se os ids dos logs são únicos entre todos os meses."""
+    from utils.logs import ids_repetidos_logs
+
+    repetidos = ids_repetidos_logs()
+    if not repetidos:
+        click.echo("✅ Ids dos logs únicos em todos os meses.")
+        return
+    for id_log, quantidade in repetidos:
+        click.echo(f"❌ id {id_log} usado {quantidade} vezes")
+    raise SystemExit(1)
+
+
+# -----------------------------
+# 🔍 flask busca ...
+# -----------------------------
+busca_cli = AppGroup("busca", help="Índice de busca textual.")
+
+
+@busca_cli.command("reconstruir")
+def reconstruir_busca_cmd():
+    """Cria os índices textuais (membros e documentos) e os repopula."""
+    from utils.busca import reconstruir_indice_documentos, reconstruir_indice_membros
+
+    membros = reconstruir_indice_membros()
+    if membros is None:
+        click.echo("⚠️ Busca textual disponível apenas para MySQL/MariaDB e SQLite; usando ILIKE.")
+        return
+    documentos = reconstruir_indice_documentos()
+    click.echo(f"✅ Índices de busca reconstruídos: {membros} membro(s), {documentos} documento(s).")
+
+
+# -----------------------------
+# ⏳ flask jobs ...
+# -----------------------------
+jobs_cli = AppGroup("jobs", help="Fila de tarefas em segundo plano.")
+
+
+@jobs_cli.command("worker")
+@click.option("--threads", type=int, default=None, help="Tarefas simultâneas (padrão: JOBS_THREADS).")
+@click.option("--uma-vez", is_flag=True, help="Executa o que estiver na fila e termina.")
+def worker_jobs_cmd(threads, uma_vez):
+    """Executa as tarefas da fila (lembretes, backups, PDFs em lote)."""
+    from app.extensions import fila_jobs
+
+    if uma_vez:
+        fila_jobs.recuperar_abandonados()
+        total = 0
+        while fila_jobs.executar_proximo() is not None:
+            total += 1
+        click.echo(f"✅ {total} tarefa(s) executada(s).")
+        return
+
+    click.echo(f"⏳ Worker iniciado com {threads or fila_jobs.threads} thread(s). Ctrl+C para parar.")
+    fila_jobs.iniciar(threads)
+    fila_jobs.aguardar()
+
+
+@jobs_cli.command("status")
+def status_jobs_cmd():
+    """Resumo da fila por situação."""
+    from sqlalchemy import func
+    from app.extensions import db
+    from app.models import Job
+
+    contagem = dict(db.session.query(Job.situacao, func.count(Job.id)).group_by(Job.situacao).all())
+    for situacao in (Job.PENDENTE, Job.EXECUTANDO, Job.CONCLUIDO, Job.FALHOU):
+        click.echo(f"{situacao:>11}: {contagem.get(situacao, 0)}")
+
+
+@jobs_cli.command("limpar")
+@click.option("--dias", type=int, default=None, help="Retenção em dias (padrão: JOBS_RETENCAO_DIAS).")
+def limpar_jobs_cmd(dias):
+    """Apaga tarefas finalizadas antigas e seus arquivos."""
+    from app.extensions import fila_jobs
+
+    click.echo(f"✅ {fila_jobs.limpar(dias)} tarefa(s) removida(s).")
+
+
+# -----------------------------
+# 👥 flask membros ...
+# -----------------------------
+membros_cli = AppGroup("membros", help="Manutenção do cadastro de membros.")
+
+
+@membros_cli.command("aniversarios")
+def preencher_aniversarios_cmd():
+    """Preenche mes_nascimento/dia_nascimento a partir de data_nascimento (registros antigos)."""
+    from utils.aniversarios import preencher_aniversarios
+
+    click.echo(f"✅ {preencher_aniversarios()} membro(s) atualizado(s).")
+
+
+# -----------------------------
+# 🔗 flask links ...
+# -----------------------------
+links_cli = AppGroup("links", help="Links públicos (cadastro de visitantes).")
+
+
+@links_cli.command("visitante")
+@click.option("--rotacionar", is_flag=True, help="Desativa o link atual e gera um novo.")
+def link_visitante_cmd(rotacionar):
+    """Cria (uma vez) o link de cadastro de visitantes e mostra o hash."""
+    from utils.links_publicos import garantir_link, rotacionar_link
+
+    if rotacionar:
+        click.echo(f"✅ Novo link de visitante: {rotacionar_link('visitante')}")
+        return
+    hash_link, criado = garantir_link("visitante")
+    click.echo(f"{'✅ Link criado' if criado else 'Link ativo'}: {hash_link}")
+
+
+# -----------------------------
+# 💾 flask backup ...
+# -----------------------------
+backup_cli = AppGroup("backup", help="Backups incrementais e agendados (banco + uploads) em BACKUP_DIR.")
+
+
+@backup_cli.command("incremental")
+@click.option("--compressao", default="deflate", show_default=True, help="deflate, bzip2 ou xz.")
+def backup_incremental_cmd(compressao):
+    """Cria um snapshot: dump do banco + uploads novos/alterados desde o anterior."""
+    from flask import current_app
+    from app.extensions import db
+    from utils.backup import ErroBackup
+    from utils.backup_incremental import gerar_incremental, pasta_repositorio, travar
+
+    repositorio = pasta_repositorio(current_app)
+    try:
+        with travar(repositorio):
+            resumo = gerar_incremental(db.engine.url, current_app.config["UPLOAD_FOLDER"], repositorio, compressao)
+    except ErroBackup as e:
+        click.echo(f"❌ {e}")
+        raise SystemExit(1)
+    click.echo(f"✅ {resumo['caminho']} ({resumo['tamanho'] / 1024 / 1024:.1f} MB)")
+    click.echo(f"   uploads: {resumo['arquivos']} arquivo(s), {resumo['alterados']} novo(s)/alterado(s), "
+               f"{resumo['removidos']} removido(s), {resumo['objetos_novos']} objeto(s) copiado(s) "
+               f"({resumo['bytes_novos'] / 1024 / 1024:.1f} MB)")
+
+
+@backup_cli.command("listar")
+def listar_backups_cmd():
+    """Lista os snapshots do repositório."""
+    from flask import current_app
+    from utils.backup import ler_manifesto
+    from utils.backup_incremental import listar_snapshots, pasta_repositorio
+
+    repositorio = pasta_repositorio(current_app)
+    snapshots = listar_snapshots(repositorio)
+    for nome in snapshots:
+        manifesto = ler_manifesto(os.path.join(repositorio, "snapshots", nome))
+        uploads = manifesto.get("uploads", {})
+        click.echo(f"{nome}  {manifesto['motor']:<10} banco {manifesto['bytes'] / 1024 / 1024:7.1f} MB  "
+                   f"uploads {uploads.get('arquivos', 0)} (+{uploads.get('alterados', 0)} "
+                   f"-{uploads.get('removidos', 0)})  pai: {manifesto.get('pai') or '—'}")
+    click.echo(f"{len(snapshots)} snapshot(s) em {repositorio}")
+
+
+@backup_cli.command("restaurar")
+@click.argument("destino")
+@click.option("--snapshot", default=None, help="Nome do snapshot (padrão: o mais recente).")
+def restaurar_backup_cmd(destino, snapshot):
+    """Monta em DESTINO o banco e os uploads de um snapshot (a instância atual não é alterada)."""
+    from flask import current_app
+    from utils.backup import ErroBackup
+    from utils.backup_incremental import pasta_repositorio, restaurar
+
+    try:
+        manifesto = restaurar(pasta_repositorio(current_app), destino, snapshot)
+    except ErroBackup as e:
+        click.echo(f"❌ {e}")
+        raise SystemExit(1)
+    click.echo(f"✅ Snapshot de {manifesto['criado_em']} restaurado em {destino}")
+    click.echo(f"   banco: {manifesto['arquivo']}  uploads: {manifesto['uploads_restaurados']} arquivo(s) em uploads/")
+    click.echo("Para colocar no ar:")
+    click.echo(f"   cd {destino} && {manifesto['restauracao']}")
+    click.echo(f"   rsync -a uploads/ {current_app.config['UPLOAD_FOLDER']}/")
+
+
+def _resumo_ciclo(registro):
+    if "snapshot" not in registro:
+        return f"❌ {registro.get('erro')}"
+    linha = (f"{registro['snapshot']}: {registro['duracao_s']} s, {registro['tamanho'] / 1024 / 1024:.1f} MB, "
+             f"{len(registro['removidos'])} snapshot(s) removido(s) pela retenção")
+    if registro["verificacao"] == "ok":
+        return f"✅ {linha}; restauração de teste ok ({registro['tabelas']} tabela(s))"
+    return f"⚠️ {linha}; verificação falhou: {registro['erro']}"
+
+
+@backup_cli.command("executar")
+def executar_backup_cmd():
+    """Um ciclo completo: incremental + restauração de teste + retenção (para o cron)."""
+    from flask import current_app
+    from app.extensions import db
+    from utils.backup import ErroBackup
+    from utils.backup_agendado import executar_ciclo
+
+    try:
+        registro = executar_ciclo(current_app, db.engine.url)
+    except ErroBackup as e:
+        click.echo(f"❌ {e}")
+        raise SystemExit(1)
+    click.echo(_resumo_ciclo(registro))
+    if registro["verificacao"] != "ok":
+        raise SystemExit(2)
+
+
+@backup_cli.command("agendar")
+@click.option("--horario", default=None, help="HH:MM (padrão: BACKUP_HORARIO).")
+def agendar_backup_cmd(horario):
+    """Fica em execução e roda o ciclo de backup todo dia no horário definido."""
+    from flask import current_app
+    from app.extensions import db
+    from utils.backup_agendado import agendar
+
+    horario = horario or current_app.config.get("BACKUP_HORARIO", "02:30")
+    click.echo(f"⏰ Agendador de backups iniciado ({horario}). Ctrl+C para parar.")
+    agendar(current_app._get_current_object(), db.engine.url, horario,
+            ao_iniciar=lambda proxima: click.echo(f"   próximo backup: {proxima:%d/%m/%Y %H:%M}"),
+            ao_terminar=lambda registro: click.echo(f"   {_resumo_ciclo(registro)}"))
+
+
+@backup_cli.command("verificar")
+@click.option("--snapshot", default=None, help="Nome do snapshot (padrão: o mais recente).")
+def verificar_backup_cmd(snapshot):
+    """Restauração de teste de um snapshot num banco de rascunho."""
+    from flask import current_app
+    from app.extensions import db
+    from utils.backup import ErroBackup
+    from utils.backup_incremental import listar_snapshots, pasta_repositorio, verificar_snapshot
+
+    repositorio = pasta_repositorio(current_app)
+    snapshots = listar_snapshots(repositorio)
+    if not snapshots:
+        click.echo(f"Nenhum snapshot em {repositorio}.")
+        raise SystemExit(1)
+    snapshot = snapshot or snapshots[-1]
+    try:
+        resultado = verificar_snapshot(repositorio, snapshot, db.engine.url,
+                                       current_app.config.get("BACKUP_VERIFICAR_URL"))
+    except ErroBackup as e:
+        click.echo(f"❌ {snapshot}: {e}")
+        raise SystemExit(1)
+    click.echo(f"✅ {snapshot}: {resultado['tabelas']} tabela(s) restaurada(s), {resultado['uploads']} upload(s) conferido(s).")
+
+
+# -----------------------------
+# 🖼️ flask fotos ...
+# -----------------------------
+fotos_cli = AppGroup("fotos", help="Variantes reduzidas das fotos de membros e usuários.")
+
+
+@fotos_cli.command("variantes")
+def gerar_variantes_cmd():
+    """Gera as variantes (avatar, cartão, impressão) que faltam para as fotos já enviadas."""
+    from flask import current_app
+    from app.extensions import db
+    from app.models import Member, User
+    from utils.imagens import gerar_variantes_existentes
+
+    fotos = {foto for (foto,) in db.session.query(Member.foto).filter(Member.foto.isnot(None))}
+    # fotos de usuário são gravadas relativas à pasta de uploads
+    fotos |= {f"uploads/{foto}" for (foto,) in db.session.query(User.foto).filter(User.foto.isnot(None))}
+    geradas, erros = gerar_variantes_existentes(current_app.static_folder, sorted(fotos))
+    for foto, erro in erros:
+        click.echo(f"⚠️ {foto}: {erro}")
+    click.echo(f"✅ Variantes geradas para {geradas} foto(s) ({len(fotos)} no cadastro).")
+
+
+# -----------------------------
+# 📌 Registro dos comandos
+# -----------------------------
+def register_commands(app):
+    app.cli.add_command(estatisticas_cli)
+    app.cli.add_command(indices_cli)
+    app.cli.add_command(logs_cli)
+    app.cli.add_command(busca_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(links_cli)
+    app.cli.add_command(membros_cli)
+    app.cli.add_command(backup_cli)
+    app.cli.add_command(fotos_cli)
@@ -1,7 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail
 from flask_migrate import Migrate
+from utils.cache import FragmentCache
+from utils.auditoria import RegistradorAuditoria
+from utils.pdf import RenderizadorPDF
+from utils.jobs import FilaJobs
+from utils.usuarios_cache import CacheUsuarios
 
 db = SQLAlchemy()
 mail = Mail()
 migrate = Migrate()
+cache = FragmentCache()
+auditoria = RegistradorAuditoria()
+renderizador_pdf = RenderizadorPDF()
+fila_jobs = FilaJobs()
+cache_usuarios = CacheUsuarios()
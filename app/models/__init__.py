@@ -5,6 +5,10 @@ from .financeiro import Financeiro
 from .patrimonio import Patrimonio
 from .log import Log
 from .documento import Ata, Certificado, Carta
+from .estatisticas import MemberStatsMensal, FinanceiroStatsMensal
+from .job import Job
+from .envio_email import EnvioEmail
 
 # Agora você pode importar assim:
-# from app.models import User, Member, PublicLink, Evento, Financeiro, Patrimonio, Log, Ata, Certificado, Carta
+# from app.models import User, Member, PublicLink, Evento, Financeiro, Patrimonio, Log, Ata, Certificado, Carta,
+#     MemberStatsMensal, FinanceiroStatsMensal, Job, EnvioEmail
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from app.extensions import db   # ✅ importa o db único centralizado em app/extensions.py
+
+# -----------------------------
+# 📧 Situação de entrega por destinatário (envios em lote)
+# -----------------------------
+class EnvioEmail(db.Model):
+    __tablename__ = "envios_email"
+
+    PENDENTE = "pendente"
+    ENVIADO = "enviado"
+    FALHOU = "falhou"
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, index=True)                   # tarefa que fez o envio (se houver)
+    referencia = db.Column(db.String(50), nullable=False)        # ex: "evento:12"
+    assunto = db.Column(db.String(255), nullable=False)
+    destinatario = db.Column(db.String(120), nullable=False)
+
+    situacao = db.Column(db.String(20), nullable=False, default=PENDENTE)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(db.String(255))
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    enviado_em = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # retomada de um lote: "pendentes desta tarefa/referência"
+        db.Index("ix_envios_email_job_referencia_situacao", "job_id", "referencia", "situacao"),
+    )
+
+    def __repr__(self):
+        return f"<EnvioEmail {self.destinatario} {self.situacao}>"
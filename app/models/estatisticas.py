@@ -0,0 +1,33 @@
+from app.extensions import db   # ✅ importa o db único centralizado em app/extensions.py
+
+# -----------------------------
+# 📊 Estatísticas mensais de membros (rollup do dashboard)
+# -----------------------------
+class MemberStatsMensal(db.Model):
+    __tablename__ = "member_stats_monthly"
+
+    ano = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    mes = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    cadastros = db.Column(db.Integer, nullable=False, default=0)   # membros com data_cadastro no mês
+    saidas = db.Column(db.Integer, nullable=False, default=0)      # membros com data_saida no mês
+
+    def __repr__(self):
+        return f"<MemberStatsMensal {self.mes:02d}/{self.ano} +{self.cadastros} -{self.saidas}>"
+
+
+# -----------------------------
+# 💰 Estatísticas mensais do financeiro (rollup do dashboard)
+# -----------------------------
+class FinanceiroStatsMensal(db.Model):
+    __tablename__ = "financeiro_stats_monthly"
+
+    ano = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    mes = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    tipo = db.Column(db.String(20), primary_key=True)
+
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<FinanceiroStatsMensal {self.tipo} {self.mes:02d}/{self.ano} R${self.total:.2f}>"
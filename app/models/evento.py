@@ -25,7 +25,7 @@ class Evento(db.Model):
 
     tipo = db.Column(db.String(50), nullable=False)
 
-    data_inicio = db.Column(db.DateTime, nullable=False)
+    data_inicio = db.Column(db.DateTime, nullable=False, index=True)
     data_fim = db.Column(db.DateTime, nullable=False)
 
     local = db.Column(db.String(150), nullable=True)
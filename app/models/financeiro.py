@@ -10,7 +10,7 @@ class Financeiro(db.Model):
     __tablename__ = "financeiro"
 
     id = db.Column(db.Integer, primary_key=True)
-    data = db.Column(db.Date, nullable=False)
+    data = db.Column(db.Date, nullable=False, index=True)
     valor = db.Column(db.Float, nullable=False, default=0.0)
 
     tipo = db.Column(db.String(20), nullable=False)
@@ -25,6 +25,11 @@ class Financeiro(db.Model):
     comprovante = db.Column(db.String(200))
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # relatórios e resumos filtram por tipo + período
+        db.Index("ix_financeiro_tipo_data", "tipo", "data"),
+    )
+
     def __init__(self, **kwargs):
         tipo = kwargs.get("tipo")
         if tipo not in TIPOS_FINANCEIRO:
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime
+
+from app.extensions import db   # ✅ importa o db único centralizado em app/extensions.py
+
+# -----------------------------
+# ⏳ Tarefa em segundo plano (fila persistida no banco)
+# -----------------------------
+class Job(db.Model):
+    __tablename__ = "jobs"
+
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDO = "concluido"
+    FALHOU = "falhou"
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)            # nome da tarefa (@fila_jobs.tarefa em utils/tarefas.py)
+    parametros = db.Column(db.Text, nullable=False, default="{}")   # JSON
+    usuario = db.Column(db.String(120))                         # nome usado nos logs
+    usuario_id = db.Column(db.Integer, index=True)               # dono (quem pode ver e baixar)
+
+    situacao = db.Column(db.String(20), nullable=False, default=PENDENTE)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    max_tentativas = db.Column(db.Integer, nullable=False, default=3)
+    executar_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)   # próxima tentativa
+    worker = db.Column(db.String(100))                          # quem reservou a tarefa
+    atualizado_em = db.Column(db.DateTime)                      # batimento do worker enquanto executa
+
+    progresso = db.Column(db.Integer, nullable=False, default=0)   # 0–100
+    mensagem = db.Column(db.String(255))
+    erro = db.Column(db.Text)
+    resultado_arquivo = db.Column(db.String(255))               # caminho do arquivo para download
+    resultado_nome = db.Column(db.String(120))                  # nome sugerido no download
+
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    concluido_em = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # o worker procura "pendente com executar_em vencido", mais antigo primeiro
+        db.Index("ix_jobs_situacao_executar_em", "situacao", "executar_em"),
+    )
+
+    @property
+    def params(self):
+        return json.loads(self.parametros or "{}")
+
+    @property
+    def descricao(self):
+        from app.extensions import fila_jobs
+        return fila_jobs.descricao(self.tipo)
+
+    @property
+    def finalizado(self):
+        return self.situacao in (self.CONCLUIDO, self.FALHOU)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "descricao": self.descricao,
+            "situacao": self.situacao,
+            "tentativas": self.tentativas,
+            "max_tentativas": self.max_tentativas,
+            "progresso": self.progresso,
+            "mensagem": self.mensagem,
+            "erro": self.erro,
+            "tem_arquivo": bool(self.resultado_arquivo),
+        }
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.tipo} {self.situacao}>"
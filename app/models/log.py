@@ -1,6 +1,5 @@
 from app.extensions import db
 from datetime import datetime, timezone
-from flask import request
 
 class Log(db.Model):
     __tablename__ = "logs"
@@ -14,26 +13,21 @@ class Log(db.Model):
     datahora = db.Column(
         db.DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
-        nullable=False
+        nullable=False,
+        index=True   # listagem ordenada e remoção por data
     )
 
     ip = db.Column(db.String(45), nullable=False)
 
+    __table_args__ = (
+        # filtro por usuário já ordenado por data
+        db.Index("ix_logs_usuario_datahora", "usuario", "datahora"),
+    )
+
     def __repr__(self):
         return f"<Log {self.usuario} - {self.tarefa}>"
 
-# ✅ Função utilitária para registrar logs
+# ✅ Função utilitária para registrar logs (delegada ao registrador em lote)
 def registrar_log(usuario, tarefa, resultado="sucesso"):
-    try:
-        log = Log(
-            usuario=usuario,
-            tarefa=tarefa,
-            resultado=resultado,
-            datahora=datetime.now(timezone.utc),
-            ip=request.remote_addr or "desconhecido"
-        )
-        db.session.add(log)
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Erro ao registrar log: {e}")
+    from utils.logs import registrar_log as _registrar
+    _registrar(usuario, tarefa, resultado)
@@ -14,6 +14,9 @@ class Member(db.Model):
     foto = db.Column(db.String(200))
     nome = db.Column(db.String(120), nullable=False)
     data_nascimento = db.Column(db.Date, nullable=True)
+    # mês/dia do nascimento, mantidos a partir de data_nascimento (busca de aniversariantes pelo índice)
+    mes_nascimento = db.Column(db.SmallInteger, nullable=True)
+    dia_nascimento = db.Column(db.SmallInteger, nullable=True)
     sexo = db.Column(db.String(20))
     estado_civil = db.Column(db.String(20))
     conjuge = db.Column(db.String(120))
@@ -38,7 +41,7 @@ class Member(db.Model):
 
     # ➕ Novos campos
     data_conversao = db.Column(db.Date, nullable=True)
-    data_saida = db.Column(db.Date, nullable=True)
+    data_saida = db.Column(db.Date, nullable=True, index=True)   # membros ativos = data_saida IS NULL
     visitante = db.Column(db.Boolean, default=False)   # ✅ novo campo
 
     # Documentos
@@ -53,6 +56,18 @@ class Member(db.Model):
     # Observações
     observacoes = db.Column(db.Text)
 
+    __table_args__ = (
+        # aniversariantes por mês / próximos dias, já ordenados por dia
+        db.Index("ix_members_aniversario", "mes_nascimento", "dia_nascimento"),
+    )
+
+    @db.validates("data_nascimento")
+    def _atualizar_aniversario(self, chave, valor):
+        """Mantém mes_nascimento/dia_nascimento em sincronia com a data de nascimento."""
+        self.mes_nascimento = valor.month if valor else None
+        self.dia_nascimento = valor.day if valor else None
+        return valor
+
     @property
     def idade(self):
         """Calcula a idade com base na data de nascimento."""
@@ -84,6 +99,11 @@ class PublicLink(db.Model):
     ativo = db.Column(db.Boolean, default=True)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # busca do link ativo mais recente por tipo
+        db.Index("ix_public_links_tipo_ativo_data", "tipo", "ativo", "data_criacao"),
+    )
+
     @staticmethod
     def gerar_hash():
         return secrets.token_hex(16)
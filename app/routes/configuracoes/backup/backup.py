@@ -1,10 +1,11 @@
-from flask import Blueprint, render_template, flash, redirect, url_for, abort, send_file
+from flask import Blueprint, render_template, flash, redirect, url_for, abort, request, current_app, Response
 from flask_login import login_required, current_user
 from functools import wraps
-from dotenv import load_dotenv
-import os, subprocess, re, tempfile, zipfile, urllib.parse
-from datetime import datetime
 
+from app.extensions import db, fila_jobs
+from utils.backup import COMPRESSOES, ErroBackup, driver_para, stream_backup
+from utils.backup_agendado import ler_historico
+from utils.backup_incremental import pasta_repositorio
 from utils.logs import registrar_log
 
 backup_bp = Blueprint("backup", __name__, url_prefix="/backup")
@@ -21,50 +22,63 @@ def admin_required(f):
 @backup_bp.route("/", methods=["GET"])
 @admin_required
 def backup_page():
-    return render_template("configuracoes/backup.html")
+    # driver do banco em uso: mostra o motor e o comando de restauração certos
+    try:
+        driver, erro = driver_para(db.engine.url), None
+    except ErroBackup as e:
+        driver, erro = None, str(e)
+    # últimos ciclos agendados (historico.jsonl do repositório): tendência de duração e tamanho
+    historico = ler_historico(pasta_repositorio(current_app), limite=30)
+    return render_template("configuracoes/backup.html", compressoes=COMPRESSOES, driver=driver, erro=erro,
+                           historico=historico)
+
+
+def _compressao():
+    compressao = request.form.get("compressao", "deflate")
+    return compressao if compressao in COMPRESSOES else "deflate"
 
 @backup_bp.route("/gerar", methods=["POST"])
 @admin_required
 def gerar_backup():
-    load_dotenv()
-    db_url = os.getenv("DATABASE_URL")
-
-    match = re.match(r"mysql\+pymysql://(.+):(.+)@(.+):(\d+)/(.+)", db_url or "")
-    if not match:
-        flash("DATABASE_URL inválido ou não configurado.", "danger")
-        return redirect(url_for("configuracoes.backup.backup_page"))
-
-    user, password, host, port, dbname = match.groups()
-    password = urllib.parse.unquote(password)  # decodifica %40 → @
+    # dump + zip rodam na fila de tarefas; o download fica na página da tarefa
+    job = fila_jobs.enfileirar("backup_banco", usuario=current_user.nome or "desconhecido",
+                               usuario_id=current_user.id, compressao=_compressao())
+    flash("Backup iniciado. O download ficará disponível ao final.", "info")
+    return redirect(url_for("jobs.detalhe_job", id=job.id))
 
-    data_str = datetime.now().strftime("%d-%m-%Y")
 
-    tmp_sql = tempfile.NamedTemporaryFile(delete=False, suffix=".sql")
-    tmp_sql.close()
-
-    try:
-        subprocess.run(
-            ["mysqldump", "-h", host, "-P", port, "-u", user, f"-p{password}", dbname],
-            stdout=open(tmp_sql.name, "w"),
-            check=True
-        )
+@backup_bp.route("/incremental", methods=["POST"])
+@admin_required
+def gerar_incremental():
+    # banco + uploads novos vão para o repositório BACKUP_DIR (restaurar com `flask backup restaurar`)
+    job = fila_jobs.enfileirar("backup_incremental", usuario=current_user.nome or "desconhecido",
+                               usuario_id=current_user.id, compressao=_compressao())
+    flash("Backup incremental iniciado.", "info")
+    return redirect(url_for("jobs.detalhe_job", id=job.id))
 
-        zip_filename = f"{dbname}_backup_{data_str}.zip"
-        tmp_zip = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
-        tmp_zip.close()
 
-        with zipfile.ZipFile(tmp_zip.name, "w", zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(tmp_sql.name, arcname=f"{dbname}_backup_{data_str}.sql")
+def _emendar(primeiro, corpo):
+    # yield from repassa o close() do servidor (download cancelado) até o programa de dump
+    yield primeiro
+    yield from corpo
 
-        registrar_log(current_user.nome or "desconhecido",
-                      f"Gerou backup do banco {dbname}", "sucesso")
-        return send_file(tmp_zip.name, as_attachment=True, download_name=zip_filename)
 
-    except Exception as e:
-        registrar_log(current_user.nome or "desconhecido",
-                      f"Erro ao gerar backup do banco {dbname}", "erro")
-        flash(f"Erro ao gerar backup: {e}", "danger")
+@backup_bp.route("/baixar", methods=["POST"])
+@admin_required
+def baixar_backup():
+    # dump → compressor → resposta, sem guardar o arquivo no servidor
+    try:
+        # db.engine.url: no SQLite, o caminho já resolvido pelo Flask-SQLAlchemy (pasta instance/)
+        nome, mimetype, corpo = stream_backup(db.engine.url, _compressao())
+        # puxa o primeiro bloco antes de responder: erro de acesso ao banco ainda vira mensagem
+        primeiro = next(corpo, b"")
+    except ErroBackup as e:
+        flash(str(e), "danger")
         return redirect(url_for("configuracoes.backup.backup_page"))
-    finally:
-        if os.path.exists(tmp_sql.name):
-            os.remove(tmp_sql.name)
+
+    registrar_log(current_user.nome or "desconhecido", f"Baixou backup do banco ({nome})", "sucesso")
+    return Response(
+        _emendar(primeiro, corpo),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={nome}"},
+    )
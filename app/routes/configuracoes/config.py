@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, abort
+from flask import Blueprint, render_template, abort, jsonify
 from flask_login import login_required, current_user
 from functools import wraps
 
@@ -33,3 +33,30 @@ config_bp.register_blueprint(logs_bp)
 def configuracoes():
     return render_template("configuracoes/configuracoes.html")
 
+# 🧠 Contadores do cache de widgets (por processo)
+@config_bp.route("/cache")
+@admin_required
+def cache_stats():
+    from app.extensions import cache
+    return jsonify(cache.stats())
+
+# 🖨️ Pool de PDFs e acertos do cache (por processo)
+@config_bp.route("/pdf")
+@admin_required
+def pdf_stats():
+    from app.extensions import renderizador_pdf
+    return jsonify(renderizador_pdf.stats())
+
+# 👤 Cache do usuário logado (por processo)
+@config_bp.route("/sessoes")
+@admin_required
+def sessoes_stats():
+    from app.extensions import cache_usuarios
+    return jsonify(cache_usuarios.stats())
+
+# 📝 Fila do registrador de logs (por processo)
+@config_bp.route("/logs/metricas")
+@admin_required
+def logs_metricas():
+    from app.extensions import auditoria
+    return jsonify(auditoria.stats())
@@ -1,12 +1,22 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from flask_login import login_required
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app
+from flask_login import login_required, current_user
+from functools import wraps
 from app.models.log import Log
-from app.extensions import db
-from datetime import datetime, timedelta
+from utils.logs import purgar_logs, registrar_log
 
 # ✅ Blueprint precisa se chamar logs_bp
 logs_bp = Blueprint("logs", __name__, url_prefix="/logs")
 
+# Decorator para garantir acesso apenas a administradores
+def admin_required(f):
+    @wraps(f)
+    @login_required
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or current_user.role != "admin":
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
 @logs_bp.route("/", methods=["GET"])
 @login_required
 def visualizar_logs():
@@ -23,20 +33,18 @@ def visualizar_logs():
     return render_template("configuracoes/logs.html", registros=registros, usuario=usuario)
 
 
-# ✅ Remove apenas os registros mais antigos que 30 dias e confirma a exclusão no banco
-@logs_bp.route("/remover_logs", methods=["GET"])
-@login_required
+# ✅ Aplica a retenção (LOG_RETENCAO_DIAS) — o mesmo que `flask logs purgar`, agendado no cron
+@logs_bp.route("/remover_logs", methods=["POST"])
+@admin_required
 def remover_logs():
-    limite = datetime.now() - timedelta(days=30)
-    qtd = Log.query.filter(Log.datahora < limite).delete(synchronize_session=False)
-    db.session.commit()
+    dias = current_app.config.get("LOG_RETENCAO_DIAS", 30)
+    meses, linhas = purgar_logs(dias)
 
-    if qtd > 0:
-        flash(f"{qtd} logs antigos foram removidos (30 dias ou mais).", "info")
+    if meses or linhas:
+        removidos = f"{len(meses)} mês(es) de logs" if linhas is None else f"{linhas} logs"
+        flash(f"{removidos} antigos foram removidos ({dias} dias ou mais).", "info")
+        registrar_log(current_user.nome, f"Removeu logs com mais de {dias} dias", "sucesso")
     else:
-        flash("Nenhum log com mais de 30 dias encontrado para remoção.", "warning")
+        flash(f"Nenhum log com mais de {dias} dias encontrado para remoção.", "warning")
 
     return redirect(url_for("configuracoes.logs.visualizar_logs"))
-
-
-
@@ -1,11 +1,12 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, current_app
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
-from app.extensions import db
-from app.models import User
+from app.extensions import db, cache_usuarios
+from app.models import User, Member
 from functools import wraps
 from .forms import NovoUsuarioForm, EditarUsuarioForm
 from utils.logs import registrar_log
+from utils.imagens import ErroImagem, salvar_foto
+from utils.imagens import remover_foto as apagar_foto   # a rota remover_foto abaixo usa o mesmo nome
 import os
 
 usuarios_bp = Blueprint("usuarios", __name__, url_prefix="/usuarios")
@@ -14,6 +15,13 @@ usuarios_bp = Blueprint("usuarios", __name__, url_prefix="/usuarios")
 def get_upload_folder():
     return os.path.join(current_app.root_path, "static", "uploads")
 
+# Apaga a foto e as variantes, a não ser que outro usuário ou membro use a mesma imagem (nome pelo conteúdo)
+def _remover_arquivos_foto(usuario):
+    if (User.query.filter(User.foto == usuario.foto, User.id != usuario.id).count()
+            or Member.query.filter_by(foto=f"uploads/{usuario.foto}").count()):
+        return
+    apagar_foto(get_upload_folder(), usuario.foto)
+
 # Decorator para garantir acesso apenas a administradores
 def admin_required(f):
     @wraps(f)
@@ -47,20 +55,13 @@ def novo_usuario():
         db.session.add(novo)
         db.session.commit()
 
-        # Foto (se enviada)
+        # Foto (se enviada): mestra + variantes sem EXIF, nome pelo conteúdo
         if form.foto.data:
-            foto = form.foto.data
-            ext = os.path.splitext(foto.filename)[1].lower()
-            if ext not in [".jpg", ".jpeg", ".png"]:
-                flash("Formato inválido. Use JPG ou PNG.", "danger")
-            else:
-                filename = secure_filename(f"user_{novo.id}{ext}")
-                upload_folder = get_upload_folder()
-                os.makedirs(upload_folder, exist_ok=True)
-                path = os.path.join(upload_folder, filename)
-                foto.save(path)
-                novo.foto = filename
+            try:
+                novo.foto = salvar_foto(form.foto.data, get_upload_folder())
                 db.session.commit()  # segundo commit para atualizar a foto
+            except ErroImagem as e:
+                flash(str(e), "danger")
 
         registrar_log(current_user.nome, f"Criou usuário: {novo.email}", "sucesso")
         flash(f"Usuário {novo.nome} criado com sucesso!", "success")
@@ -84,30 +85,22 @@ def editar_usuario(id):
         if form.senha.data:
             usuario.set_password(form.senha.data)
 
-        # Foto (se enviada)
+        # Foto (se enviada): mestra + variantes sem EXIF, nome pelo conteúdo
         if form.foto.data:
-            foto = form.foto.data
-            ext = os.path.splitext(foto.filename)[1].lower()
-            if ext not in [".jpg", ".jpeg", ".png"]:
-                flash("Formato inválido. Use JPG ou PNG.", "danger")
+            try:
+                nova_foto = salvar_foto(form.foto.data, get_upload_folder())
+            except ErroImagem as e:
+                flash(str(e), "danger")
             else:
-                upload_folder = get_upload_folder()
-                os.makedirs(upload_folder, exist_ok=True)
-
-                # Remove foto antiga se existir
-                if usuario.foto:
-                    old_path = os.path.join(upload_folder, usuario.foto)
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
-
-                filename = secure_filename(f"user_{usuario.id}{ext}")
-                path = os.path.join(upload_folder, filename)
-                foto.save(path)
-                usuario.foto = filename
+                # Remove foto antiga (e variantes) se existir
+                if usuario.foto and usuario.foto != nova_foto:
+                    _remover_arquivos_foto(usuario)
+                usuario.foto = nova_foto
 
         db.session.commit()
+        cache_usuarios.invalidar(usuario.id)
         registrar_log(current_user.nome, f"Editou usuário: {usuario.email}", "sucesso")
-        flash(f"Usuário {novo.nome} atualizado com sucesso!", "success")
+        flash(f"Usuário {usuario.nome} atualizado com sucesso!", "success")
         return redirect(url_for("configuracoes.usuarios.usuarios_page"))
     return render_template("configuracoes/editar_usuario.html", form=form, usuario=usuario)
     
@@ -119,13 +112,11 @@ def excluir_usuario(id):
 
     # 🔹 Remove foto física se existir
     if usuario.foto:
-        upload_folder = get_upload_folder()
-        path = os.path.join(upload_folder, usuario.foto)
-        if os.path.exists(path):
-            os.remove(path)
+        _remover_arquivos_foto(usuario)
 
     db.session.delete(usuario)
     db.session.commit()
+    cache_usuarios.invalidar(id)
 
     registrar_log(current_user.nome, f"Excluiu usuário: {usuario.email}", "sucesso")
     flash(f"Usuário {usuario.nome} excluído com sucesso!", "danger")
@@ -137,9 +128,10 @@ def toggle_usuario(id):
     usuario = User.query.get_or_404(id)
     usuario.ativo = not usuario.ativo
     db.session.commit()
+    cache_usuarios.invalidar(usuario.id)
     registrar_log(current_user.nome, f"Trocou status do usuário: {usuario.email} para {'ativo' if usuario.ativo else 'inativo'}", "sucesso")
     flash(
-        f"Usuário {novo.nome} foi {'ativado' if usuario.ativo else 'desativado'}.",
+        f"Usuário {usuario.nome} foi {'ativado' if usuario.ativo else 'desativado'}.",
         "success" if usuario.ativo else "warning"
     )
     return redirect(url_for("configuracoes.usuarios.usuarios_page"))
@@ -151,16 +143,13 @@ def remover_foto(id):
     usuario = User.query.get_or_404(id)
 
     if usuario.foto:
-        upload_folder = get_upload_folder()
-        path = os.path.join(upload_folder, usuario.foto)
-
-        # Remove arquivo físico
-        if os.path.exists(path):
-            os.remove(path)
+        # Remove arquivo físico (e variantes)
+        _remover_arquivos_foto(usuario)
 
         # Limpa campo no banco
         usuario.foto = None
         db.session.commit()
+        cache_usuarios.invalidar(usuario.id)
 
         registrar_log(current_user.nome, f"Removeu foto do usuário: {usuario.email}", "sucesso")
         flash("Foto removida com sucesso!", "info")
@@ -2,6 +2,7 @@ from flask import Blueprint
 from .atas.atas import atas_bp
 from .cartas.cartas import cartas_bp
 from .certificados.certificados import certificados_bp
+from .documentos import buscar_documentos_view
 
 documentos_bp = Blueprint("documentos", __name__, url_prefix="/documentos")
 
@@ -9,4 +10,7 @@ documentos_bp.register_blueprint(atas_bp)
 documentos_bp.register_blueprint(cartas_bp)
 documentos_bp.register_blueprint(certificados_bp)
 
+# 🔎 busca unificada em /documentos/buscar
+documentos_bp.add_url_rule("/buscar", "buscar", buscar_documentos_view, methods=["GET"])
+
 __all__ = ["documentos_bp"]
@@ -3,52 +3,29 @@ from app import db
 from app.models import Ata   # ✅ agora usamos o modelo Ata
 from .forms import AtaForm
 from datetime import date
-from app.models.log import Log
-from datetime import datetime, timezone
-from flask import request
-from app.extensions import db
+from utils.logs import registrar_log
+from utils.busca import filtro_documentos
 
 atas_bp = Blueprint("atas", __name__, url_prefix="/atas")
 
-def registrar_log(usuario, tarefa, resultado="sucesso"):
-    """
-    Registra um log no banco de dados.
-    - usuario: e-mail ou identificador do usuário
-    - tarefa: ação realizada (ex: login, logout, reset de senha)
-    - resultado: 'sucesso', 'erro', 'info', etc.
-    """
-    try:
-        log = Log(
-            usuario=usuario,
-            tarefa=tarefa,
-            resultado=resultado,
-            datahora=datetime.now(timezone.utc),
-            ip=request.remote_addr or "desconhecido"
-        )
-        db.session.add(log)
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Erro ao registrar log: {e}")
-
 # ----------------------------- 
 # 📋 Listar atas com paginação 
 # -----------------------------
+def _atas_filtradas(termo):
+    """Atas filtradas pelo índice de documentos (título, pessoas, pauta, deliberações...)."""
+    query = Ata.query
+    condicao = filtro_documentos("ata", termo)
+    if condicao is not None:
+        query = query.filter(condicao)
+    return query.order_by(Ata.data_emissao.desc())
+
+
 @atas_bp.route("/")
 def listar_atas():
     page = request.args.get("page", 1, type=int)
     termo = request.args.get("q", "", type=str)
 
-    query = Ata.query
-
-    if termo:
-        query = query.filter(
-            (Ata.titulo.ilike(f"%{termo}%")) |
-            (Ata.presidente.ilike(f"%{termo}%")) |
-            (Ata.secretario.ilike(f"%{termo}%"))
-        )
-
-    atas = query.order_by(Ata.data_emissao.desc()).paginate(page=page, per_page=10)
+    atas = _atas_filtradas(termo).paginate(page=page, per_page=10)
     return render_template("documentos/atas/atas.html", atas=atas, termo=termo)
 
 @atas_bp.route("/buscar", methods=["GET"])
@@ -56,16 +33,7 @@ def buscar_atas():
     termo = request.args.get("q", "").strip().lower()
     page = request.args.get("page", 1, type=int)
 
-    query = Ata.query
-
-    if termo:
-        query = query.filter(
-            (Ata.titulo.ilike(f"%{termo}%")) |
-            (Ata.presidente.ilike(f"%{termo}%")) |
-            (Ata.secretario.ilike(f"%{termo}%"))
-        )
-
-    atas = query.order_by(Ata.data_emissao.desc()).paginate(page=page, per_page=10)
+    atas = _atas_filtradas(termo).paginate(page=page, per_page=10)
 
     if termo:
         if atas.total == 0:
@@ -3,6 +3,7 @@ from datetime import datetime
 from app import db
 from app.models import Carta, Member   # ✅ agora usamos o modelo Carta
 from .forms import CartaForm
+from utils.busca import filtro_documentos
 
 cartas_bp = Blueprint("cartas", __name__, url_prefix="/cartas")
 
@@ -22,7 +23,7 @@ def listar_cartas():
 
 
 # --------------------------------------------------------- 
-# 🔍 Buscar cartas por título, remetente ou destinatário 
+# 🔍 Buscar cartas (título, remetente, destinatário, corpo)
 # ---------------------------------------------------------
 @cartas_bp.route("/buscar", methods=["GET"])
 def buscar_cartas():
@@ -31,12 +32,9 @@ def buscar_cartas():
 
     query = Carta.query
 
-    if termo:
-        query = query.filter(
-            (Carta.titulo.ilike(f"%{termo}%")) |
-            (Carta.remetente.ilike(f"%{termo}%")) |
-            (Carta.destinatario.ilike(f"%{termo}%"))
-        )
+    condicao = filtro_documentos("carta", termo)
+    if condicao is not None:
+        query = query.filter(condicao)
 
     cartas = (
         query.order_by(Carta.data_emissao.desc())
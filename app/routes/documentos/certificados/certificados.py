@@ -3,6 +3,7 @@ from datetime import datetime
 from app import db
 from app.models import Certificado   # ✅ agora usamos o modelo Certificado
 from .forms import CertificadoForm
+from utils.busca import filtro_documentos
 
 certificados_bp = Blueprint("certificados", __name__, url_prefix="/certificados")
 
@@ -16,13 +17,9 @@ def listar_certificados():
 
     query = Certificado.query
 
-    if termo:
-        query = query.filter(
-            (Certificado.titulo.ilike(f"%{termo}%")) |
-            (Certificado.corpo.ilike(f"%{termo}%")) |
-            (Certificado.criado_por.ilike(f"%{termo}%")) |
-            (Certificado.evento.ilike(f"%{termo}%"))
-        )
+    condicao = filtro_documentos("certificado", termo)
+    if condicao is not None:
+        query = query.filter(condicao)
 
     certificados = query.order_by(Certificado.data_emissao.desc()).paginate(page=page, per_page=10)
 
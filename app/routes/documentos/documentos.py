@@ -0,0 +1,33 @@
+from flask import render_template, request, url_for
+from flask_login import login_required
+
+from utils.busca import DOCUMENTOS, buscar_documentos
+
+# endpoint de visualização de cada tipo de documento
+_ENDPOINTS = {
+    "ata": "documentos.atas.ver_ata",
+    "carta": "documentos.cartas.visualizar_carta",
+    "certificado": "documentos.certificados.visualizar_certificado",
+}
+
+
+# -----------------------------
+# 🔎 Busca unificada (atas, cartas e certificados)
+# -----------------------------
+@login_required
+def buscar_documentos_view():
+    termo = request.args.get("q", "").strip()
+    tipo = request.args.get("tipo", "")
+    page = request.args.get("page", 1, type=int)
+
+    resultados = buscar_documentos(termo, [tipo] if tipo in DOCUMENTOS else None, page=page)
+    for item in resultados.items:
+        item["url"] = url_for(_ENDPOINTS[item["tipo"]], id=item["id"])
+
+    return render_template(
+        "documentos/buscar.html",
+        resultados=resultados,
+        termo=termo,
+        tipo=tipo,
+        tipos=DOCUMENTOS,
+    )
@@ -1,11 +1,11 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
-from flask_mail import Message
-from datetime import datetime, timedelta
-from app.extensions import db, mail              # ✅ importa db e mail da extensions.py
-from app.models import Evento, Member, User      # ✅ importa models do pacote app.models
+from datetime import datetime
+from app.extensions import db, fila_jobs         # ✅ importa db e a fila de tarefas da extensions.py
+from app.models import Evento                    # ✅ importa models do pacote app.models
 from app.routes.event.forms import EventoForm    # ✅ ajusta para app.routes
 from flask_login import login_required, current_user   # 👈 protege rotas com Flask-Login
 from utils.logs import registrar_log             # 👈 importa função de log
+from utils.lembretes import nome_do_convite       # 👈 nome do link pessoal do lembrete
 
 event_bp = Blueprint("event", __name__, url_prefix="/eventos")
 
@@ -132,45 +132,11 @@ def buscar_eventos():
 @event_bp.route("/enviar-lembretes", methods=["GET"])
 @login_required   # 👈 protege a rota
 def enviar_lembretes_eventos():
-    hoje = datetime.now()
-    limite = hoje + timedelta(days=3)  # próximos 3 dias
-
-    # Busca eventos que começam nos próximos 3 dias
-    eventos = Evento.query.filter(
-        Evento.data_inicio >= hoje,
-        Evento.data_inicio <= limite
-    ).all()
-
-    if not eventos:
-        flash("Nenhum evento próximo para enviar lembrete.", "info")
-        return redirect(url_for("event.listar_eventos"))
-
-    # ✅ pega todos os e-mails dos membros
-    member_emails = [m.email.strip() for m in Member.query.filter(Member.email != None).all() if m.email.strip()]
-
-    # ✅ pega o e-mail do administrador
-    admin = User.query.filter_by(role="admin").first()
-    admin_email = admin.email if admin else None
-
-    # ✅ junta tudo em uma lista de destinatários
-    recipients = member_emails
-    if admin_email:
-        recipients.append(admin_email)
-
-    for ev in eventos:
-        html_body = render_template("email/lembrete_evento.html", evento=ev)
-
-        msg = Message(
-            subject=f"Lembrete: {ev.titulo} está chegando!",
-            recipients=recipients,   # envia para membros + admin
-            html=html_body
-        )
-        mail.send(msg)
-        registrar_log(current_user.nome, f"Enviou lembrete do evento: {ev.titulo}", "sucesso")  # 👈 log
-        print(f"Lembrete enviado para evento: {ev.titulo}")
-
-    flash("Lembretes enviados com sucesso!", "success")
-    return redirect(url_for("event.listar_eventos"))
+    # o envio (SMTP) roda na fila de tarefas — ver utils/tarefas.py
+    job = fila_jobs.enfileirar("lembretes_eventos", usuario=current_user.nome,
+                               usuario_id=current_user.id, dias=3, url_base=request.url_root)
+    flash("Envio dos lembretes iniciado em segundo plano.", "info")
+    return redirect(url_for("jobs.detalhe_job", id=job.id))
     
 
 # -----------------------------
@@ -185,4 +151,6 @@ def evento_publico_token(public_token):
         # Renderiza página amigável de evento expirado
         return render_template("eventos/evento_expirado.html", evento=evento), 410
 
-    return render_template("eventos/evento_publico.html", evento=evento)
+    # 👋 link pessoal do lembrete por e-mail (?para= assinado)
+    convidado = nome_do_convite(request.args.get("para"))
+    return render_template("eventos/evento_publico.html", evento=evento, convidado=convidado)
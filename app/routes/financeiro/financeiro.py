@@ -1,16 +1,20 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, current_app, stream_with_context, jsonify
 from datetime import datetime, date
 from collections import defaultdict
-import csv, io, os
+import os
 from werkzeug.utils import secure_filename
+from werkzeug.datastructures import MultiDict
 
-from app.extensions import db                   # ✅ importa db da extensions.py
-from app.models import Financeiro               # ✅ importa Financeiro do pacote app.models
+from app.extensions import db, cache            # ✅ importa db e cache da extensions.py
+from app.models import Financeiro, FinanceiroStatsMensal   # ✅ importa modelos do pacote app.models
 from app.routes.financeiro.forms import (       # ✅ ajusta para app.routes
     EntradaForm, SaidaForm, FiltroRelatorioForm, ComprovanteForm
 )
 from flask_login import login_required, current_user   # 👈 protege rotas com Flask-Login
 from utils.logs import registrar_log             # 👈 importa função de log
+from utils.exportacao import FORMATOS, planilha_stream
+from utils.streaming import gzip_stream
+from utils.pagination import paginate_keyset
 
 financeiro_bp = Blueprint("financeiro", __name__, url_prefix="/financeiro")
 
@@ -21,38 +25,72 @@ def currency_format(value):
         return "R$ 0,00"
     return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
+def resumo_mensal(meses=6, hoje=None):
+    """
+    Totais de Entradas/Saídas dos últimos `meses` meses (mês atual incluso).
+
+    Um único GROUP BY ano, mês, tipo restrito à janela de datas; só tuplas
+    escalares voltam do banco. Retorna (labels "mm-aaaa", entradas, saídas).
+    """
+    hoje = hoje or date.today()
+    ano, mes = hoje.year, hoje.month - (meses - 1)
+    while mes < 1:
+        ano, mes = ano - 1, mes + 12
+    inicio = date(ano, mes, 1)
+    fim = date(hoje.year + 1, 1, 1) if hoje.month == 12 else date(hoje.year, hoje.month + 1, 1)
+
+    chaves = []
+    while len(chaves) < meses:
+        chaves.append((ano, mes))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+    linhas = (
+        db.session.query(
+            db.func.extract('year', Financeiro.data).label("ano"),
+            db.func.extract('month', Financeiro.data).label("mes"),
+            Financeiro.tipo,
+            db.func.sum(Financeiro.valor)
+        )
+        .filter(Financeiro.data >= inicio, Financeiro.data < fim)
+        .filter(Financeiro.tipo.in_(("Entrada", "Saída")))
+        .group_by("ano", "mes", Financeiro.tipo)
+        .all()
+    )
+
+    por_mes = {chave: {"Entrada": 0.0, "Saída": 0.0} for chave in chaves}
+    for r_ano, r_mes, tipo, total in linhas:
+        chave = (int(r_ano), int(r_mes))
+        if chave in por_mes:
+            por_mes[chave][tipo] = float(total or 0.0)
+
+    labels = [f"{m:02d}-{a}" for a, m in chaves]
+    entradas_data = [por_mes[chave]["Entrada"] for chave in chaves]
+    saidas_data = [por_mes[chave]["Saída"] for chave in chaves]
+    return labels, entradas_data, saidas_data
+
+
 @financeiro_bp.route('/')
 @login_required   # 👈 protege a rota
 def financeiro():
-    # Resumo: totais
-    total_entradas = db.session.query(db.func.coalesce(db.func.sum(Financeiro.valor), 0.0)).filter(Financeiro.tipo=="Entrada").scalar()
-    total_saidas = db.session.query(db.func.coalesce(db.func.sum(Financeiro.valor), 0.0)).filter(Financeiro.tipo=="Saída").scalar()
-    saldo = (total_entradas or 0.0) - (total_saidas or 0.0)
+    # Resumo: totais (somados a partir do rollup financeiro_stats_monthly)
+    totais = dict(
+        db.session.query(FinanceiroStatsMensal.tipo, db.func.sum(FinanceiroStatsMensal.total))
+        .filter(FinanceiroStatsMensal.tipo.in_(("Entrada", "Saída")))
+        .group_by(FinanceiroStatsMensal.tipo)
+        .all()
+    )
+    total_entradas = float(totais.get("Entrada") or 0.0)
+    total_saidas = float(totais.get("Saída") or 0.0)
+    saldo = total_entradas - total_saidas
 
     # Gráficos por mês (últimos 6 meses)
-    def month_key(d: date):
-        return d.strftime("%m-%Y")
-
-    ultimos = sorted({month_key(r.data) for r in Financeiro.query.all()}, key=lambda x: datetime.strptime("01-"+x, "%d-%m-%Y"))[-6:]
-
-    por_mes = {m: {"Entradas": 0.0, "Saídas": 0.0} for m in ultimos}
-    for r in Financeiro.query.all():
-        mk = month_key(r.data)
-        if mk in por_mes:
-            if r.tipo == "Entrada":
-                por_mes[mk]["Entradas"] += float(r.valor)
-            elif r.tipo == "Saída":
-                por_mes[mk]["Saídas"] += float(r.valor)
-
-    labels = ultimos
-    entradas_data = [por_mes[m]["Entradas"] for m in labels]
-    saidas_data = [por_mes[m]["Saídas"] for m in labels]
+    labels, entradas_data, saidas_data = resumo_mensal(6)
 
     return render_template(
         'financeiro/financeiro.html',
-        total_entradas=total_entradas or 0.0,
-        total_saidas=total_saidas or 0.0,
-        saldo=saldo or 0.0,
+        total_entradas=total_entradas,
+        total_saidas=total_saidas,
+        saldo=saldo,
         labels=labels,
         entradas_data=entradas_data,
         saidas_data=saidas_data
@@ -204,57 +242,100 @@ def editar_saida(id):
 # -----------------------------
 # 📄 Rotas de Relatórios, Exportação e Comprovantes
 # -----------------------------
-@financeiro_bp.route('/relatorios', methods=['GET', 'POST'])
-@login_required   # 👈 protege a rota
-def relatorios():
-    form = FiltroRelatorioForm()
-    query = Financeiro.query
+CAMPOS_FILTRO_RELATORIO = ("inicio", "fim", "tipo", "categoria")
 
-    if form.validate_on_submit():
+
+def _filtros_relatorio(args):
+    """Lê os filtros do relatório (querystring) e devolve (form, condições SQL)."""
+    form = FiltroRelatorioForm(args, meta={"csrf": False})
+    condicoes = []
+
+    if args and form.validate():
         if form.inicio.data:
-            query = query.filter(Financeiro.data >= form.inicio.data)
+            condicoes.append(Financeiro.data >= form.inicio.data)
         if form.fim.data:
-            query = query.filter(Financeiro.data <= form.fim.data)
+            condicoes.append(Financeiro.data <= form.fim.data)
         if form.tipo.data:
-            query = query.filter(Financeiro.tipo == form.tipo.data)
+            condicoes.append(Financeiro.tipo == form.tipo.data)
         if form.categoria.data:
-            query = query.filter(Financeiro.categoria.ilike(f"%{form.categoria.data}%"))
+            condicoes.append(Financeiro.categoria.ilike(f"%{form.categoria.data}%"))
 
-    registros = query.order_by(Financeiro.data.desc()).all()
+    return form, condicoes
 
-    total = sum(r.valor for r in registros)
-    total_entradas = sum(r.valor for r in registros if r.tipo == "Entrada")
-    total_saidas = sum(r.valor for r in registros if r.tipo == "Saída")
 
-    # Agrupar por categoria para gráfico de pizza
-    por_categoria = defaultdict(float)
-    for r in registros:
-        por_categoria[r.categoria] += float(r.valor)
+@cache.fragmento("financeiro_categorias", Financeiro)
+def _totais_por_categoria(*valores):
+    _, condicoes = _filtros_relatorio(MultiDict(zip(CAMPOS_FILTRO_RELATORIO, valores)))
+    linhas = (
+        db.session.query(Financeiro.categoria, db.func.sum(Financeiro.valor))
+        .filter(*condicoes)
+        .group_by(Financeiro.categoria)
+        .order_by(db.func.sum(Financeiro.valor).desc())
+        .all()
+    )
+    return {
+        "labels": [c for c, _ in linhas],
+        "data": [float(total or 0.0) for _, total in linhas],
+    }
+
 
-    categorias_labels = list(por_categoria.keys())
-    categorias_data = [por_categoria[c] for c in categorias_labels]
+@financeiro_bp.route('/relatorios', methods=['GET'])
+@login_required   # 👈 protege a rota
+def relatorios():
+    form, condicoes = _filtros_relatorio(request.args)
+
+    # Totais calculados no banco (um único GROUP BY tipo)
+    por_tipo = dict(
+        db.session.query(Financeiro.tipo, db.func.sum(Financeiro.valor))
+        .filter(*condicoes)
+        .group_by(Financeiro.tipo)
+        .all()
+    )
+    total = float(sum(v or 0.0 for v in por_tipo.values()))
+    total_entradas = float(por_tipo.get("Entrada") or 0.0)
+    total_saidas = float(por_tipo.get("Saída") or 0.0)
+
+    # Registros paginados por chave (data, id): custo constante por página
+    registros = paginate_keyset(
+        Financeiro.query.filter(*condicoes),
+        (Financeiro.data, Financeiro.id),
+        per_page=50
+    )
+    filtros_url = {k: v for k, v in request.args.items() if k not in ("apos", "antes")}
 
     registrar_log(current_user.nome, "Gerou relatório financeiro", "sucesso")  # 👈 log
     return render_template(
         'financeiro/relatorios.html',
         form=form,
         registros=registros,
+        filtros_url=filtros_url,
         total=total,
         total_entradas=total_entradas,
-        total_saidas=total_saidas,
-        categorias_labels=categorias_labels,
-        categorias_data=categorias_data
+        total_saidas=total_saidas
     )
 
+
+# ➡️ Dados do gráfico por categoria (JSON cacheado, invalidado quando o financeiro muda)
+@financeiro_bp.route('/relatorios/categorias.json')
+@login_required   # 👈 protege a rota
+def relatorios_categorias():
+    valores = [request.args.get(campo, "") for campo in CAMPOS_FILTRO_RELATORIO]
+    return jsonify(_totais_por_categoria(*valores))
+
 @financeiro_bp.route('/export.csv')
+@financeiro_bp.route('/export.<any(xlsx, ods):formato>')
 @login_required   # 👈 protege a rota
-def export_csv():
+def export_csv(formato="csv"):
     inicio_str = request.args.get('inicio')
     fim_str = request.args.get('fim')
     tipo = request.args.get('tipo')
     categoria = request.args.get('categoria')
 
-    query = Financeiro.query
+    query = db.session.query(
+        Financeiro.data, Financeiro.tipo, Financeiro.categoria, Financeiro.conta,
+        Financeiro.descricao, Financeiro.valor, Financeiro.cpf_membro,
+        Financeiro.cnpj_fornecedor, Financeiro.conciliado
+    )
     def parse_date(s):
         return datetime.strptime(s, "%d-%m-%Y").date()
 
@@ -267,27 +348,37 @@ def export_csv():
     if categoria:
         query = query.filter(Financeiro.categoria.ilike(f"%{categoria}%"))
 
-    registros = query.order_by(Financeiro.data.asc()).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';')
-    writer.writerow(["Data", "Tipo", "Categoria", "Conta", "Descrição", "Valor", "CPF Membro", "CNPJ Fornecedor", "Conciliado"])
-    for r in registros:
-        writer.writerow([
-            r.data.strftime("%d-%m-%Y"),
-            r.tipo,
-            r.categoria,
-            r.conta,
-            r.descricao or "",
-            f"{r.valor:.2f}",
-            r.cpf_membro or "",
-            r.cnpj_fornecedor or "",
-            "Sim" if r.conciliado else "Não"
-        ])
-
-    registrar_log(current_user.nome, "Exportou relatório financeiro em CSV", "sucesso")  # 👈 log
-    return Response(output.getvalue(), mimetype='text/csv',
-                    headers={"Content-Disposition": "attachment; filename=relatorio_financeiro.csv"})
+    # 🔹 yield_per: o banco entrega os registros em lotes (cursor no servidor
+    #    no MySQL), então a memória fica constante qualquer que seja o período
+    registros = query.order_by(Financeiro.data.asc(), Financeiro.id.asc()).execution_options(yield_per=1000)
+
+    cabecalho = ["Data", "Tipo", "Categoria", "Conta", "Descrição", "Valor", "CPF Membro", "CNPJ Fornecedor", "Conciliado"]
+    def linhas():
+        for r in registros:
+            yield [
+                r.data.strftime("%d-%m-%Y"),
+                r.tipo,
+                r.categoria,
+                r.conta,
+                r.descricao or "",
+                f"{r.valor:.2f}" if formato == "csv" else round(r.valor, 2),
+                r.cpf_membro or "",
+                r.cnpj_fornecedor or "",
+                "Sim" if r.conciliado else "Não"
+            ]
+
+    mimetype, extensao = FORMATOS[formato]
+    corpo = planilha_stream(formato, cabecalho, linhas(), nome_planilha="Relatório financeiro")
+    headers = {"Content-Disposition": f"attachment; filename=relatorio_financeiro.{extensao}"}
+
+    # 🔹 gzip opcional para formatos texto (o XLSX já é um ZIP); respeita q=0 ("gzip;q=0" recusa)
+    if formato != "xlsx" and request.accept_encodings["gzip"]:
+        corpo = gzip_stream(corpo)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    registrar_log(current_user.nome, f"Exportou relatório financeiro em {formato.upper()}", "sucesso")  # 👈 log
+    return Response(stream_with_context(corpo), mimetype=mimetype, headers=headers)
 
 @financeiro_bp.route('/comprovantes', methods=['GET', 'POST'])
 @login_required   # 👈 protege a rota
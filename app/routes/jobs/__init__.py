@@ -0,0 +1,2 @@
+from .jobs import jobs_bp
+__all__ = ["jobs_bp"]
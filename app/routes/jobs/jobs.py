@@ -0,0 +1,95 @@
+import os
+
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, jsonify, send_file, request
+from flask_login import login_required, current_user
+
+from app.extensions import fila_jobs
+from app.models import Job, EnvioEmail
+from utils.envio_email import resumo_envios
+from utils.pagination import paginate_query
+from utils.logs import registrar_log
+
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/tarefas")
+
+
+def _job_do_usuario(id):
+    """Só o dono da tarefa (ou um admin) pode ver o andamento e baixar o resultado."""
+    job = Job.query.get_or_404(id)
+    if current_user.role != "admin" and job.usuario_id != current_user.id:
+        abort(403)
+    return job
+
+
+# -----------------------------
+# 📋 Minhas tarefas (admin vê todas)
+# -----------------------------
+@jobs_bp.route("/", methods=["GET"])
+@login_required   # 👈 protege a rota
+def listar_jobs():
+    query = Job.query
+    if current_user.role != "admin":
+        query = query.filter(Job.usuario_id == current_user.id)
+    jobs = paginate_query(query.order_by(Job.criado_em.desc(), Job.id.desc()), per_page=20)
+    return render_template("jobs/listar_jobs.html", jobs=jobs)
+
+
+# -----------------------------
+# 🔎 Andamento de uma tarefa
+# -----------------------------
+@jobs_bp.route("/<int:id>", methods=["GET"])
+@login_required   # 👈 protege a rota
+def detalhe_job(id):
+    job = _job_do_usuario(id)
+    return render_template("jobs/detalhe_job.html", job=job, envios=resumo_envios(job.id))
+
+
+# -----------------------------
+# 📧 Situação de cada destinatário (tarefas de e-mail)
+# -----------------------------
+@jobs_bp.route("/<int:id>/envios", methods=["GET"])
+@login_required   # 👈 protege a rota
+def envios_job(id):
+    job = _job_do_usuario(id)
+    situacao = request.args.get("situacao", "")
+    query = EnvioEmail.query.filter(EnvioEmail.job_id == job.id)
+    if situacao:
+        query = query.filter(EnvioEmail.situacao == situacao)
+    envios = paginate_query(query.order_by(EnvioEmail.situacao, EnvioEmail.destinatario), per_page=50)
+    return render_template("jobs/envios_job.html", job=job, envios=envios, situacao=situacao)
+
+
+@jobs_bp.route("/<int:id>/status", methods=["GET"])
+@login_required   # 👈 protege a rota
+def status_job(id):
+    job = _job_do_usuario(id)
+    return jsonify(job.to_dict())
+
+
+# -----------------------------
+# 📥 Download do resultado
+# -----------------------------
+@jobs_bp.route("/<int:id>/download", methods=["GET"])
+@login_required   # 👈 protege a rota
+def download_job(id):
+    job = _job_do_usuario(id)
+    if job.situacao != Job.CONCLUIDO or not job.resultado_arquivo or not os.path.exists(job.resultado_arquivo):
+        flash("O arquivo desta tarefa não está disponível.", "warning")
+        return redirect(url_for("jobs.detalhe_job", id=job.id))
+    return send_file(job.resultado_arquivo, as_attachment=True,
+                     download_name=job.resultado_nome or os.path.basename(job.resultado_arquivo))
+
+
+# -----------------------------
+# 🔁 Tentar de novo (tarefas que falharam)
+# -----------------------------
+@jobs_bp.route("/<int:id>/reenfileirar", methods=["POST"])
+@login_required   # 👈 protege a rota
+def reenfileirar_job(id):
+    job = _job_do_usuario(id)
+    if job.situacao != Job.FALHOU:
+        flash("Só tarefas que falharam podem ser reenfileiradas.", "warning")
+    else:
+        fila_jobs.reenfileirar(job.id)
+        registrar_log(current_user.nome, f"Reenfileirou a tarefa #{job.id} ({job.tipo})")
+        flash("Tarefa colocada de volta na fila.", "success")
+    return redirect(url_for("jobs.detalhe_job", id=job.id))
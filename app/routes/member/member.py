@@ -1,22 +1,23 @@
-import os
 from datetime import datetime, date
-from collections import Counter
 
 from flask import (
     Blueprint, render_template, request, redirect, url_for,
-    flash, current_app, make_response, Response
+    flash, current_app, make_response, Response, abort, jsonify
 )
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
 from werkzeug.datastructures import CombinedMultiDict
-from sqlalchemy import func
-from weasyprint import HTML  # ➕ para gerar PDF
 
 from utils.pagination import paginate_query
+from utils.busca import buscar_membros_query
 from app.models import Member, PublicLink        # 👈 importa os modelos
-from app.models.log import Log, registrar_log    # 👈 modelo de log
+from utils.logs import registrar_log             # 👈 importa função de log
 from app.routes.member.forms import MemberForm   # 👈 formulário
-from app.extensions import db
+from app.extensions import db, renderizador_pdf, fila_jobs   # ➕ PDFs no pool / tarefas em segundo plano
+from utils.pdf import escopo_membro
+from utils.links_publicos import link_ativo, rotacionar_link
+from utils.aniversarios import filtrar_mes, proximos_aniversariantes
+from utils.estatisticas import distribuicoes_membros
+from utils.imagens import ErroImagem, foto_variante, salvar_foto
 
 
 member_bp = Blueprint('member', __name__, url_prefix="/membros")
@@ -32,18 +33,13 @@ def listar_membros():
 
     membros = Member.query.order_by(Member.nome.asc()).paginate(page=page, per_page=10)
 
-    # 🔹 Busca o último link de visitante ativo
-    visitante_link = PublicLink.query.filter_by(tipo="visitante", ativo=True).order_by(PublicLink.data_criacao.desc()).first()
+    # 🔹 Link de visitante ativo (em cache; a listagem não grava nada no banco)
+    visitante_hash = link_ativo("visitante")
 
-    # Se não existir, cria um novo
-    if not visitante_link:
-        novo_hash = PublicLink.gerar_hash()
-        visitante_link = PublicLink(tipo="visitante", hash=novo_hash)
-        db.session.add(visitante_link)
-        db.session.commit()
-
-    # Monta a URL pública
-    visitante_link_url = url_for("member.cadastro_visitante", hash=visitante_link.hash, _external=True)
+    # Monta a URL pública (sem link, o admin gera pelo modal)
+    visitante_link_url = None
+    if visitante_hash:
+        visitante_link_url = url_for("member.cadastro_visitante", hash=visitante_hash, _external=True)
 
     return render_template(
         "membros/listar_membros.html",
@@ -53,6 +49,20 @@ def listar_membros():
     )
 
 
+# -----------------------------
+# 🔄 Gerar novo link de visitante (invalida o anterior)
+# -----------------------------
+@member_bp.route("/link-visitante/rotacionar", methods=["POST"])
+@login_required   # 👈 protege a rota
+def rotacionar_link_visitante():
+    if current_user.role != "admin":
+        abort(403)
+    rotacionar_link("visitante")
+    registrar_log(current_user.nome, "Gerou novo link de cadastro de visitantes")
+    flash("Novo link de cadastro de visitantes gerado. O link anterior deixou de funcionar.", "success")
+    return redirect(url_for("member.listar_membros"))
+
+
 # -----------------------------
 # 🔍 Buscar Membros
 # -----------------------------
@@ -62,15 +72,8 @@ def buscar_membros():
     termo = request.args.get("q", "").strip().lower()
     page = request.args.get("page", 1, type=int)
 
-    query = Member.query
-    if termo:
-        query = query.filter(
-            (Member.nome.ilike(f"%{termo}%")) |
-            (Member.email.ilike(f"%{termo}%")) |
-            (Member.funcao.ilike(f"%{termo}%"))
-        )
-
-    query = query.order_by(Member.nome.asc())
+    # 🔹 Busca textual (FTS/FULLTEXT) ordenada por relevância
+    query = buscar_membros_query(termo)
     membros = query.paginate(page=page, per_page=10)
 
     if termo:
@@ -137,15 +140,13 @@ def cadastro_membro():
             data_saida=form.data_saida.data
         )
 
-        # Upload da foto
+        # Upload da foto (mestra + variantes sem EXIF, nome pelo conteúdo)
         foto_file = form.foto.data
         if foto_file:
-            filename = secure_filename(foto_file.filename)
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_folder, exist_ok=True)
-            foto_path = os.path.join(upload_folder, filename)
-            foto_file.save(foto_path)
-            membro.foto = f"uploads/{filename}"
+            try:
+                membro.foto = f"uploads/{salvar_foto(foto_file, current_app.config['UPLOAD_FOLDER'])}"
+            except ErroImagem as e:
+                flash(f"Foto não salva: {e}", "warning")
 
         db.session.add(membro)
         db.session.commit()
@@ -204,15 +205,13 @@ def editar_membro(id):
         # membro.data_saida = form.data_saida.data or membro.data_saida
         membro.data_saida = form.data_saida.data if form.data_saida.data else None
 
-        # Upload da foto
+        # Upload da foto (mestra + variantes sem EXIF, nome pelo conteúdo)
         foto_file = form.foto.data
         if foto_file:
-            filename = secure_filename(foto_file.filename)
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_folder, exist_ok=True)
-            foto_path = os.path.join(upload_folder, filename)
-            foto_file.save(foto_path)
-            membro.foto = f"uploads/{filename}"
+            try:
+                membro.foto = f"uploads/{salvar_foto(foto_file, current_app.config['UPLOAD_FOLDER'])}"
+            except ErroImagem as e:
+                flash(f"Foto não salva: {e}", "warning")
 
         if "remover_foto" in request.form:
             membro.foto = None
@@ -264,18 +263,15 @@ def aniversariantes_mes():
     if not mes:
         mes = datetime.now().month
 
-    # Query base
-    query = Member.query.filter(Member.data_nascimento.isnot(None))
-    query = query.filter(func.extract('month', Member.data_nascimento) == mes)
-
+    # Query base (mês/dia pelo índice ix_members_aniversario)
+    query = Member.query
     if funcao:
         query = query.filter(Member.funcao == funcao)
-    if dia_inicio and dia_fim:
-        query = query.filter(func.extract('day', Member.data_nascimento).between(dia_inicio, dia_fim))
+    query = filtrar_mes(query, mes, dia_inicio, dia_fim)
 
     # 🔹 Paginação: ajuste o parâmetro `per_page` para definir quantos membros aparecem por página.
     # Exemplo: per_page=12 → só aparece paginação se houver mais de 12 membros.
-    aniversariantes = query.order_by(func.extract('day', Member.data_nascimento)).paginate(page=page, per_page=12)
+    aniversariantes = query.paginate(page=page, per_page=12)
 
     meses = [
         "Janeiro","Fevereiro","Março","Abril","Maio","Junho",
@@ -298,6 +294,27 @@ def aniversariantes_mes():
     )
 
 
+# -----------------------------
+# 🎂 Próximos aniversariantes (JSON, atravessa meses e a virada do ano)
+# -----------------------------
+@member_bp.route("/aniversariantes/proximos", methods=["GET"])
+@login_required
+def proximos_aniversariantes_json():
+    dias = request.args.get("dias", 30, type=int)
+    limite = request.args.get("limite", 50, type=int)
+    aniversariantes = proximos_aniversariantes(dias=dias, limite=min(max(limite, 1), 500))
+    return jsonify([
+        {
+            "id": a["id"],
+            "nome": a["nome"],
+            "data": a["proximo"].isoformat(),
+            "dias": a["dias"],
+            "idade": a["idade"],
+        }
+        for a in aniversariantes
+    ])
+
+
 # -----------------------------
 # 🪪 Carteira de Membro (HTML)
 # -----------------------------
@@ -307,6 +324,33 @@ def carteira_membro(id):
     membro = Member.query.get_or_404(id)
     return render_template("membros/carteira_modelo.html", membro=membro)
 
+# -----------------------------
+# 🪪 Carteirinhas em Lote (PDF para impressão)
+# -----------------------------
+@member_bp.route("/carteiras/lote", methods=["GET", "POST"])
+@login_required   # 👈 protege a rota
+def carteiras_lote():
+    if request.method == "POST":
+        status = request.form.get("status") or None
+        funcao = request.form.get("funcao") or None
+        validade_ate = None
+        if request.form.get("validade_ate"):
+            try:
+                validade_ate = datetime.strptime(request.form["validade_ate"], "%Y-%m-%d").date()
+            except ValueError:
+                flash("Data de validade inválida.", "danger")
+                return redirect(url_for("member.carteiras_lote"))
+
+        job = fila_jobs.enfileirar(
+            "carteiras_lote", usuario=current_user.nome, usuario_id=current_user.id,
+            status=status, funcao=funcao, validade_ate=validade_ate,
+        )
+        registrar_log(current_user.nome, "Gerou carteirinhas em lote")
+        flash("Geração das carteirinhas iniciada. Acompanhe o andamento abaixo.", "info")
+        return redirect(url_for("jobs.detalhe_job", id=job.id))
+
+    return render_template("membros/carteiras_lote.html")
+
 # -----------------------------
 # 📄 Carta de Recomendação (HTML + PDF)
 # -----------------------------
@@ -320,7 +364,7 @@ def carta_recomendacao(id):
         membro=membro,
         data_emissao=datetime.now().strftime("%d/%m/%Y")
     )
-    pdf = HTML(string=html_string).write_pdf()
+    pdf = renderizador_pdf.gerar("membros/carta_recomendacao.html", html_string, escopo_membro(membro.id))
 
     response = make_response(pdf)
     response.headers['Content-Type'] = 'application/pdf'
@@ -337,7 +381,7 @@ def imprimir_ficha_pdf(id):
 
     foto_url = None
     if membro.foto:
-        foto_url = url_for('static', filename=membro.foto, _external=True)
+        foto_url = url_for('static', filename=foto_variante(membro.foto, 'impressao'), _external=True)
 
     html = render_template(
         'membros/ficha_pdf.html',
@@ -345,7 +389,7 @@ def imprimir_ficha_pdf(id):
         foto_url=foto_url,
         current_date=date.today()
     )
-    pdf = HTML(string=html).write_pdf()
+    pdf = renderizador_pdf.gerar('membros/ficha_pdf.html', html, escopo_membro(membro.id))
     response = make_response(pdf)
     response.headers['Content-Type'] = 'application/pdf'
     response.headers['Content-Disposition'] = f'inline; filename=ficha_{membro.id}.pdf'
@@ -372,64 +416,23 @@ def relatorio_membros():
     if funcao:
         query = query.filter(Member.funcao == funcao)
 
-    membros = query.all()
+    # 🔹 Todas as distribuições (inclusive faixa etária) numa única consulta
+    dist = distribuicoes_membros(query)
 
-    dist_sexo_raw = (
-        query.with_entities(Member.sexo, func.count(Member.id))
-        .group_by(Member.sexo)
-        .all()
-    )
-    dist_status_raw = (
-        query.with_entities(Member.status, func.count(Member.id))
-        .group_by(Member.status)
-        .all()
-    )
-    dist_estado_civil_raw = (
-        query.with_entities(Member.estado_civil, func.count(Member.id))
-        .group_by(Member.estado_civil)
-        .all()
-    )
-    dist_funcao_raw = (
-        query.with_entities(Member.funcao, func.count(Member.id))
-        .group_by(Member.funcao)
-        .all()
-    )
-
-    dist_sexo = [((s or "Não informado"), int(c)) for s, c in dist_sexo_raw]
-    dist_status = [((st or "Não informado"), int(c)) for st, c in dist_status_raw]
-    dist_estado_civil = [((ec or "Não informado"), int(c)) for ec, c in dist_estado_civil_raw]
-    dist_funcao = [((f or "Não informado"), int(c)) for f, c in dist_funcao_raw]
-
-    def calcula_idade(nasc):
-        if not nasc:
-            return None
-        hoje = date.today()
-        return hoje.year - nasc.year - ((hoje.month, hoje.day) < (nasc.month, nasc.day))
-
-    faixas = []
-    for m in membros:
-        idade = calcula_idade(m.data_nascimento)
-        if idade is None:
-            continue
-        if idade <= 18:
-            faixas.append("0-18")
-        elif idade <= 35:
-            faixas.append("19-35")
-        elif idade <= 60:
-            faixas.append("36-60")
-        else:
-            faixas.append("60+")
-
-    dist_idade = Counter(faixas)
+    # 🔹 Lista paginada (antes era renderizada inteira)
+    membros = paginate_query(query.order_by(Member.nome.asc()), per_page=20)
 
     return render_template(
         "membros/relatorio_membros.html",
         membros=membros,
-        dist_sexo=dist_sexo,
-        dist_status=dist_status,
-        dist_estado_civil=dist_estado_civil,
-        dist_funcao=dist_funcao,
-        dist_idade=dist_idade,
+        total_membros=dist["total"],
+        dist_sexo=dist["sexo"],
+        dist_status=dist["status"],
+        dist_estado_civil=dist["estado_civil"],
+        dist_funcao=dist["funcao"],
+        dist_idade=dist["idade"],
+        filtros={k: v for k, v in
+                 dict(sexo=sexo, status=status, estado_civil=estado_civil, funcao=funcao).items() if v},
     )
 
 # ----------------------------------------
@@ -464,8 +467,8 @@ def relatorio_membros_pdf():
         funcao=funcao,
         data_emissao=date.today().strftime("%d/%m/%Y")
     )
-    # Gera o PDF com WeasyPrint
-    pdf = HTML(string=html).write_pdf()
+    # Gera o PDF com WeasyPrint (no pool, com cache)
+    pdf = renderizador_pdf.gerar("membros/relatorio_membros_pdf.html", html, "membros")
 
     return Response(
         pdf,
@@ -568,18 +571,11 @@ def exportar_aniversariantes_pdf():
     if not mes:
         mes = datetime.now().month
 
-    # 🔹 Filtros diretos
-    query = Member.query.filter(Member.data_nascimento.isnot(None))
-    query = query.filter(func.extract('month', Member.data_nascimento) == mes)
-
+    # 🔹 Filtros diretos (mês/dia pelo índice ix_members_aniversario)
+    query = Member.query
     if funcao:
         query = query.filter(Member.funcao == funcao)
-    if dia_inicio and dia_fim:
-        query = query.filter(
-            func.extract('day', Member.data_nascimento).between(dia_inicio, dia_fim)
-        )
-
-    aniversariantes = query.order_by(Member.data_nascimento).all()
+    aniversariantes = filtrar_mes(query, mes, dia_inicio, dia_fim).all()
 
     # 🔹 Data de emissão (somente dia/mês/ano)
     data_emissao = datetime.now().strftime("%d/%m/%Y")
@@ -592,7 +588,7 @@ def exportar_aniversariantes_pdf():
         data_emissao=data_emissao
     )
 
-    pdf = HTML(string=html).write_pdf()
+    pdf = renderizador_pdf.gerar("membros/aniversariantes_pdf.html", html, "membros")
     response = make_response(pdf)
     response.headers["Content-Type"] = "application/pdf"
     response.headers["Content-Disposition"] = "inline; filename=aniversariantes.pdf"
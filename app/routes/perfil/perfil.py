@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, flash, redirect, url_for, request
 from flask_login import login_required, current_user
-from app.extensions import db
+from app.extensions import db, cache_usuarios
 from app.models import User
 from .forms import EditarPerfilForm, AlterarSenhaForm
 from utils.logs import registrar_log   # ✅ importar o logger
@@ -15,6 +15,7 @@ def meu_perfil():
         if current_user.check_password(form.senha_atual.data):
             current_user.set_password(form.nova_senha.data)
             db.session.commit()
+            cache_usuarios.invalidar(current_user.id)
             registrar_log(current_user.nome, "Alterou a própria senha", "sucesso")  # ✅ log
             flash("Senha alterada com sucesso!", "success")
             return redirect(url_for("perfil.meu_perfil"))
@@ -40,6 +41,7 @@ def editar_perfil():
         # ❌ Foto removida daqui, será gerenciada apenas em Configurações
 
         db.session.commit()
+        cache_usuarios.invalidar(current_user.id)
         registrar_log(current_user.nome, "Editou o próprio perfil", "sucesso")  # ✅ log
         flash("Perfil atualizado com sucesso!", "success")
         return redirect(url_for("perfil.meu_perfil"))
@@ -54,6 +56,7 @@ def alterar_senha():
         if current_user.check_password(form.senha_atual.data):
             current_user.set_password(form.nova_senha.data)
             db.session.commit()
+            cache_usuarios.invalidar(current_user.id)
             registrar_log(current_user.nome, "Alterou a senha no perfil do usuário", "sucesso")  # ✅ log
             flash("Senha alterada com sucesso!", "success")
             return redirect(url_for("perfil.meu_perfil"))
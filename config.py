@@ -40,6 +40,64 @@ class Config:
         os.environ.get('MAIL_DEFAULT_EMAIL', 'mail@mail.com')
     )
 
+    # Envio em lote (lembretes de eventos)
+    MAIL_MODO = os.environ.get('MAIL_MODO', 'bcc')                     # "bcc" (lotes em cópia oculta) ou "individual"
+    MAIL_LOTE_BCC = int(os.environ.get('MAIL_LOTE_BCC', 50))           # destinatários por mensagem no modo bcc
+    MAIL_POR_CONEXAO = int(os.environ.get('MAIL_POR_CONEXAO', 100))    # mensagens antes de reabrir a conexão SMTP
+    MAIL_LIMITE_POR_MINUTO = int(os.environ.get('MAIL_LIMITE_POR_MINUTO', 0))   # destinatários/minuto (0 = sem limite)
+    MAIL_URL_BASE = os.environ.get('MAIL_URL_BASE')                    # endereço do sistema nos links (ex: https://sigi.igreja.org/)
+
+    # -----------------------------
+    # 🧠 Cache dos widgets do dashboard
+    # -----------------------------
+    # "memoria" (LRU por processo), "sqlite" (arquivo compartilhado entre processos) ou "nenhum"
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memoria')
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+    CACHE_MAX_ITENS = int(os.environ.get('CACHE_MAX_ITENS', 256))
+    CACHE_PATH = os.environ.get('CACHE_PATH')   # padrão: instance/cache.sqlite
+
+    # -----------------------------
+    # 📝 Logs de auditoria
+    # -----------------------------
+    # Gravados em lote por uma thread de fundo; "False" grava cada log na hora
+    LOG_ASSINCRONO = os.environ.get('LOG_ASSINCRONO', 'True') == 'True'
+    LOG_FILA_MAX = int(os.environ.get('LOG_FILA_MAX', 10000))     # acima disso os logs são descartados (e contados)
+    LOG_LOTE = int(os.environ.get('LOG_LOTE', 200))                # registros por INSERT
+    LOG_INTERVALO = float(os.environ.get('LOG_INTERVALO', 2))      # segundos entre gravações
+    LOG_RETENCAO_DIAS = int(os.environ.get('LOG_RETENCAO_DIAS', 30))  # usado por `flask logs purgar`
+
+    # -----------------------------
+    # 🖨️ PDFs (WeasyPrint em pool de processos + cache em disco)
+    # -----------------------------
+    PDF_PROCESSOS = int(os.environ.get('PDF_PROCESSOS', 2))             # 0 = gera na própria requisição
+    PDF_CONTEXTO = os.environ.get('PDF_CONTEXTO', 'spawn')
+    PDF_PYTHON = os.environ.get('PDF_PYTHON')                           # ex.: /var/www/sigi/venv/bin/python
+    PDF_TIMEOUT = int(os.environ.get('PDF_TIMEOUT', 60))
+    PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR')                     # padrão: instance/pdf_cache
+    PDF_CACHE_MAX_MB = int(os.environ.get('PDF_CACHE_MAX_MB', 200))
+
+    # -----------------------------
+    # ⏳ Fila de tarefas em segundo plano (tabela jobs)
+    # -----------------------------
+    JOBS_WORKER_EMBUTIDO = os.environ.get('JOBS_WORKER_EMBUTIDO', 'True') == 'True'   # False com `flask jobs worker`
+    JOBS_THREADS = int(os.environ.get('JOBS_THREADS', 2))
+    JOBS_TENTATIVAS = int(os.environ.get('JOBS_TENTATIVAS', 3))
+    JOBS_BACKOFF = int(os.environ.get('JOBS_BACKOFF', 30))            # segundos; dobra a cada nova tentativa
+    JOBS_TIMEOUT = int(os.environ.get('JOBS_TIMEOUT', 1800))          # "executando" há mais que isso volta à fila
+    JOBS_DIR = os.environ.get('JOBS_DIR')                             # padrão: instance/jobs
+    JOBS_RETENCAO_DIAS = int(os.environ.get('JOBS_RETENCAO_DIAS', 7))
+
+    # -----------------------------
+    # 💾 Backups incrementais e agendados (banco + uploads)
+    # -----------------------------
+    BACKUP_DIR = os.environ.get('BACKUP_DIR')                         # padrão: instance/backups
+    BACKUP_COMPRESSAO = os.environ.get('BACKUP_COMPRESSAO', 'deflate')  # deflate, bzip2 ou xz
+    BACKUP_HORARIO = os.environ.get('BACKUP_HORARIO', '02:30')        # usado por `flask backup agendar`
+    BACKUP_RETER_DIARIOS = int(os.environ.get('BACKUP_RETER_DIARIOS', 7))
+    BACKUP_RETER_SEMANAIS = int(os.environ.get('BACKUP_RETER_SEMANAIS', 4))
+    BACKUP_RETER_MENSAIS = int(os.environ.get('BACKUP_RETER_MENSAIS', 12))
+    BACKUP_VERIFICAR_URL = os.environ.get('BACKUP_VERIFICAR_URL')     # banco de rascunho (MySQL/PostgreSQL)
+
     # -----------------------------
     # ⏱️ Sessão e Cookies
     # -----------------------------
@@ -49,6 +107,10 @@ class Config:
     # Duração do cookie "remember me" do Flask-Login
     REMEMBER_COOKIE_DURATION = timedelta(minutes=int(os.environ.get('REMEMBER_TIMEOUT', 30)))
 
+    # Segundos que o usuário logado fica em cache no processo (0 = consulta o banco a cada requisição);
+    # é o atraso máximo para um usuário desativado perder o acesso nos outros processos
+    LOGIN_CACHE_TTL = int(os.environ.get('LOGIN_CACHE_TTL', 10))
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
@@ -0,0 +1,89 @@
+"""
+Benchmark de regressão dos indicadores por ano do dashboard.
+
+Popula um banco SQLite em memória com N anos de histórico de membros e
+confere que `indicadores_por_ano()` executa sempre o mesmo número de
+queries, qualquer que seja N.
+
+Uso (na raiz do projeto):
+    python scripts/bench_dashboard.py
+"""
+import os
+import sys
+import time
+import random
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import Member
+from utils.estatisticas import indicadores_por_ano
+
+MEMBROS_POR_ANO = 50
+
+
+def criar_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def popular(anos):
+    db.session.query(Member).delete()
+    ano_final = date.today().year
+    for ano in range(ano_final - anos + 1, ano_final + 1):
+        for i in range(MEMBROS_POR_ANO):
+            saida = None
+            if random.random() < 0.2:
+                saida = date(random.randint(ano, ano_final), random.randint(1, 12), 1)
+            db.session.add(Member(
+                nome=f"Membro {ano}-{i}",
+                data_cadastro=date(ano, random.randint(1, 12), 1),
+                data_saida=saida,
+            ))
+    db.session.commit()
+
+
+def medir(anos):
+    popular(anos)
+    queries = []
+    ouvinte = lambda conn, cursor, statement, *args: queries.append(statement)  # noqa: E731
+
+    event.listen(db.engine, "before_cursor_execute", ouvinte)
+    try:
+        inicio = time.perf_counter()
+        indicadores = indicadores_por_ano(total_membros=anos * MEMBROS_POR_ANO)
+        duracao = time.perf_counter() - inicio
+    finally:
+        event.remove(db.engine, "before_cursor_execute", ouvinte)
+
+    assert len(indicadores) == anos
+    return len(queries), duracao
+
+
+def main():
+    random.seed(42)
+    app = criar_app()
+    with app.app_context():
+        db.create_all()
+
+        resultados = []
+        for anos in (1, 5, 20, 50):
+            qtd_queries, duracao = medir(anos)
+            resultados.append(qtd_queries)
+            print(f"{anos:>3} ano(s): {qtd_queries} query(s) em {duracao * 1000:.1f} ms")
+
+    if len(set(resultados)) != 1:
+        print("❌ O número de queries varia com a quantidade de anos.")
+        sys.exit(1)
+    print("✅ Número de queries constante.")
+
+
+if __name__ == "__main__":
+    main()
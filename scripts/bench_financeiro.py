@@ -0,0 +1,96 @@
+"""
+Benchmark da página de visão geral do financeiro.
+
+Popula um banco SQLite temporário com 100 mil e 1 milhão de lançamentos e
+mede o tempo do resumo (totais pelo rollup + gráfico dos últimos 6 meses
+com GROUP BY no banco). O volume dos últimos 6 meses é fixo e o restante
+é histórico antigo: a latência deve ficar praticamente igual nos dois
+tamanhos, porque só a janela de 6 meses é lida do livro-caixa.
+
+Uso (na raiz do projeto):
+    python scripts/bench_financeiro.py [quantidade ...]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask
+
+from app.extensions import db
+from app.models import Financeiro, FinanceiroStatsMensal
+from utils.estatisticas import reconstruir_estatisticas
+from app.routes.financeiro.financeiro import resumo_mensal
+
+REPETICOES = 20
+LOTE = 50_000
+RECENTES = 5_000   # lançamentos nos últimos 6 meses (movimento de uma igreja grande)
+
+
+def criar_app(caminho):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{caminho}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def popular(quantidade):
+    """Insere lançamentos em lote pelo Core (sem eventos) e reconstrói o rollup."""
+    hoje = date.today()
+    atual = db.session.query(db.func.count(Financeiro.id)).scalar()
+    while atual < quantidade:
+        n = min(LOTE, quantidade - atual)
+        # os primeiros RECENTES caem na janela do gráfico; o resto é histórico (7 meses a 30 anos atrás)
+        recente = atual < RECENTES
+        if recente:
+            n = min(n, RECENTES - atual)
+        db.session.execute(Financeiro.__table__.insert(), [
+            {
+                "data": hoje - timedelta(days=random.randint(0, 150) if recente
+                                         else random.randint(215, 30 * 365)),
+                "valor": round(random.uniform(5, 500), 2),
+                "tipo": random.choice(("Entrada", "Saída")),
+                "categoria": "Benchmark",
+                "conta": "Caixa",
+            }
+            for _ in range(n)
+        ])
+        db.session.commit()
+        atual += n
+    reconstruir_estatisticas()
+
+
+def medir():
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        dict(
+            db.session.query(FinanceiroStatsMensal.tipo, db.func.sum(FinanceiroStatsMensal.total))
+            .group_by(FinanceiroStatsMensal.tipo)
+            .all()
+        )
+        resumo_mensal(6)
+    return (time.perf_counter() - inicio) / REPETICOES
+
+
+def main():
+    random.seed(42)
+    tamanhos = [int(t) for t in sys.argv[1:]] or [100_000, 1_000_000]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        app = criar_app(os.path.join(pasta, "bench.db"))
+        with app.app_context():
+            db.create_all()
+            for quantidade in sorted(tamanhos):
+                popular(quantidade)
+                print(f"{quantidade:>9} lançamentos: {medir() * 1000:.2f} ms por resumo")
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark da montagem dos lembretes de eventos personalizados.
+
+Monta N corpos de e-mail (um por membro, com nome e link pessoal) de três
+formas e mede mensagens por segundo:
+- render_template() a cada destinatário (como era antes);
+- template pré-compilado, template.render() por destinatário;
+- CorpoLembrete (pedaços pré-renderizados + nome/link escapados).
+Mede também o pico de memória de gerar todos os corpos numa lista versus
+consumi-los um a um, como faz enviar_em_lote(). Nada é enviado.
+
+Uso (na raiz do projeto):
+    python scripts/bench_lembretes.py [N]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask, render_template
+
+from app.models import Evento
+from app.routes.event import event_bp
+from utils.lembretes import CorpoLembrete, TEMPLATE_LEMBRETE
+
+URL_BASE = "https://sigi.exemplo.com/"
+
+
+def criar_app():
+    raiz = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    app = Flask(__name__, template_folder=os.path.join(raiz, "app", "templates"))
+    app.config["SECRET_KEY"] = "bench"
+    app.register_blueprint(event_bp)
+    return app
+
+
+def criar_evento():
+    inicio = datetime.now() + timedelta(days=2)
+    return Evento(
+        titulo="Conferência de Jovens", tipo="conferencia", descricao="Três dias de louvor & comunhão",
+        data_inicio=inicio, data_fim=inicio + timedelta(hours=3), local="Templo sede",
+        organizador="Ministério de Jovens", public_token="a1b2c3d4e5f6",
+    )
+
+
+def medir(nome, montar, nomes):
+    inicio = time.perf_counter()
+    for n in nomes:
+        montar(n)
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<28} {len(nomes) / duracao:>10,.0f} msg/s  ({duracao * 1000:.0f} ms)")
+    return duracao
+
+
+def pico_memoria(gerar):
+    tracemalloc.start()
+    gerar()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 1024 / 1024
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    nomes = [f"Membro {i} da Silva" for i in range(quantidade)]
+
+    app = criar_app()
+    with app.test_request_context(base_url=URL_BASE):
+        evento = criar_evento()
+        corpo = CorpoLembrete(evento, URL_BASE)
+        if corpo._partes is None:
+            print("❌ O template não pôde ser pré-renderizado em pedaços.")
+            sys.exit(1)
+
+        template = app.jinja_env.get_template(TEMPLATE_LEMBRETE)
+        por_template = lambda n: render_template(  # noqa: E731
+            TEMPLATE_LEMBRETE, evento=evento, nome=n, link=corpo.link_pessoal(n))
+        pre_compilado = lambda n: template.render(  # noqa: E731
+            evento=evento, nome=n, link=corpo.link_pessoal(n))
+
+        # as três formas precisam gerar exatamente o mesmo HTML
+        for n in (nomes[0], 'Ana "Bia" <Costa> & Cia'):
+            if not (por_template(n) == pre_compilado(n) == corpo(n)):
+                print("❌ Os corpos gerados divergem.")
+                sys.exit(1)
+
+        print(f"{quantidade} destinatário(s):")
+        lento = medir("render_template()", por_template, nomes)
+        medir("template pré-compilado", pre_compilado, nomes)
+        rapido = medir("CorpoLembrete", corpo, nomes)
+
+        em_lista = pico_memoria(lambda: [corpo(n) for n in nomes])
+        em_fluxo = pico_memoria(lambda: sum(len(corpo(n)) for n in nomes))
+        print(f"pico de memória: {em_lista:.1f} MB em lista, {em_fluxo:.2f} MB sob demanda")
+
+    if rapido >= lento:
+        print("❌ CorpoLembrete não foi mais rápido que render_template().")
+        sys.exit(1)
+    print(f"✅ {lento / rapido:.1f}x mais rápido que render_template().")
+
+
+if __name__ == "__main__":
+    main()
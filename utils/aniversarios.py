@@ -0,0 +1,113 @@
+import calendar
+from datetime import date, timedelta
+
+from sqlalchemy import and_, or_, case, func, update
+
+from app.extensions import db
+from app.models import Member
+
+# -----------------------------
+# 🎂 Consultas de aniversariantes
+# -----------------------------
+# Usam as colunas mes_nascimento/dia_nascimento (índice ix_members_aniversario)
+# em vez de extract('month'/'day', data_nascimento), que obriga o banco a
+# varrer a tabela inteira. As colunas são mantidas pelo próprio modelo;
+# para registros antigos rode `flask membros aniversarios`.
+
+
+def filtrar_mes(query, mes, dia_inicio=None, dia_fim=None):
+    """Aniversariantes do mês (opcionalmente entre dois dias), ordenados por dia."""
+    query = query.filter(Member.mes_nascimento == mes)
+    if dia_inicio and dia_fim:
+        query = query.filter(Member.dia_nascimento.between(dia_inicio, dia_fim))
+    return query.order_by(Member.dia_nascimento, Member.nome)
+
+
+def _intervalo(inicio, fim):
+    """Condição para (mês, dia) entre inicio e fim, com inicio <= fim no mesmo ano."""
+    if inicio.month == fim.month:
+        return and_(Member.mes_nascimento == inicio.month,
+                    Member.dia_nascimento.between(inicio.day, fim.day))
+    return or_(
+        and_(Member.mes_nascimento == inicio.month, Member.dia_nascimento >= inicio.day),
+        Member.mes_nascimento.between(inicio.month + 1, fim.month - 1),
+        and_(Member.mes_nascimento == fim.month, Member.dia_nascimento <= fim.day),
+    )
+
+
+def proximo_aniversario(nascimento, hoje=None):
+    """Data do próximo aniversário (29/02 vira 01/03 em anos não bissextos)."""
+    hoje = hoje or date.today()
+    for ano in (hoje.year, hoje.year + 1):
+        if nascimento.month == 2 and nascimento.day == 29 and not calendar.isleap(ano):
+            proximo = date(ano, 3, 1)
+        else:
+            proximo = date(ano, nascimento.month, nascimento.day)
+        if proximo >= hoje:
+            return proximo
+
+
+def proximos_aniversariantes(dias=30, hoje=None, limite=None, query=None):
+    """
+    Aniversariantes de hoje até hoje + `dias`, atravessando meses e a virada
+    do ano, na ordem em que os aniversários acontecem.
+    Devolve dicts com nome, data_nascimento, proximo (data), dias (até lá) e idade (que vai completar).
+    """
+    hoje = hoje or date.today()
+    dias = max(0, min(int(dias), 365))
+    fim = hoje + timedelta(days=dias)
+
+    query = query if query is not None else Member.query
+    if dias >= 365:
+        condicao = Member.mes_nascimento.isnot(None)
+    elif fim.year == hoje.year:
+        condicao = _intervalo(hoje, fim)
+    else:
+        # virada do ano: até 31/12 e depois a partir de 01/01
+        condicao = or_(_intervalo(hoje, date(hoje.year, 12, 31)), _intervalo(date(fim.year, 1, 1), fim))
+
+    # em 01/03 de ano não bissexto entram também os nascidos em 29/02 (é o dia deles);
+    # a condição é exata, para que o LIMIT valha sobre quem está de fato na janela
+    nascido_29_02 = and_(Member.mes_nascimento == 2, Member.dia_nascimento == 29)
+    hoje_e_dia_29_02 = (hoje.month, hoje.day) == (3, 1) and not calendar.isleap(hoje.year)
+    if hoje_e_dia_29_02:
+        condicao = or_(condicao, nascido_29_02)
+
+    # quem já passou neste ano (antes de hoje) vem depois, no ano seguinte
+    passou = or_(Member.mes_nascimento < hoje.month,
+                 and_(Member.mes_nascimento == hoje.month, Member.dia_nascimento < hoje.day))
+    if hoje_e_dia_29_02:
+        passou = and_(passou, ~nascido_29_02)
+    ja_passou = case((passou, 1), else_=0)
+    query = (query.filter(condicao)
+             .with_entities(Member.id, Member.nome, Member.data_nascimento)
+             .order_by(ja_passou, Member.mes_nascimento, Member.dia_nascimento, Member.nome))
+    if limite:
+        query = query.limit(limite)
+
+    resultado = []
+    for id_, nome, nascimento in query.all():
+        proximo = proximo_aniversario(nascimento, hoje)
+        resultado.append({
+            "id": id_,
+            "nome": nome,
+            "data_nascimento": nascimento,
+            "proximo": proximo,
+            "dias": (proximo - hoje).days,
+            "idade": proximo.year - nascimento.year,
+        })
+    return resultado
+
+
+def preencher_aniversarios():
+    """Preenche mes_nascimento/dia_nascimento dos membros cadastrados antes das colunas existirem."""
+    tabela = Member.__table__
+    with db.engine.begin() as conn:
+        resultado = conn.execute(
+            update(tabela)
+            .where(tabela.c.data_nascimento.isnot(None))
+            .where(or_(tabela.c.mes_nascimento.is_(None), tabela.c.dia_nascimento.is_(None)))
+            .values(mes_nascimento=func.extract("month", tabela.c.data_nascimento),
+                    dia_nascimento=func.extract("day", tabela.c.data_nascimento))
+        )
+    return resultado.rowcount
@@ -0,0 +1,157 @@
+import os
+import queue
+import atexit
+import threading
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+# -----------------------------
+# 📝 Registro de auditoria (tabela logs) em lote
+# -----------------------------
+# Os registros entram numa fila limitada em memória e uma thread de fundo
+# grava tudo com INSERTs em lote, numa conexão própria — a requisição não
+# paga mais um commit extra por ação. Com LOG_ASSINCRONO=False cada
+# registro é gravado na hora (útil em scripts e testes).
+
+
+class RegistradorAuditoria:
+    def __init__(self, app=None):
+        self._app = None
+        self.assincrono = True
+        self.fila_max = 10000
+        self.lote = 200
+        self.intervalo = 2.0
+
+        self._fila = None
+        self._thread = None
+        self._pid = None
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._trava = threading.Lock()
+
+        self.descartados = 0
+        self.gravados = 0
+        self.lotes = 0
+        self.falhas = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.assincrono = app.config.get("LOG_ASSINCRONO", True)
+        self.fila_max = app.config.get("LOG_FILA_MAX", 10000)
+        self.lote = app.config.get("LOG_LOTE", 200)
+        self.intervalo = app.config.get("LOG_INTERVALO", 2.0)
+        app.extensions["auditoria"] = self
+        atexit.register(self.encerrar)
+
+    # -----------------------------
+    # ➕ Entrada
+    # -----------------------------
+    def registrar(self, usuario, tarefa, resultado="sucesso"):
+        """Enfileira um registro. O IP é capturado aqui, ainda dentro da requisição."""
+        registro = {
+            "usuario": usuario,
+            "tarefa": tarefa,
+            "resultado": resultado,
+            "datahora": datetime.now(timezone.utc),
+            "ip": (request.remote_addr if has_request_context() else None) or "desconhecido",
+        }
+
+        if not self.assincrono or self._app is None:
+            self._gravar([registro])
+            return
+
+        self._garantir_thread()
+        try:
+            self._fila.put_nowait(registro)
+        except queue.Full:
+            with self._trava:
+                self.descartados += 1
+            return
+
+        if self._fila.qsize() >= self.lote:
+            self._acordar.set()
+
+    # -----------------------------
+    # 🧵 Thread de gravação
+    # -----------------------------
+    def _garantir_thread(self):
+        # a thread (e a fila) é criada no primeiro uso de cada processo,
+        # assim workers criados por fork não herdam uma thread morta
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._trava:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._fila = queue.Queue(maxsize=self.fila_max)
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="auditoria-logs", daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        while not self._parar.is_set():
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava tudo o que estiver na fila, em lotes de até LOG_LOTE registros."""
+        if self._fila is None:
+            return 0
+        total = 0
+        while True:
+            registros = []
+            try:
+                while len(registros) < self.lote:
+                    registros.append(self._fila.get_nowait())
+            except queue.Empty:
+                pass
+            if not registros:
+                return total
+            self._gravar(registros)
+            total += len(registros)
+
+    def _gravar(self, registros):
+        from app.extensions import db
+        from utils.logs import inserir_logs
+
+        try:
+            with self._app.app_context():
+                with db.engine.begin() as conn:
+                    inserir_logs(conn, registros)
+            with self._trava:
+                self.gravados += len(registros)
+                self.lotes += 1
+        except Exception as e:
+            with self._trava:
+                self.falhas += 1
+                self.descartados += len(registros)
+            print(f"Erro ao registrar log: {e}")
+
+    def encerrar(self):
+        """Para a thread e grava o que sobrou na fila (chamado no desligamento)."""
+        if self._thread is not None and self._pid == os.getpid():
+            self._parar.set()
+            self._acordar.set()
+            self._thread.join(timeout=5)
+        if self._pid == os.getpid():
+            self.descarregar()
+
+    # -----------------------------
+    # 📈 Métricas
+    # -----------------------------
+    def stats(self):
+        with self._trava:
+            return {
+                "modo": "assincrono" if self.assincrono else "sincrono",
+                "fila": self._fila.qsize() if self._fila is not None else 0,
+                "fila_max": self.fila_max,
+                "gravados": self.gravados,
+                "lotes": self.lotes,
+                "descartados": self.descartados,
+                "falhas": self.falhas,
+            }
@@ -0,0 +1,393 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import zipfile
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+from sqlalchemy.engine import make_url
+
+from utils.streaming import TAMANHO_BLOCO, zip_stream
+
+# -----------------------------
+# 💾 Backup do banco em streaming
+# -----------------------------
+# Cada motor de banco tem um "driver" que produz o dump em blocos de bytes:
+# - SQLite: API de backup online do sqlite3, copiando algumas páginas por
+#   passo — entre os passos o banco fica livre para os escritores;
+# - MySQL/MariaDB: mysqldump --single-transaction --quick;
+# - PostgreSQL: pg_dump no formato custom (restaurado com pg_restore).
+#
+# O dump passa direto pelo compressor até o destino (resposta HTTP ou arquivo
+# da tarefa). Tudo é puxado pelo consumidor: se o cliente baixa devagar, o
+# pipe enche e o programa de dump espera (backpressure natural); se a conexão
+# cai, o gerador é fechado e o processo é encerrado.
+#
+# Qualquer que seja o motor, o resultado é o mesmo .zip: o dump e um
+# manifest.json (motor, tamanho, SHA-256, comando de restauração), gravado
+# por último, quando esses dados já são conhecidos.
+
+FORMATO_ARQUIVO = "sigi-backup"
+VERSAO_ARQUIVO = 1
+MANIFESTO = "manifest.json"
+
+# compressão das entradas do zip -> (método do zipfile, descrição)
+COMPRESSOES = {
+    "deflate": (zipfile.ZIP_DEFLATED, "Deflate (abre em qualquer descompactador)"),
+    "bzip2": (zipfile.ZIP_BZIP2, "bzip2 (menor, mais lento)"),
+    "xz": (zipfile.ZIP_LZMA, "xz/LZMA (o menor; requer 7-Zip ou similar)"),
+}
+
+# páginas copiadas por passo no backup online do SQLite
+PAGINAS_POR_PASSO = 256
+
+
+class ErroBackup(Exception):
+    """Configuração inválida ou falha do programa de dump."""
+
+
+def _processo(comando, env=None):
+    """
+    Inicia `comando` e devolve um gerador com o stdout em blocos; o gerador
+    falha se o código de saída não for 0. O processo é iniciado já aqui, para
+    que um programa ausente seja detectado antes de a resposta começar.
+    """
+    erros = tempfile.TemporaryFile()   # stderr fora do pipe: não trava se o programa escrever muito
+    try:
+        processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=erros,
+                                    env={**os.environ, **(env or {})})
+    except OSError as e:
+        erros.close()
+        raise ErroBackup(f"Não foi possível executar {comando[0]}: {e}") from e
+
+    def blocos():
+        concluido = False
+        try:
+            while True:
+                bloco = processo.stdout.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                yield bloco
+            concluido = True
+        finally:
+            processo.stdout.close()
+            if not concluido and processo.poll() is None:
+                processo.kill()   # consumidor desistiu (ex.: download cancelado)
+            codigo = processo.wait()
+            erros.seek(0)
+            mensagem = erros.read().decode("utf-8", "replace").strip()
+            erros.close()
+            if concluido and codigo != 0:
+                raise ErroBackup(f"{comando[0]} terminou com código {codigo}: {mensagem[-500:]}")
+
+    return blocos()
+
+
+def _executar(comando, env=None, entrada=None):
+    """Roda `comando` até o fim (stdin de um arquivo, se houver) e devolve o stdout em texto."""
+    try:
+        resultado = subprocess.run(comando, stdin=entrada, capture_output=True,
+                                   env={**os.environ, **(env or {})})
+    except OSError as e:
+        raise ErroBackup(f"Não foi possível executar {comando[0]}: {e}") from e
+    if resultado.returncode != 0:
+        mensagem = resultado.stderr.decode("utf-8", "replace").strip()
+        raise ErroBackup(f"{comando[0]} terminou com código {resultado.returncode}: {mensagem[-500:]}")
+    return resultado.stdout.decode("utf-8", "replace")
+
+
+# -----------------------------
+# 🔌 Drivers por motor de banco
+# -----------------------------
+DRIVERS = {}
+
+
+def registrar_driver(*backends):
+    """Decorator: associa o driver aos nomes de backend do SQLAlchemy (ex.: "mysql")."""
+    def decorator(cls):
+        for backend in backends:
+            DRIVERS[backend] = cls
+        return cls
+    return decorator
+
+
+class DriverBackup:
+    """Base dos drivers: blocos() inicia o dump e devolve o gerador de bytes."""
+
+    motor = None
+    ferramenta = None
+    extensao = None    # extensão do dump dentro do zip
+
+    def __init__(self, url):
+        self.url = url
+
+    @property
+    def banco(self):
+        return os.path.splitext(os.path.basename(self.url.database or "banco"))[0]
+
+    @property
+    def arquivo(self):
+        return f"{self.banco}.{self.extensao}"
+
+    def blocos(self):
+        raise NotImplementedError
+
+    def restauracao(self):
+        """Comando sugerido para restaurar o dump extraído do zip."""
+        raise NotImplementedError
+
+    def testar_restauracao(self, dump, url_rascunho=None):
+        """
+        Restaura `dump` num banco de rascunho e devolve o número de tabelas.
+        Nunca no banco do sistema: a URL de rascunho precisa apontar para outro banco.
+        """
+        raise NotImplementedError
+
+    def _rascunho(self, url_rascunho):
+        if not url_rascunho:
+            raise ErroBackup("Configure BACKUP_VERIFICAR_URL (banco de rascunho) para testar a restauração.")
+        rascunho = make_url(url_rascunho)
+        if DRIVERS.get(rascunho.get_backend_name()) is not type(self):
+            raise ErroBackup(f"BACKUP_VERIFICAR_URL precisa ser um banco {self.motor}.")
+        if (rascunho.host or "localhost", rascunho.port, rascunho.database) == \
+                (self.url.host or "localhost", self.url.port, self.url.database):
+            raise ErroBackup("BACKUP_VERIFICAR_URL aponta para o banco do sistema.")
+        return rascunho
+
+
+@registrar_driver("sqlite")
+class DriverSQLite(DriverBackup):
+    motor = "sqlite"
+    ferramenta = "sqlite3 (backup online)"
+    extensao = "sqlite3"
+
+    def blocos(self):
+        caminho = self.url.database
+        if not caminho or caminho == ":memory:" or not os.path.exists(caminho):
+            raise ErroBackup(f"Arquivo do banco SQLite não encontrado: {caminho}")
+
+        # a API de backup copia para outro banco: um arquivo temporário,
+        # apagado assim que o conteúdo é lido
+        descritor, copia = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(descritor)
+        try:
+            origem = sqlite3.connect(caminho)
+            destino = sqlite3.connect(copia)
+            try:
+                # entre os passos a trava é liberada; se outro processo escrever,
+                # o sqlite recomeça a cópia sozinho
+                origem.backup(destino, pages=PAGINAS_POR_PASSO, sleep=0.001)
+            finally:
+                destino.close()
+                origem.close()
+        except sqlite3.Error as e:
+            os.remove(copia)
+            raise ErroBackup(f"Falha no backup do SQLite: {e}") from e
+
+        def ler():
+            try:
+                with open(copia, "rb") as arquivo:
+                    while True:
+                        bloco = arquivo.read(TAMANHO_BLOCO)
+                        if not bloco:
+                            break
+                        yield bloco
+            finally:
+                os.remove(copia)
+
+        return ler()
+
+    def restauracao(self):
+        return f"cp {self.arquivo} {self.url.database}   # com o sistema parado"
+
+    def testar_restauracao(self, dump, url_rascunho=None):
+        # o próprio dump é um banco: o rascunho é uma cópia temporária dele
+        with tempfile.TemporaryDirectory() as pasta:
+            copia = os.path.join(pasta, "rascunho.sqlite3")
+            with open(dump, "rb") as origem, open(copia, "wb") as destino:
+                while True:
+                    bloco = origem.read(TAMANHO_BLOCO)
+                    if not bloco:
+                        break
+                    destino.write(bloco)
+            conn = sqlite3.connect(copia)
+            try:
+                integridade = conn.execute("PRAGMA integrity_check").fetchone()[0]
+                tabelas = conn.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+            except sqlite3.Error as e:
+                raise ErroBackup(f"O dump não abre como banco SQLite: {e}") from e
+            finally:
+                conn.close()
+        if integridade != "ok":
+            raise ErroBackup(f"integrity_check falhou: {integridade}")
+        return tabelas
+
+
+@registrar_driver("mysql", "mariadb")
+class DriverMySQL(DriverBackup):
+    motor = "mysql"
+    ferramenta = "mysqldump"
+    extensao = "sql"
+
+    def blocos(self):
+        if not self.url.database:
+            raise ErroBackup("DATABASE_URL sem o nome do banco.")
+        # --single-transaction: snapshot consistente (InnoDB) sem travar as tabelas
+        comando = ["mysqldump", "--single-transaction", "--quick",
+                   "-h", self.url.host or "localhost", "-P", str(self.url.port or 3306),
+                   "-u", self.url.username or "", self.url.database]
+        # senha pelo ambiente, não pela linha de comando (visível no `ps`)
+        return _processo(comando, env={"MYSQL_PWD": self.url.password or ""})
+
+    def restauracao(self):
+        return (f"mysql -h {self.url.host or 'localhost'} -P {self.url.port or 3306} "
+                f"-u {self.url.username} -p {self.url.database} < {self.arquivo}")
+
+    def testar_restauracao(self, dump, url_rascunho=None):
+        rascunho = self._rascunho(url_rascunho)
+        conexao = ["-h", rascunho.host or "localhost", "-P", str(rascunho.port or 3306),
+                   "-u", rascunho.username or ""]
+        env = {"MYSQL_PWD": rascunho.password or ""}
+        # o mysqldump gera DROP TABLE IF EXISTS: recarregar no mesmo rascunho é seguro
+        with open(dump, "rb") as entrada:
+            _executar(["mysql", *conexao, rascunho.database], env, entrada)
+        saida = _executar(["mysql", *conexao, "-N", "-B", "-e", "SHOW TABLES", rascunho.database], env)
+        return len(saida.split())
+
+
+@registrar_driver("postgresql")
+class DriverPostgres(DriverBackup):
+    motor = "postgresql"
+    ferramenta = "pg_dump"
+    extensao = "dump"
+
+    def blocos(self):
+        if not self.url.database:
+            raise ErroBackup("DATABASE_URL sem o nome do banco.")
+        comando = ["pg_dump", "--format=custom", "--no-password",
+                   "-h", self.url.host or "localhost", "-p", str(self.url.port or 5432),
+                   "-U", self.url.username or "", self.url.database]
+        return _processo(comando, env={"PGPASSWORD": self.url.password or ""})
+
+    def restauracao(self):
+        return (f"pg_restore --clean -h {self.url.host or 'localhost'} -p {self.url.port or 5432} "
+                f"-U {self.url.username} -d {self.url.database} {self.arquivo}")
+
+    def testar_restauracao(self, dump, url_rascunho=None):
+        rascunho = self._rascunho(url_rascunho)
+        conexao = ["-h", rascunho.host or "localhost", "-p", str(rascunho.port or 5432),
+                   "-U", rascunho.username or "", "--no-password"]
+        env = {"PGPASSWORD": rascunho.password or ""}
+        _executar(["pg_restore", "--clean", "--if-exists", "--no-owner", *conexao,
+                   "-d", rascunho.database, dump], env)
+        saida = _executar(["psql", *conexao, "-At", "-d", rascunho.database, "-c",
+                           "SELECT count(*) FROM information_schema.tables WHERE table_schema = 'public'"], env)
+        return int(saida.strip() or 0)
+
+
+def driver_para(url):
+    """Driver de backup para a URL do banco (str ou URL do SQLAlchemy)."""
+    url = make_url(url)
+    classe = DRIVERS.get(url.get_backend_name())
+    if classe is None:
+        raise ErroBackup(f"Backup não suportado para o banco {url.get_backend_name()}.")
+    return classe(url)
+
+
+# -----------------------------
+# 📦 Arquivo de backup (.zip + manifest.json)
+# -----------------------------
+def nome_backup(driver):
+    """Nome do arquivo: <banco>_backup_<data>.zip."""
+    return f"{driver.banco}_backup_{datetime.now():%d-%m-%Y}.zip"
+
+
+def _entradas(driver, blocos, compressao, extras=(), info=None):
+    """Entradas do zip: o dump (contando bytes e SHA-256), os extras e, por último, o manifesto."""
+    soma = hashlib.sha256()
+    total = 0
+    inicio = time.monotonic()
+
+    def contar():
+        nonlocal total
+        for bloco in blocos:
+            soma.update(bloco)
+            total += len(bloco)
+            yield bloco
+
+    yield driver.arquivo, contar()
+    for nome, conteudo in extras:
+        yield nome, [conteudo]
+
+    manifesto = {
+        "formato": FORMATO_ARQUIVO,
+        "versao": VERSAO_ARQUIVO,
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "motor": driver.motor,
+        "ferramenta": driver.ferramenta,
+        "banco": driver.banco,
+        "arquivo": driver.arquivo,
+        "bytes": total,
+        "sha256": soma.hexdigest(),
+        "compressao": compressao,
+        "duracao_s": round(time.monotonic() - inicio, 2),
+        "restauracao": driver.restauracao(),
+        **(info or {}),
+    }
+    yield MANIFESTO, [json.dumps(manifesto, ensure_ascii=False, indent=2).encode("utf-8")]
+
+
+def stream_backup(url, compressao="deflate", extras=(), info=None):
+    """
+    Devolve (nome_do_arquivo, mimetype, gerador de bytes) do backup.
+    - extras: entradas adicionais do zip, como (nome, bytes)
+    - info: campos adicionais do manifesto
+    O dump já é iniciado aqui: banco não suportado ou programa ausente levantam ErroBackup.
+    """
+    if compressao not in COMPRESSOES:
+        raise ErroBackup(f"Compressão inválida: {compressao}")
+
+    driver = driver_para(url)
+    blocos = driver.blocos()
+    corpo = zip_stream(_entradas(driver, blocos, compressao, extras, info),
+                       compressao=COMPRESSOES[compressao][0])
+    return nome_backup(driver), "application/zip", corpo
+
+
+def salvar_backup(url, pasta, compressao="deflate", ao_progresso=None, nome=None, extras=(), info=None):
+    """Grava o backup em `pasta` (arquivo parcial renomeado só no fim). Devolve (caminho, nome, bytes)."""
+    nome_padrao, _, corpo = stream_backup(url, compressao, extras, info)
+    nome = nome or nome_padrao
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, nome)
+    # um parcial por escritor: dois processos gravando o mesmo backup não se misturam
+    parcial = f"{destino}.{os.getpid()}.{threading.get_ident()}.parcial"
+    total = 0
+    try:
+        with open(parcial, "wb") as saida:
+            for bloco in corpo:
+                saida.write(bloco)
+                total += len(bloco)
+                if ao_progresso:
+                    ao_progresso(total)
+        os.replace(parcial, destino)
+    finally:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+    return destino, nome, total
+
+
+def ler_manifesto(caminho):
+    """Manifesto (dict) de um arquivo de backup, conferindo o formato."""
+    try:
+        with zipfile.ZipFile(caminho) as zf:
+            manifesto = json.loads(zf.read(MANIFESTO))
+    except (zipfile.BadZipFile, KeyError, ValueError) as e:
+        raise ErroBackup(f"{os.path.basename(caminho)} não é um backup do SiGI.") from e
+    if manifesto.get("formato") != FORMATO_ARQUIVO:
+        raise ErroBackup(f"{os.path.basename(caminho)} não é um backup do SiGI.")
+    return manifesto
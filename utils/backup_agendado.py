@@ -0,0 +1,199 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta
+
+from utils.backup import ErroBackup, ler_manifesto
+from utils.backup_incremental import (
+    gerar_incremental, listar_snapshots, pasta_repositorio, remover_snapshots, travar, verificar_snapshot,
+)
+
+# -----------------------------
+# ⏰ Backups agendados: incremental + verificação + retenção
+# -----------------------------
+# Um ciclo (executar_ciclo) faz, com o repositório travado:
+# 1. backup incremental (banco + uploads novos) em BACKUP_DIR;
+# 2. restauração de teste do snapshot num banco de rascunho
+#    (SQLite: cópia temporária; MySQL/PostgreSQL: BACKUP_VERIFICAR_URL);
+# 3. retenção avô-pai-filho: mantém o último snapshot de cada um dos
+#    últimos BACKUP_RETER_DIARIOS dias, BACKUP_RETER_SEMANAIS semanas e
+#    BACKUP_RETER_MENSAIS meses; os demais são incorporados ao seguinte
+#    e apagados, junto com as fotos que só eles referenciavam. Só roda se
+#    a verificação passou, e snapshots que falharam não ocupam as vagas;
+# 4. uma linha em historico.jsonl (duração, tamanho, verificação), que
+#    alimenta os gráficos da página de backup.
+#
+# Rode pelo cron (`flask backup executar`) ou deixe `flask backup agendar`
+# como serviço: ele dorme até BACKUP_HORARIO (fora do horário de uso).
+
+HISTORICO = "historico.jsonl"
+
+
+# -----------------------------
+# 🔹 Retenção avô-pai-filho
+# -----------------------------
+def _data_snapshot(nome):
+    return datetime.strptime(nome[:15], "%Y%m%d-%H%M%S")
+
+
+def selecionar_retencao(nomes, diarios=7, semanais=4, mensais=12, falhos=()):
+    """
+    Snapshots a manter: o mais recente de cada dia/semana/mês dentro das
+    janelas (e sempre o último). Os `falhos` (verificação reprovada) não
+    representam o período: o snapshot verificado anterior é que fica.
+    """
+    ordenados = sorted(nomes, reverse=True)
+    manter = set(ordenados[:1])
+    candidatos = [nome for nome in ordenados if nome not in set(falhos)]
+    for quantidade, periodo in ((diarios, lambda d: d.date()),
+                                (semanais, lambda d: d.isocalendar()[:2]),
+                                (mensais, lambda d: (d.year, d.month))):
+        vistos = []
+        for nome in candidatos:
+            chave = periodo(_data_snapshot(nome))
+            if chave in vistos:
+                continue
+            if len(vistos) >= quantidade:
+                break
+            vistos.append(chave)
+            manter.add(nome)
+    return manter
+
+
+def aplicar_retencao(repositorio, diarios=7, semanais=4, mensais=12, falhos=()):
+    """Remove os snapshots fora da política. Devolve (removidos, objetos apagados)."""
+    nomes = listar_snapshots(repositorio)
+    remover = sorted(set(nomes) - selecionar_retencao(nomes, diarios, semanais, mensais, falhos))
+    if not remover:
+        return [], 0
+    _, objetos = remover_snapshots(repositorio, remover)
+    return remover, objetos
+
+
+# -----------------------------
+# 🔹 Histórico
+# -----------------------------
+def registrar_historico(repositorio, registro):
+    os.makedirs(repositorio, exist_ok=True)
+    with open(os.path.join(repositorio, HISTORICO), "a", encoding="utf-8") as arquivo:
+        arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+def ler_historico(repositorio, limite=30):
+    """Últimos `limite` ciclos (None = todos), do mais antigo ao mais recente."""
+    try:
+        with open(os.path.join(repositorio, HISTORICO), encoding="utf-8") as arquivo:
+            linhas = arquivo.readlines()
+            if limite is not None:
+                linhas = linhas[-limite:]
+    except OSError:
+        return []
+    registros = []
+    for linha in linhas:
+        try:
+            registros.append(json.loads(linha))
+        except ValueError:
+            continue   # linha incompleta (processo interrompido no meio da gravação)
+    return registros
+
+
+# -----------------------------
+# 🔹 Ciclo completo
+# -----------------------------
+def executar_ciclo(app, url, compressao=None, ao_progresso=None, usuario="sistema"):
+    """Backup + verificação + retenção + histórico. Devolve o registro gravado no histórico."""
+    from utils.logs import registrar_log
+
+    config = app.config
+    repositorio = pasta_repositorio(app)
+    avisar = ao_progresso or (lambda percentual, mensagem: None)
+    registro = {"inicio": datetime.now().isoformat(timespec="seconds")}
+    inicio = time.monotonic()
+
+    try:
+        with travar(repositorio):
+            resumo = gerar_incremental(
+                url, config["UPLOAD_FOLDER"], repositorio,
+                compressao or config.get("BACKUP_COMPRESSAO", "deflate"),
+                ao_progresso=lambda percentual, mensagem: avisar(percentual * 0.7, mensagem),
+            )
+            manifesto = ler_manifesto(resumo["caminho"])
+            registro.update(
+                snapshot=resumo["snapshot"],
+                duracao_s=round(time.monotonic() - inicio, 2),
+                tamanho=resumo["tamanho"],
+                banco_bytes=manifesto["bytes"],
+                uploads_arquivos=resumo["arquivos"],
+                uploads_bytes_novos=resumo["bytes_novos"],
+            )
+
+            avisar(75, "Testando a restauração...")
+            inicio_verificacao = time.monotonic()
+            try:
+                verificacao = verificar_snapshot(repositorio, resumo["snapshot"], url,
+                                                 config.get("BACKUP_VERIFICAR_URL"))
+                registro.update(verificacao="ok", tabelas=verificacao["tabelas"])
+            except ErroBackup as e:
+                registro.update(verificacao="falhou", erro=str(e))
+            registro["verificacao_s"] = round(time.monotonic() - inicio_verificacao, 2)
+
+            # snapshot reprovado não pode ser o representante do dia: a retenção
+            # apagaria os anteriores do mesmo período, que passaram na verificação
+            removidos, objetos = [], 0
+            if registro["verificacao"] == "ok":
+                avisar(90, "Aplicando a retenção...")
+                falhos = {r.get("snapshot") for r in ler_historico(repositorio, limite=None)
+                          if r.get("verificacao") != "ok"}
+                removidos, objetos = aplicar_retencao(
+                    repositorio,
+                    int(config.get("BACKUP_RETER_DIARIOS", 7)),
+                    int(config.get("BACKUP_RETER_SEMANAIS", 4)),
+                    int(config.get("BACKUP_RETER_MENSAIS", 12)),
+                    falhos,
+                )
+            registro.update(removidos=removidos, objetos_apagados=objetos)
+    except Exception as e:
+        registro.update(verificacao="falhou", erro=str(e), duracao_s=round(time.monotonic() - inicio, 2))
+        registrar_historico(repositorio, registro)
+        registrar_log(usuario, f"Erro no backup agendado: {e}", "erro")
+        raise
+
+    registrar_historico(repositorio, registro)
+    if registro["verificacao"] == "ok":
+        registrar_log(usuario, f"Backup agendado {registro['snapshot']} verificado "
+                               f"({registro['tabelas']} tabela(s))", "sucesso")
+    else:
+        registrar_log(usuario, f"Backup agendado {registro['snapshot']} não passou na verificação: "
+                               f"{registro['erro']}", "erro")
+    avisar(100, "Backup concluído.")
+    return registro
+
+
+# -----------------------------
+# 🔹 Agendador (`flask backup agendar`)
+# -----------------------------
+def proxima_execucao(horario, agora=None):
+    """Próximo horário "HH:MM" a partir de agora (hoje, se ainda não passou; senão amanhã)."""
+    agora = agora or datetime.now()
+    hora, minuto = (int(parte) for parte in horario.split(":"))
+    proxima = agora.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+    if proxima <= agora:
+        proxima += timedelta(days=1)
+    return proxima
+
+
+def agendar(app, url, horario, ao_iniciar=None, ao_terminar=None):
+    """Laço infinito: dorme até `horario`, executa o ciclo e repete. Um erro não derruba o agendador."""
+    while True:
+        proxima = proxima_execucao(horario)
+        if ao_iniciar:
+            ao_iniciar(proxima)
+        # dorme em trechos curtos: acompanha ajustes de relógio e responde ao Ctrl+C
+        while datetime.now() < proxima:
+            time.sleep(min(60, max(1, (proxima - datetime.now()).total_seconds())))
+        try:
+            registro = executar_ciclo(app, url)
+        except Exception as e:   # o agendador precisa sobreviver até a próxima noite
+            registro = {"erro": str(e), "verificacao": "falhou"}
+        if ao_terminar:
+            ao_terminar(registro)
@@ -0,0 +1,450 @@
+import os
+import json
+import shutil
+import hashlib
+import zipfile
+import tempfile
+from datetime import datetime
+from contextlib import contextmanager
+
+from utils.backup import MANIFESTO, ErroBackup, driver_para, ler_manifesto, salvar_backup
+from utils.streaming import TAMANHO_BLOCO
+
+# -----------------------------
+# 🗂️ Backup incremental (banco + uploads)
+# -----------------------------
+# Repositório em BACKUP_DIR (padrão: instance/backups):
+#
+#   objetos/ab/ab12...      arquivos enviados, nomeados pelo SHA-256 do conteúdo
+#   snapshots/AAAAMMDD-HHMMSS-NN.zip
+#                           dump completo do banco + manifest.json + uploads.json
+#   estado.json             índice dos uploads no último snapshot (acelera a próxima execução)
+#
+# O uploads.json de cada snapshot guarda só a diferença para o anterior
+# ("pai"): arquivos novos ou alterados (caminho → sha256, tamanho, mtime) e
+# removidos. Um arquivo cujo tamanho e mtime não mudaram nem é lido de novo,
+# e um conteúdo já presente em objetos/ não é copiado outra vez — a execução
+# noturna sobre um acervo grande de fotos só toca no que chegou no dia.
+#
+# restaurar() percorre a cadeia do snapshot pedido até o primeiro, reconstrói
+# a lista completa de uploads e monta uma instância (dump + pasta de uploads)
+# numa pasta vazia, conferindo o SHA-256 de cada arquivo.
+
+UPLOADS = "uploads.json"
+ESTADO = "estado.json"
+
+
+def pasta_repositorio(app):
+    return app.config.get("BACKUP_DIR") or os.path.join(app.instance_path, "backups")
+
+
+def _caminho_objeto(repositorio, sha):
+    return os.path.join(repositorio, "objetos", sha[:2], sha)
+
+
+def _pasta_snapshots(repositorio):
+    return os.path.join(repositorio, "snapshots")
+
+
+@contextmanager
+def travar(repositorio):
+    """Impede dois backups/rotações simultâneos no mesmo repositório (cron + botão, por exemplo)."""
+    import fcntl
+
+    os.makedirs(repositorio, exist_ok=True)
+    with open(os.path.join(repositorio, ".trava"), "w") as trava:
+        try:
+            fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as e:
+            raise ErroBackup("Já existe um backup em andamento neste repositório.") from e
+        try:
+            yield
+        finally:
+            fcntl.flock(trava, fcntl.LOCK_UN)
+
+
+def _ler_json(caminho, padrao=None):
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return padrao
+
+
+def _gravar_json(caminho, dados):
+    # grava num temporário e renomeia: um estado pela metade nunca é lido
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+# -----------------------------
+# 🔹 Snapshots e cadeia de incrementos
+# -----------------------------
+def listar_snapshots(repositorio):
+    """Nomes dos snapshots do repositório, do mais antigo ao mais recente."""
+    pasta = _pasta_snapshots(repositorio)
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(nome for nome in os.listdir(pasta) if nome.endswith(".zip"))
+
+
+def _ler_incremento(repositorio, snapshot):
+    caminho = os.path.join(_pasta_snapshots(repositorio), snapshot)
+    try:
+        with zipfile.ZipFile(caminho) as zf:
+            return json.loads(zf.read(UPLOADS))
+    except (OSError, zipfile.BadZipFile, KeyError, ValueError) as e:
+        raise ErroBackup(f"Snapshot inválido: {snapshot}") from e
+
+
+def cadeia(repositorio, snapshot):
+    """Snapshots de `snapshot` até o primeiro (sem pai), na ordem de aplicação."""
+    existentes = set(listar_snapshots(repositorio))
+    ordem = []
+    atual = snapshot
+    while atual:
+        if atual not in existentes:
+            raise ErroBackup(f"Cadeia de backups quebrada: {atual} não encontrado.")
+        if atual in ordem:
+            raise ErroBackup(f"Cadeia de backups em ciclo: {atual}.")
+        ordem.append(atual)
+        atual = _ler_incremento(repositorio, atual).get("pai")
+    return ordem[::-1]
+
+
+def arquivos_do_snapshot(repositorio, snapshot):
+    """Uploads completos no momento do snapshot: caminho → [sha256, tamanho, mtime_ns]."""
+    arquivos = {}
+    for nome in cadeia(repositorio, snapshot):
+        incremento = _ler_incremento(repositorio, nome)
+        arquivos.update(incremento.get("alterados", {}))
+        for caminho in incremento.get("removidos", []):
+            arquivos.pop(caminho, None)
+    return arquivos
+
+
+def _estado_atual(repositorio):
+    """(último snapshot, seus uploads), usando o estado.json quando ele está em dia."""
+    snapshots = listar_snapshots(repositorio)
+    if not snapshots:
+        return None, {}
+    ultimo = snapshots[-1]
+    estado = _ler_json(os.path.join(repositorio, ESTADO), {})
+    if estado.get("snapshot") == ultimo:
+        return ultimo, estado.get("arquivos", {})
+    return ultimo, arquivos_do_snapshot(repositorio, ultimo)
+
+
+# -----------------------------
+# 🔹 Uploads → objetos (endereçados por conteúdo)
+# -----------------------------
+def _guardar_objeto(repositorio, origem):
+    """Copia `origem` para objetos/ calculando o SHA-256. Devolve (sha, copiado)."""
+    pasta_tmp = os.path.join(repositorio, "objetos", "tmp")
+    os.makedirs(pasta_tmp, exist_ok=True)
+    soma = hashlib.sha256()
+    descritor, temporario = tempfile.mkstemp(dir=pasta_tmp)
+    try:
+        with open(origem, "rb") as entrada, os.fdopen(descritor, "wb") as saida:
+            while True:
+                bloco = entrada.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                soma.update(bloco)
+                saida.write(bloco)
+        sha = soma.hexdigest()
+        destino = _caminho_objeto(repositorio, sha)
+        if os.path.exists(destino):
+            return sha, False   # mesmo conteúdo já guardado (outro nome ou execução anterior)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(temporario, destino)
+        return sha, True
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _varrer(pasta_uploads, ignorar=()):
+    """(caminho relativo com "/", os.stat) de cada arquivo dos uploads."""
+    ignorar = [os.path.abspath(caminho) for caminho in ignorar]
+    for raiz, pastas, arquivos in os.walk(pasta_uploads):
+        pastas[:] = [p for p in pastas if os.path.abspath(os.path.join(raiz, p)) not in ignorar]
+        for nome in arquivos:
+            caminho = os.path.join(raiz, nome)
+            if not os.path.isfile(caminho):
+                continue
+            relativo = os.path.relpath(caminho, pasta_uploads).replace(os.sep, "/")
+            yield relativo, caminho, os.stat(caminho)
+
+
+def gerar_incremental(url, pasta_uploads, repositorio, compressao="deflate", ao_progresso=None):
+    """
+    Cria um snapshot: dump completo do banco + uploads novos/alterados desde o anterior.
+    Devolve um resumo (dict) com o nome do snapshot e os totais.
+    """
+    avisar = ao_progresso or (lambda percentual, mensagem: None)
+    pai, anteriores = _estado_atual(repositorio)
+
+    # 1) uploads primeiro: o snapshot só é gravado quando todos os objetos existem
+    avisar(5, "Verificando os arquivos enviados...")
+    atuais, alterados = {}, {}
+    novos_objetos = bytes_novos = 0
+    if os.path.isdir(pasta_uploads):
+        for relativo, caminho, info in _varrer(pasta_uploads, ignorar=[repositorio]):
+            anterior = anteriores.get(relativo)
+            if anterior and anterior[1] == info.st_size and anterior[2] == info.st_mtime_ns \
+                    and os.path.exists(_caminho_objeto(repositorio, anterior[0])):
+                atuais[relativo] = anterior   # inalterado: nem abre o arquivo
+                continue
+            sha, copiado = _guardar_objeto(repositorio, caminho)
+            atuais[relativo] = [sha, info.st_size, info.st_mtime_ns]
+            if anterior != atuais[relativo]:
+                # novo, conteúdo diferente ou só o mtime mudou (atualiza o índice)
+                alterados[relativo] = atuais[relativo]
+            if copiado:
+                novos_objetos += 1
+                bytes_novos += info.st_size
+    removidos = sorted(set(anteriores) - set(atuais))
+
+    # 2) banco completo + incremento dos uploads no mesmo .zip
+    avisar(50, "Exportando o banco...")
+    incremento = {"pai": pai, "alterados": alterados, "removidos": removidos}
+    info = {
+        "tipo": "incremental",
+        "pai": pai,
+        "uploads": {
+            "arquivos": len(atuais),
+            "bytes": sum(item[1] for item in atuais.values()),
+            "alterados": len(alterados),
+            "removidos": len(removidos),
+            "objetos_novos": novos_objetos,
+            "bytes_novos": bytes_novos,
+        },
+    }
+    # o sufixo vai em todos os nomes: "-01" ordena depois de "-00" (já "-1.zip" viria antes de ".zip"
+    # e listar_snapshots()[-1] deixaria de ser o mais recente)
+    momento = f"{datetime.now():%Y%m%d-%H%M%S}"
+    pasta = _pasta_snapshots(repositorio)
+    sufixo = 0
+    nome = f"{momento}-{sufixo:02d}.zip"
+    while os.path.exists(os.path.join(pasta, nome)):
+        sufixo += 1
+        nome = f"{momento}-{sufixo:02d}.zip"
+    caminho, nome, tamanho = salvar_backup(
+        url, pasta, compressao, nome=nome,
+        extras=[(UPLOADS, json.dumps(incremento, ensure_ascii=False).encode("utf-8"))],
+        info=info,
+    )
+
+    _gravar_json(os.path.join(repositorio, ESTADO), {"snapshot": nome, "arquivos": atuais})
+    avisar(100, "Backup incremental concluído.")
+    return {"snapshot": nome, "caminho": caminho, "tamanho": tamanho, **info["uploads"]}
+
+
+# -----------------------------
+# 🔹 Restauração
+# -----------------------------
+def restaurar(repositorio, destino, snapshot=None):
+    """
+    Monta em `destino` (pasta nova ou vazia) a instância do snapshot:
+    o dump do banco e a pasta uploads/ completa, conferindo os SHA-256.
+    Devolve o manifesto do snapshot (com o comando de restauração do banco).
+    """
+    snapshots = listar_snapshots(repositorio)
+    if not snapshots:
+        raise ErroBackup(f"Nenhum snapshot em {repositorio}.")
+    snapshot = snapshot or snapshots[-1]
+    if not snapshot.endswith(".zip"):
+        snapshot += ".zip"
+    if os.path.isdir(destino) and os.listdir(destino):
+        raise ErroBackup(f"A pasta de destino não está vazia: {destino}")
+
+    caminho_snapshot = os.path.join(_pasta_snapshots(repositorio), snapshot)
+    if snapshot not in snapshots:
+        raise ErroBackup(f"Snapshot não encontrado: {snapshot}")
+    manifesto = ler_manifesto(caminho_snapshot)
+    arquivos = arquivos_do_snapshot(repositorio, snapshot)
+
+    os.makedirs(destino, exist_ok=True)
+
+    # banco
+    with zipfile.ZipFile(caminho_snapshot) as zf:
+        soma = hashlib.sha256()
+        with zf.open(manifesto["arquivo"]) as entrada, \
+                open(os.path.join(destino, manifesto["arquivo"]), "wb") as saida:
+            while True:
+                bloco = entrada.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                soma.update(bloco)
+                saida.write(bloco)
+        if soma.hexdigest() != manifesto["sha256"]:
+            raise ErroBackup(f"SHA-256 do dump não confere em {snapshot}.")
+        with open(os.path.join(destino, MANIFESTO), "wb") as saida:
+            saida.write(zf.read(MANIFESTO))
+
+    # uploads
+    pasta_uploads = os.path.abspath(os.path.join(destino, "uploads"))
+    for relativo, (sha, _, mtime_ns) in sorted(arquivos.items()):
+        alvo = os.path.normpath(os.path.join(pasta_uploads, relativo))
+        if not alvo.startswith(pasta_uploads + os.sep):
+            raise ErroBackup(f"Caminho inválido no snapshot: {relativo}")
+        origem = _caminho_objeto(repositorio, sha)
+        if not os.path.exists(origem):
+            raise ErroBackup(f"Objeto ausente no repositório: {sha} ({relativo})")
+        os.makedirs(os.path.dirname(alvo), exist_ok=True)
+        shutil.copyfile(origem, alvo)
+        if _sha256(alvo) != sha:
+            raise ErroBackup(f"SHA-256 não confere: {relativo}")
+        os.utime(alvo, ns=(mtime_ns, mtime_ns))   # a próxima execução reconhece o arquivo sem relê-lo
+
+    manifesto["uploads_restaurados"] = len(arquivos)
+    return manifesto
+
+
+def _sha256(caminho):
+    soma = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        while True:
+            bloco = arquivo.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            soma.update(bloco)
+    return soma.hexdigest()
+
+
+# -----------------------------
+# 🔹 Verificação
+# -----------------------------
+def verificar_snapshot(repositorio, snapshot, url, url_rascunho=None):
+    """
+    Confere um snapshot: SHA-256 do dump, objetos dos uploads e restauração
+    de teste num banco de rascunho (SQLite: cópia temporária; MySQL/PostgreSQL:
+    `url_rascunho`, nunca o banco do sistema em `url`).
+    Devolve dict com "tabelas" e "uploads".
+    """
+    driver = driver_para(url)
+    caminho_snapshot = os.path.join(_pasta_snapshots(repositorio), snapshot)
+    manifesto = ler_manifesto(caminho_snapshot)
+    if manifesto["motor"] != driver.motor:
+        raise ErroBackup(f"{snapshot} é de um banco {manifesto['motor']}; o sistema usa {driver.motor}.")
+    incremento = _ler_incremento(repositorio, snapshot)
+
+    # uploads: os objetos novos deste snapshot são relidos; os demais, conferidos pelo tamanho
+    arquivos = arquivos_do_snapshot(repositorio, snapshot)
+    for relativo, (sha, tamanho, _) in arquivos.items():
+        objeto = _caminho_objeto(repositorio, sha)
+        if not os.path.exists(objeto) or os.path.getsize(objeto) != tamanho:
+            raise ErroBackup(f"Objeto ausente ou truncado: {sha} ({relativo})")
+    for relativo, (sha, _, _) in incremento.get("alterados", {}).items():
+        if _sha256(_caminho_objeto(repositorio, sha)) != sha:
+            raise ErroBackup(f"SHA-256 não confere: {relativo}")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        dump = os.path.join(pasta, manifesto["arquivo"])
+        soma = hashlib.sha256()
+        with zipfile.ZipFile(caminho_snapshot) as zf, zf.open(manifesto["arquivo"]) as entrada, \
+                open(dump, "wb") as saida:
+            while True:
+                bloco = entrada.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                soma.update(bloco)
+                saida.write(bloco)
+        if soma.hexdigest() != manifesto["sha256"]:
+            raise ErroBackup(f"SHA-256 do dump não confere em {snapshot}.")
+
+        tabelas = driver.testar_restauracao(dump, url_rascunho)
+    return {"tabelas": tabelas, "uploads": len(arquivos)}
+
+
+# -----------------------------
+# 🔹 Remoção de snapshots (retenção)
+# -----------------------------
+def _compor(anterior, posterior):
+    """Um incremento equivalente a aplicar `anterior` e depois `posterior`."""
+    removidos_depois = set(posterior.get("removidos", []))
+    alterados = {caminho: item for caminho, item in anterior.get("alterados", {}).items()
+                 if caminho not in removidos_depois}
+    alterados.update(posterior.get("alterados", {}))
+    removidos = (set(anterior.get("removidos", [])) - set(alterados)) | removidos_depois
+    return {"pai": anterior.get("pai"), "alterados": alterados, "removidos": sorted(removidos)}
+
+
+def _reescrever_incremento(caminho, incremento):
+    """Regrava o snapshot trocando uploads.json (e o pai/contagens no manifesto)."""
+    parcial = caminho + ".parcial"
+    try:
+        with zipfile.ZipFile(caminho) as entrada, zipfile.ZipFile(parcial, "w") as saida:
+            for info in entrada.infolist():
+                novo = zipfile.ZipInfo(info.filename, info.date_time)
+                novo.compress_type = info.compress_type
+                if info.filename == UPLOADS:
+                    saida.writestr(novo, json.dumps(incremento, ensure_ascii=False))
+                elif info.filename == MANIFESTO:
+                    manifesto = json.loads(entrada.read(info))
+                    manifesto["pai"] = incremento["pai"]
+                    manifesto.setdefault("uploads", {}).update(
+                        alterados=len(incremento["alterados"]), removidos=len(incremento["removidos"]))
+                    saida.writestr(novo, json.dumps(manifesto, ensure_ascii=False, indent=2))
+                else:
+                    # cópia em blocos: o dump não passa inteiro pela memória
+                    with entrada.open(info) as origem, saida.open(novo, "w", force_zip64=True) as destino:
+                        shutil.copyfileobj(origem, destino, TAMANHO_BLOCO)
+        os.replace(parcial, caminho)
+    finally:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+
+
+def remover_snapshots(repositorio, nomes):
+    """
+    Remove snapshots mantendo a cadeia: o incremento de cada removido é
+    incorporado ao do snapshot seguinte. Depois apaga os objetos que nenhum
+    snapshot restante referencia. Devolve (snapshots removidos, objetos apagados).
+    """
+    incrementos = {nome: _ler_incremento(repositorio, nome) for nome in listar_snapshots(repositorio)}
+    remover = set(nomes) & set(incrementos)
+    filhos = {incremento.get("pai"): nome for nome, incremento in incrementos.items()}
+
+    # do mais antigo ao mais recente: cada removido passa o incremento (já composto) adiante
+    reescrever = set()
+    for nome in sorted(remover):
+        filho = filhos.get(nome)
+        if filho is not None:
+            composto = _compor(incrementos[nome], incrementos[filho])
+            incrementos[filho] = composto
+            filhos[composto["pai"]] = filho
+            reescrever.add(filho)
+        del incrementos[nome]
+
+    # primeiro regrava os filhos; só então apaga: uma interrupção no meio não quebra a cadeia
+    for nome in sorted(reescrever - remover):
+        _reescrever_incremento(os.path.join(_pasta_snapshots(repositorio), nome), incrementos[nome])
+    for nome in remover:
+        os.remove(os.path.join(_pasta_snapshots(repositorio), nome))
+
+    return len(remover), coletar_objetos(repositorio, incrementos)
+
+
+def coletar_objetos(repositorio, incrementos=None):
+    """Apaga de objetos/ o que nenhum snapshot referencia. Devolve quantos foram apagados."""
+    if incrementos is None:
+        incrementos = {nome: _ler_incremento(repositorio, nome) for nome in listar_snapshots(repositorio)}
+    usados = {item[0] for incremento in incrementos.values() for item in incremento.get("alterados", {}).values()}
+
+    apagados = 0
+    pasta_objetos = os.path.join(repositorio, "objetos")
+    if not os.path.isdir(pasta_objetos):
+        return 0
+    for prefixo in os.listdir(pasta_objetos):
+        pasta = os.path.join(pasta_objetos, prefixo)
+        if prefixo == "tmp" or not os.path.isdir(pasta):
+            continue
+        for sha in os.listdir(pasta):
+            if sha not in usados:
+                os.remove(os.path.join(pasta, sha))
+                apagados += 1
+    return apagados
@@ -0,0 +1,491 @@
+import re
+import unicodedata
+from math import ceil
+
+from markupsafe import Markup, escape
+from sqlalchemy import Float, Integer, event, or_, text
+from sqlalchemy.dialects.mysql import match
+
+from app.extensions import db
+from app.models import Member, Ata, Carta, Certificado
+
+# -----------------------------
+# 🔍 Busca textual de membros
+# -----------------------------
+# - SQLite: tabela virtual FTS5 "members_fts" (tokenizer unicode61 sem
+#   acentos), com rowid = members.id, mantida pelos eventos do ORM abaixo
+#   na mesma transação que grava o Member. Ranking por bm25.
+# - MySQL/MariaDB: índice FULLTEXT em members (a collation *_ci já ignora
+#   acentos), ranking pelo score do MATCH ... AGAINST.
+# - Sem índice criado (ou outro banco): volta para ILIKE nos mesmos campos.
+#
+# O índice é criado/reconstruído com `flask busca reconstruir`. Operações em
+# massa (Query.update/delete) não disparam os eventos: rode o comando de novo.
+
+CAMPOS_MEMBRO = ("nome", "email", "funcao", "telefone", "bairro", "cpf")
+PESOS_MEMBRO = (10.0, 3.0, 2.0, 1.0, 1.0, 4.0, 4.0)   # ... + "digitos"
+FTS_MEMBROS = "members_fts"
+FULLTEXT_MEMBROS = "ft_members_busca"
+FTS_DOCUMENTOS = "documentos_fts"
+TABELA_DOCUMENTOS = "documentos_busca"
+FULLTEXT_DOCUMENTOS = "ft_documentos_busca"
+
+# nome → (tabela FTS5 no SQLite, tabela no MySQL, índice FULLTEXT no MySQL)
+_INDICES = {
+    "membros": (FTS_MEMBROS, "members", FULLTEXT_MEMBROS),
+    "documentos": (FTS_DOCUMENTOS, TABELA_DOCUMENTOS, FULLTEXT_DOCUMENTOS),
+}
+
+_TERMO = re.compile(r"\w+", re.UNICODE)
+_indices_prontos = set()
+
+
+def _termos(termo):
+    return _TERMO.findall(termo or "")
+
+
+def _digitos(*valores):
+    """CPF e telefone só com números, para achar "12345678900" ou "(85) 9999-0000"."""
+    return " ".join(re.sub(r"\D", "", v) for v in valores if v and re.sub(r"\D", "", v))
+
+
+# -----------------------------
+# 🧱 Criação / detecção do índice
+# -----------------------------
+def _indice_existe(conn, indice):
+    tabela_fts, tabela_mysql, fulltext = _INDICES[indice]
+    dialeto = conn.dialect.name
+    if dialeto == "sqlite":
+        return conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+            {"nome": tabela_fts},
+        ).first() is not None
+    if dialeto in ("mysql", "mariadb"):
+        return conn.execute(text(
+            "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+            "AND TABLE_NAME = :tabela AND INDEX_NAME = :nome"
+        ), {"tabela": tabela_mysql, "nome": fulltext}).first() is not None
+    return False
+
+
+def indice_pronto(conn=None, indice="membros"):
+    """True se o índice textual existe neste banco (resultado positivo fica em memória)."""
+    chave = (str(db.engine.url), indice)
+    if chave in _indices_prontos:
+        return True
+    if conn is None:
+        with db.engine.connect() as conn:
+            pronto = _indice_existe(conn, indice)
+    else:
+        pronto = _indice_existe(conn, indice)
+    if pronto:
+        _indices_prontos.add(chave)
+    return pronto
+
+
+def _valores_fts(membro):
+    valores = {campo: getattr(membro, campo) or "" for campo in CAMPOS_MEMBRO}
+    valores["digitos"] = _digitos(membro.cpf, membro.telefone)
+    return valores
+
+
+def reconstruir_indice_membros():
+    """Cria o índice textual (se preciso) e, no SQLite, repopula a tabela FTS. Retorna o total indexado."""
+    _indices_prontos.discard((str(db.engine.url), "membros"))
+    with db.engine.begin() as conn:
+        dialeto = conn.dialect.name
+
+        if dialeto == "sqlite":
+            colunas = ", ".join(CAMPOS_MEMBRO + ("digitos",))
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_MEMBROS} USING fts5("
+                f"{colunas}, tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(text(f"DELETE FROM {FTS_MEMBROS}"))
+            total = 0
+            membros = conn.execute(db.select(Member.__table__)).mappings()
+            for membro in membros:
+                valores = {campo: membro[campo] or "" for campo in CAMPOS_MEMBRO}
+                valores["digitos"] = _digitos(membro["cpf"], membro["telefone"])
+                _inserir_fts(conn, membro["id"], valores)
+                total += 1
+            return total
+
+        if dialeto in ("mysql", "mariadb"):
+            if not _indice_existe(conn, "membros"):
+                conn.execute(text(
+                    f"ALTER TABLE members ADD FULLTEXT INDEX {FULLTEXT_MEMBROS} ({', '.join(CAMPOS_MEMBRO)})"
+                ))
+            return conn.execute(text("SELECT COUNT(*) FROM members")).scalar()
+
+    return None
+
+
+# -----------------------------
+# 🔄 Sincronização (SQLite) pelos eventos do ORM
+# -----------------------------
+def _inserir_fts(conn, member_id, valores):
+    colunas = CAMPOS_MEMBRO + ("digitos",)
+    conn.execute(
+        text(f"INSERT INTO {FTS_MEMBROS} (rowid, {', '.join(colunas)}) "
+             f"VALUES (:rowid, {', '.join(':' + c for c in colunas)})"),
+        {"rowid": member_id, **valores},
+    )
+
+
+def _remover_fts(conn, member_id):
+    conn.execute(text(f"DELETE FROM {FTS_MEMBROS} WHERE rowid = :rowid"), {"rowid": member_id})
+
+
+def _sincroniza(conn):
+    return conn.dialect.name == "sqlite" and indice_pronto(conn, "membros")
+
+
+@event.listens_for(Member, "after_insert")
+def _fts_member_inserido(mapper, connection, target):
+    if _sincroniza(connection):
+        _inserir_fts(connection, target.id, _valores_fts(target))
+
+
+@event.listens_for(Member, "after_update")
+def _fts_member_atualizado(mapper, connection, target):
+    if _sincroniza(connection):
+        _remover_fts(connection, target.id)
+        _inserir_fts(connection, target.id, _valores_fts(target))
+
+
+@event.listens_for(Member, "after_delete")
+def _fts_member_removido(mapper, connection, target):
+    if _sincroniza(connection):
+        _remover_fts(connection, target.id)
+
+
+# -----------------------------
+# 🔎 Consulta
+# -----------------------------
+def buscar_membros_query(termo):
+    """
+    Retorna uma Query de Member filtrada pelo termo e ordenada por relevância
+    (ou por nome, no modo ILIKE). Termo vazio = todos os membros por nome.
+    """
+    termos = _termos(termo)
+    query = Member.query
+    if not termos:
+        return query.order_by(Member.nome.asc())
+
+    dialeto = db.engine.dialect.name
+    if indice_pronto(indice="membros"):
+        if dialeto == "sqlite":
+            expressao = " ".join('"' + t.replace('"', '""') + '"*' for t in termos)
+            pesos = ", ".join(str(p) for p in PESOS_MEMBRO)
+            ranking = (
+                text(f"SELECT rowid AS id, bm25({FTS_MEMBROS}, {pesos}) AS rank "
+                     f"FROM {FTS_MEMBROS} WHERE {FTS_MEMBROS} MATCH :expressao")
+                .bindparams(expressao=expressao)
+                .columns(id=Integer, rank=Float)
+                .subquery("ranking")
+            )
+            return (query.join(ranking, Member.id == ranking.c.id)
+                    .order_by(ranking.c.rank, Member.nome.asc()))
+
+        if dialeto in ("mysql", "mariadb"):
+            expressao = " ".join(f"+{t}*" for t in termos)
+            score = match(*(getattr(Member, c) for c in CAMPOS_MEMBRO), against=expressao).in_boolean_mode()
+            return query.filter(score > 0).order_by(score.desc(), Member.nome.asc())
+
+    # 🔸 sem índice textual: ILIKE (cada palavra precisa aparecer em algum campo)
+    for t in termos:
+        query = query.filter(or_(*(getattr(Member, c).ilike(f"%{t}%") for c in CAMPOS_MEMBRO)))
+    return query.order_by(Member.nome.asc())
+
+
+# -----------------------------
+# 📄 Busca unificada de documentos (atas, cartas e certificados)
+# -----------------------------
+# Um único índice invertido para os três modelos:
+# - SQLite: FTS5 "documentos_fts" com rowid = id * 4 + código do tipo;
+# - MySQL/MariaDB: tabela "documentos_busca" com índice FULLTEXT.
+# Cada documento vira (titulo, pessoas, conteudo) e é reindexado pelos
+# eventos do ORM ao salvar/excluir, na mesma transação.
+
+DOCUMENTOS = {
+    "ata": {
+        "modelo": Ata, "codigo": 1, "rotulo": "Ata",
+        "pessoas": ("presidente", "secretario", "participantes"),
+        "conteudo": ("tipo", "local", "pauta", "deliberacoes", "observacoes"),
+    },
+    "carta": {
+        "modelo": Carta, "codigo": 2, "rotulo": "Carta",
+        "pessoas": ("remetente", "destinatario"),
+        "conteudo": ("cidade", "corpo"),
+    },
+    "certificado": {
+        "modelo": Certificado, "codigo": 3, "rotulo": "Certificado",
+        "pessoas": ("criado_por",),
+        "conteudo": ("evento", "corpo"),
+    },
+}
+PESOS_DOCUMENTOS = (0.0, 0.0, 10.0, 4.0, 1.0)   # tipo, doc_id, titulo, pessoas, conteudo
+_INICIO_DESTAQUE, _FIM_DESTAQUE = "\x02", "\x03"
+
+
+class PaginaBusca:
+    """Página de resultados compatível com o template de paginação."""
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.pages = ceil(total / per_page) if total else 0
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+        self.prev_num = page - 1 if self.has_prev else None
+        self.next_num = page + 1 if self.has_next else None
+
+
+def _juntar(doc, campos):
+    return "\n".join(str(getattr(doc, c)) for c in campos if getattr(doc, c, None))
+
+
+def _linha_documento(tipo, doc):
+    config = DOCUMENTOS[tipo]
+    return {
+        "rowid": doc.id * 4 + config["codigo"],
+        "tipo": tipo,
+        "doc_id": doc.id,
+        "titulo": doc.titulo or "",
+        "pessoas": _juntar(doc, config["pessoas"]),
+        "conteudo": _juntar(doc, config["conteudo"]),
+    }
+
+
+def _gravar_documento(conn, linha):
+    if conn.dialect.name == "sqlite":
+        conn.execute(text(f"DELETE FROM {FTS_DOCUMENTOS} WHERE rowid = :rowid"), linha)
+        conn.execute(text(
+            f"INSERT INTO {FTS_DOCUMENTOS} (rowid, tipo, doc_id, titulo, pessoas, conteudo) "
+            f"VALUES (:rowid, :tipo, :doc_id, :titulo, :pessoas, :conteudo)"
+        ), linha)
+    else:
+        conn.execute(text(
+            f"REPLACE INTO {TABELA_DOCUMENTOS} (tipo, doc_id, titulo, pessoas, conteudo) "
+            f"VALUES (:tipo, :doc_id, :titulo, :pessoas, :conteudo)"
+        ), linha)
+
+
+def _remover_documento(conn, tipo, doc_id):
+    if conn.dialect.name == "sqlite":
+        conn.execute(text(f"DELETE FROM {FTS_DOCUMENTOS} WHERE rowid = :rowid"),
+                     {"rowid": doc_id * 4 + DOCUMENTOS[tipo]["codigo"]})
+    else:
+        conn.execute(text(f"DELETE FROM {TABELA_DOCUMENTOS} WHERE tipo = :tipo AND doc_id = :doc_id"),
+                     {"tipo": tipo, "doc_id": doc_id})
+
+
+def reconstruir_indice_documentos():
+    """Cria o índice de documentos (se preciso) e reindexa tudo. Retorna o total indexado."""
+    _indices_prontos.discard((str(db.engine.url), "documentos"))
+    with db.engine.begin() as conn:
+        dialeto = conn.dialect.name
+        if dialeto == "sqlite":
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_DOCUMENTOS} USING fts5("
+                f"tipo UNINDEXED, doc_id UNINDEXED, titulo, pessoas, conteudo, "
+                f"tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(text(f"DELETE FROM {FTS_DOCUMENTOS}"))
+        elif dialeto in ("mysql", "mariadb"):
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {TABELA_DOCUMENTOS} ("
+                f"tipo VARCHAR(20) NOT NULL, doc_id INT NOT NULL, titulo VARCHAR(200), "
+                f"pessoas TEXT, conteudo MEDIUMTEXT, PRIMARY KEY (tipo, doc_id), "
+                f"FULLTEXT KEY {FULLTEXT_DOCUMENTOS} (titulo, pessoas, conteudo)"
+                f") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+            ))
+            conn.execute(text(f"DELETE FROM {TABELA_DOCUMENTOS}"))
+        else:
+            return None
+
+        total = 0
+        for tipo, config in DOCUMENTOS.items():
+            for doc in conn.execute(db.select(config["modelo"].__table__)).all():
+                _gravar_documento(conn, _linha_documento(tipo, doc))
+                total += 1
+        return total
+
+
+def _registrar_eventos_documento(tipo, modelo):
+    def sincroniza(conn):
+        return conn.dialect.name in ("sqlite", "mysql", "mariadb") and indice_pronto(conn, "documentos")
+
+    @event.listens_for(modelo, "after_insert")
+    @event.listens_for(modelo, "after_update")
+    def _documento_salvo(mapper, connection, target):
+        if sincroniza(connection):
+            _gravar_documento(connection, _linha_documento(tipo, target))
+
+    @event.listens_for(modelo, "after_delete")
+    def _documento_removido(mapper, connection, target):
+        if sincroniza(connection):
+            _remover_documento(connection, tipo, target.id)
+
+
+for _tipo, _config in DOCUMENTOS.items():
+    _registrar_eventos_documento(_tipo, _config["modelo"])
+
+
+# -----------------------------
+# ✨ Trechos com destaque
+# -----------------------------
+def _dobrar(texto):
+    """Minúsculas sem acento, preservando o comprimento (1 caractere → 1 caractere)."""
+    return "".join(unicodedata.normalize("NFD", c)[0].lower() for c in texto)
+
+
+def _marcar(texto):
+    """Escapa o texto e troca os marcadores de destaque por <mark>."""
+    return Markup(str(escape(texto))
+                  .replace(_INICIO_DESTAQUE, Markup("<mark>"))
+                  .replace(_FIM_DESTAQUE, Markup("</mark>")))
+
+
+def trecho(texto, termos, tamanho=160):
+    """Recorta ~`tamanho` caracteres em volta do primeiro termo encontrado e destaca os termos."""
+    texto = " ".join((texto or "").split())
+    if not texto:
+        return Markup("")
+    dobrado = _dobrar(texto)
+    padrao = re.compile(r"\b(" + "|".join(re.escape(_dobrar(t)) for t in termos) + r")\w*") if termos else None
+    primeiro = padrao.search(dobrado) if padrao else None
+
+    inicio = max(0, (primeiro.start() if primeiro else 0) - tamanho // 3)
+    fim = min(len(texto), inicio + tamanho)
+    partes, pos = [], inicio
+    if padrao:
+        for achado in padrao.finditer(dobrado, inicio, fim):
+            partes += [texto[pos:achado.start()], _INICIO_DESTAQUE, texto[achado.start():achado.end()], _FIM_DESTAQUE]
+            pos = achado.end()
+    partes.append(texto[pos:fim])
+    recorte = "".join(partes)
+    return _marcar(("…" if inicio > 0 else "") + recorte + ("…" if fim < len(texto) else ""))
+
+
+# -----------------------------
+# 🔎 Consultas de documentos
+# -----------------------------
+def _expressao_fts(termos):
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in termos)
+
+
+def _expressao_mysql(termos):
+    return " ".join(f"+{t}*" for t in termos)
+
+
+def filtro_documentos(tipo, termo):
+    """
+    Condição para filtrar um modelo de documento pelo termo (usada nas listagens
+    de atas, cartas e certificados). Com índice: `id IN (resultado do índice)`;
+    sem índice: ILIKE em todos os campos indexáveis.
+    """
+    config = DOCUMENTOS[tipo]
+    modelo = config["modelo"]
+    termos = _termos(termo)
+    if not termos:
+        return None
+
+    dialeto = db.engine.dialect.name
+    if indice_pronto(indice="documentos"):
+        if dialeto == "sqlite":
+            ids = text(
+                f"SELECT doc_id FROM {FTS_DOCUMENTOS} WHERE {FTS_DOCUMENTOS} MATCH :expressao AND tipo = :tipo"
+            ).bindparams(expressao=_expressao_fts(termos), tipo=tipo).columns(doc_id=Integer)
+            return modelo.id.in_(ids.subquery().select())
+        if dialeto in ("mysql", "mariadb"):
+            ids = text(
+                f"SELECT doc_id FROM {TABELA_DOCUMENTOS} WHERE tipo = :tipo AND "
+                f"MATCH (titulo, pessoas, conteudo) AGAINST (:expressao IN BOOLEAN MODE)"
+            ).bindparams(expressao=_expressao_mysql(termos), tipo=tipo).columns(doc_id=Integer)
+            return modelo.id.in_(ids.subquery().select())
+
+    campos = ("titulo",) + config["pessoas"] + config["conteudo"]
+    return db.and_(*(
+        or_(*(getattr(modelo, c).ilike(f"%{t}%") for c in campos)) for t in termos
+    ))
+
+
+def buscar_documentos(termo, tipos=None, page=1, per_page=20):
+    """
+    Busca em atas, cartas e certificados ao mesmo tempo.
+    Retorna PaginaBusca cujos itens são dicts: tipo, rotulo, id, titulo, data, trecho.
+    """
+    termos = _termos(termo)
+    tipos = [t for t in (tipos or DOCUMENTOS) if t in DOCUMENTOS]
+    if not termos or not tipos:
+        return PaginaBusca([], page, per_page, 0)
+
+    dialeto = db.engine.dialect.name
+    offset = (page - 1) * per_page
+    filtro_tipo = " AND tipo IN (" + ", ".join(f":tipo{i}" for i in range(len(tipos))) + ")"
+    parametros = {f"tipo{i}": t for i, t in enumerate(tipos)}
+
+    if indice_pronto(indice="documentos") and dialeto == "sqlite":
+        parametros["expressao"] = _expressao_fts(termos)
+        where = f"{FTS_DOCUMENTOS} MATCH :expressao" + filtro_tipo
+        total = db.session.execute(text(f"SELECT count(*) FROM {FTS_DOCUMENTOS} WHERE {where}"), parametros).scalar()
+        pesos = ", ".join(str(p) for p in PESOS_DOCUMENTOS)
+        linhas = db.session.execute(text(
+            f"SELECT tipo, doc_id, titulo, snippet({FTS_DOCUMENTOS}, -1, :ini, :fim, '…', 24) AS trecho "
+            f"FROM {FTS_DOCUMENTOS} WHERE {where} "
+            f"ORDER BY bm25({FTS_DOCUMENTOS}, {pesos}) LIMIT :limite OFFSET :offset"
+        ), {**parametros, "ini": _INICIO_DESTAQUE, "fim": _FIM_DESTAQUE,
+            "limite": per_page, "offset": offset}).all()
+        resultados = [(l.tipo, int(l.doc_id), l.titulo, _marcar(l.trecho)) for l in linhas]
+
+    elif indice_pronto(indice="documentos") and dialeto in ("mysql", "mariadb"):
+        parametros["expressao"] = _expressao_mysql(termos)
+        score = "MATCH (titulo, pessoas, conteudo) AGAINST (:expressao IN BOOLEAN MODE)"
+        where = score + filtro_tipo
+        total = db.session.execute(text(f"SELECT count(*) FROM {TABELA_DOCUMENTOS} WHERE {where}"), parametros).scalar()
+        linhas = db.session.execute(text(
+            f"SELECT tipo, doc_id, titulo, pessoas, conteudo, {score} AS score "
+            f"FROM {TABELA_DOCUMENTOS} WHERE {where} ORDER BY score DESC LIMIT :limite OFFSET :offset"
+        ), {**parametros, "limite": per_page, "offset": offset}).all()
+        resultados = [
+            (l.tipo, int(l.doc_id), l.titulo, trecho(f"{l.conteudo}\n{l.pessoas}", termos))
+            for l in linhas
+        ]
+
+    else:
+        # 🔸 sem índice: ILIKE em cada modelo, ordenado por data (mais recente primeiro)
+        encontrados = []
+        for tipo in tipos:
+            config = DOCUMENTOS[tipo]
+            modelo = config["modelo"]
+            for doc in modelo.query.filter(filtro_documentos(tipo, termo)).all():
+                encontrados.append((doc.data_emissao, tipo, doc))
+        encontrados.sort(key=lambda item: (item[0] is not None, item[0]), reverse=True)
+        total = len(encontrados)
+        resultados = [
+            (tipo, doc.id, doc.titulo,
+             trecho(_juntar(doc, DOCUMENTOS[tipo]["conteudo"] + DOCUMENTOS[tipo]["pessoas"]), termos))
+            for _, tipo, doc in encontrados[offset:offset + per_page]
+        ]
+
+    # datas vêm dos próprios modelos (uma consulta por tipo)
+    ids_por_tipo = {}
+    for tipo, doc_id, _, _ in resultados:
+        ids_por_tipo.setdefault(tipo, []).append(doc_id)
+    datas = {}
+    for tipo, ids in ids_por_tipo.items():
+        modelo = DOCUMENTOS[tipo]["modelo"]
+        for doc_id, data in db.session.query(modelo.id, modelo.data_emissao).filter(modelo.id.in_(ids)):
+            datas[(tipo, doc_id)] = data
+
+    itens = [
+        {"tipo": tipo, "rotulo": DOCUMENTOS[tipo]["rotulo"], "id": doc_id, "titulo": titulo,
+         "data": datas.get((tipo, doc_id)), "trecho": destaque}
+        for tipo, doc_id, titulo, destaque in resultados
+        if (tipo, doc_id) in datas   # ignora entradas órfãs do índice
+    ]
+    return PaginaBusca(itens, page, per_page, total)
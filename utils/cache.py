@@ -0,0 +1,221 @@
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# -----------------------------
+# 🧠 Backend em memória (LRU com TTL, por processo)
+# -----------------------------
+class MemoriaBackend:
+    def __init__(self, max_itens=256):
+        self.max_itens = max_itens
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            valor, expira = item
+            if expira < time.time():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl):
+        with self._lock:
+            self._dados[chave] = (valor, time.time() + ttl)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def delete_prefix(self, prefixo):
+        with self._lock:
+            for chave in [c for c in self._dados if c.startswith(prefixo)]:
+                del self._dados[chave]
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+
+# -----------------------------
+# 🗄️ Backend SQLite (arquivo compartilhado entre processos do mod_wsgi)
+# -----------------------------
+class SQLiteBackend:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with self._conexao() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fragmentos ("
+                " chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL)"
+            )
+
+    def _conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, chave):
+        linha = self._conexao().execute(
+            "SELECT valor, expira FROM fragmentos WHERE chave = ?", (chave,)
+        ).fetchone()
+        if linha is None or linha[1] < time.time():
+            return None
+        return pickle.loads(linha[0])
+
+    def set(self, chave, valor, ttl):
+        self._conexao().execute(
+            "INSERT OR REPLACE INTO fragmentos (chave, valor, expira) VALUES (?, ?, ?)",
+            (chave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), time.time() + ttl)
+        )
+
+    def delete_prefix(self, prefixo):
+        conn = self._conexao()
+        conn.execute("DELETE FROM fragmentos WHERE substr(chave, 1, ?) = ?", (len(prefixo), prefixo))
+        conn.execute("DELETE FROM fragmentos WHERE expira < ?", (time.time(),))
+
+    def clear(self):
+        self._conexao().execute("DELETE FROM fragmentos")
+
+
+class NenhumBackend:
+    """Desliga o cache (útil para depuração)."""
+
+    def get(self, chave):
+        return None
+
+    def set(self, chave, valor, ttl):
+        pass
+
+    def delete_prefix(self, prefixo):
+        pass
+
+    def clear(self):
+        pass
+
+
+# -----------------------------
+# 🧩 Cache de fragmentos (widgets) com invalidação por modelo
+# -----------------------------
+class FragmentCache:
+    """
+    Cache por widget. Cada fragmento declara de quais modelos depende; quando
+    uma transação que gravou um desses modelos faz commit, os fragmentos
+    dependentes são invalidados (evento `after_commit` do SQLAlchemy).
+
+    Configuração:
+    - CACHE_BACKEND: "memoria" (padrão), "sqlite" ou "nenhum"
+    - CACHE_TTL: validade padrão em segundos
+    - CACHE_MAX_ITENS: limite do LRU em memória
+    - CACHE_PATH: arquivo do backend SQLite
+    """
+
+    def __init__(self, app=None):
+        self.backend = NenhumBackend()
+        self.ttl = 300
+        self._dependencias = {}   # nome do fragmento -> {nomes de modelos}
+        self._contadores = {}     # nome do fragmento -> {"hits": n, "misses": n}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        tipo = app.config.get("CACHE_BACKEND", "memoria")
+        self.ttl = int(app.config.get("CACHE_TTL", 300))
+
+        if tipo == "sqlite":
+            self.backend = SQLiteBackend(app.config.get("CACHE_PATH")
+                                         or os.path.join(app.instance_path, "cache.sqlite"))
+        elif tipo == "memoria":
+            self.backend = MemoriaBackend(int(app.config.get("CACHE_MAX_ITENS", 256)))
+        else:
+            self.backend = NenhumBackend()
+
+        app.extensions["fragment_cache"] = self
+        self._registrar_eventos()
+
+    # 🔹 API de uso
+    def fragmento(self, nome, *modelos, ttl=None):
+        """Decorator: guarda o retorno da função sob `nome` + argumentos."""
+        self._dependencias[nome] = {m.__name__ for m in modelos}
+
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args):
+                chave = f"{nome}:" + ":".join(str(a) for a in args)
+                valor = self.backend.get(chave)
+                if valor is not None:
+                    self._contar(nome, "hits")
+                    return valor
+                self._contar(nome, "misses")
+                valor = f(*args)
+                if valor is not None:   # None não é guardado: a próxima chamada consulta de novo
+                    self.backend.set(chave, valor, ttl or self.ttl)
+                return valor
+            return wrapper
+        return decorator
+
+    def invalidar(self, *nomes_modelos):
+        nomes_modelos = set(nomes_modelos)
+        for nome, dependencias in self._dependencias.items():
+            if dependencias & nomes_modelos:
+                self.backend.delete_prefix(f"{nome}:")
+                self._contar(nome, "invalidacoes")
+
+    def limpar(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            fragmentos = {nome: dict(c) for nome, c in self._contadores.items()}
+        hits = sum(c.get("hits", 0) for c in fragmentos.values())
+        misses = sum(c.get("misses", 0) for c in fragmentos.values())
+        return {
+            "backend": type(self.backend).__name__,
+            "pid": os.getpid(),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+            "fragmentos": fragmentos,
+        }
+
+    def _contar(self, nome, campo):
+        with self._lock:
+            contadores = self._contadores.setdefault(nome, {"hits": 0, "misses": 0, "invalidacoes": 0})
+            contadores[campo] += 1
+
+    # 🔹 Invalidação automática
+    def _registrar_eventos(self):
+        if event.contains(Session, "after_commit", self._apos_commit):
+            return
+        event.listen(Session, "after_flush", self._apos_flush)
+        event.listen(Session, "after_commit", self._apos_commit)
+        event.listen(Session, "after_rollback", self._apos_rollback)
+
+    def _apos_flush(self, session, flush_context):
+        alterados = session.info.setdefault("cache_modelos_alterados", set())
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            alterados.add(type(obj).__name__)
+
+    def _apos_commit(self, session):
+        alterados = session.info.pop("cache_modelos_alterados", None)
+        if alterados:
+            self.invalidar(*alterados)
+
+    def _apos_rollback(self, session):
+        session.info.pop("cache_modelos_alterados", None)
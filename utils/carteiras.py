@@ -0,0 +1,88 @@
+import io
+import os
+import threading
+
+from flask import current_app, render_template
+from sqlalchemy import or_
+
+from app.extensions import db, renderizador_pdf
+from app.models import Member
+
+# -----------------------------
+# 🪪 Carteirinhas em lote
+# -----------------------------
+# Gera um único PDF pronto para impressão com as carteirinhas dos membros
+# filtrados, CARTEIRAS_POR_FOLHA por folha A4. Os membros são divididos em
+# partes de FOLHAS_POR_PARTE folhas; cada parte vira um PDF no pool de
+# processos do RenderizadorPDF e no fim as partes são unidas (pypdf).
+# O lote roda na fila de tarefas (tarefa "carteiras_lote"), que guarda o
+# andamento e o arquivo para download.
+
+CARTEIRAS_POR_FOLHA = 5
+FOLHAS_POR_PARTE = 10
+TEMPLATE_LOTE = "membros/carteiras_lote_pdf.html"
+
+
+# -----------------------------
+# 🔎 Seleção dos membros
+# -----------------------------
+def filtrar_membros(status=None, funcao=None, validade_ate=None):
+    """Membros ativos (sem data de saída e não visitantes), com os filtros opcionais."""
+    query = Member.query.filter(
+        Member.data_saida.is_(None),
+        or_(Member.visitante.is_(False), Member.visitante.is_(None)),
+    )
+    if status:
+        query = query.filter(Member.status == status)
+    if funcao:
+        query = query.filter(Member.funcao == funcao)
+    if validade_ate:
+        query = query.filter(Member.validade <= validade_ate)
+    return query.order_by(Member.nome.asc())
+
+
+# -----------------------------
+# 🖨️ Geração (executada como tarefa da fila — ver utils/tarefas.py)
+# -----------------------------
+def gerar_pdf_carteiras(destino, status=None, funcao=None, validade_ate=None, ao_progresso=None):
+    """
+    Grava em `destino` o PDF com as carteirinhas dos membros filtrados.
+    Devolve a quantidade de carteirinhas; `ao_progresso(prontas, total)` acompanha as partes.
+    """
+    from pypdf import PdfWriter
+
+    ids = [membro_id for (membro_id,) in filtrar_membros(status, funcao, validade_ate).with_entities(Member.id)]
+    if not ids:
+        return 0
+
+    por_parte = CARTEIRAS_POR_FOLHA * FOLHAS_POR_PARTE
+    fatias = [ids[i:i + por_parte] for i in range(0, len(ids), por_parte)]
+
+    # Jinja aqui, WeasyPrint no pool: o HTML de cada parte é montado antes
+    htmls = []
+    for fatia in fatias:
+        membros = Member.query.filter(Member.id.in_(fatia)).order_by(Member.nome.asc()).all()
+        htmls.append(render_template(TEMPLATE_LOTE, membros=membros, por_folha=CARTEIRAS_POR_FOLHA))
+        db.session.expunge_all()
+
+    trava = threading.Lock()
+    prontas = [0]
+
+    def ao_concluir(_indice):
+        with trava:
+            prontas[0] += 1
+            if ao_progresso:
+                ao_progresso(prontas[0], len(fatias))
+
+    # as fotos são resolvidas direto do disco, relativas à pasta static
+    partes = renderizador_pdf.converter_varios(
+        htmls, base_url=current_app.static_folder + os.sep, ao_concluir=ao_concluir
+    )
+
+    escritor = PdfWriter()
+    for parte in partes:
+        escritor.append(io.BytesIO(parte))
+    with open(f"{destino}.tmp", "wb") as arquivo:
+        escritor.write(arquivo)
+    os.replace(f"{destino}.tmp", destino)
+    return len(ids)
@@ -0,0 +1,249 @@
+import time
+import smtplib
+from datetime import datetime
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import update
+
+from app.extensions import db, mail
+
+# -----------------------------
+# 📧 Envio de e-mails em lote
+# -----------------------------
+# Em vez de uma mensagem com todos os endereços em "Para" (expondo a lista
+# e abrindo uma conexão SMTP por evento), o envio:
+# - reutiliza a mesma conexão (mail.connect()) por MAIL_POR_CONEXAO mensagens;
+# - agrupa os destinatários em cópias ocultas de MAIL_LOTE_BCC endereços
+#   (MAIL_MODO="bcc") ou manda uma mensagem personalizada por membro
+#   (MAIL_MODO="individual");
+# - respeita o limite do provedor (MAIL_LIMITE_POR_MINUTO destinatários);
+# - grava a situação de cada destinatário em "envios_email". Se a tarefa
+#   for repetida (queda do SMTP, erro 4xx), só os pendentes são reenviados.
+
+MODOS = ("bcc", "individual")
+
+
+class FalhaTemporaria(Exception):
+    """O servidor SMTP pediu para tentar mais tarde (4xx) ou a conexão caiu."""
+
+
+def normalizar_destinatarios(pares):
+    """Recebe (email, nome) e devolve a lista sem vazios nem repetidos (ignorando maiúsculas)."""
+    vistos = {}
+    for email, nome in pares:
+        email = (email or "").strip()
+        if "@" not in email:
+            continue
+        vistos.setdefault(email.lower(), (email, nome))
+    return list(vistos.values())
+
+
+class _Ritmo:
+    """Espaça os envios para não passar de `limite` destinatários por minuto."""
+
+    def __init__(self, limite):
+        self.limite = limite
+        self.inicio = time.monotonic()
+        self.enviados = 0
+
+    def aguardar(self, quantidade):
+        if self.limite:
+            previsto = self.inicio + self.enviados * 60.0 / self.limite
+            espera = previsto - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+        self.enviados += quantidade
+
+
+class _Conexao:
+    """Conexão SMTP reaproveitada; reabre a cada `por_conexao` mensagens e guarda as recusas."""
+
+    def __init__(self, por_conexao):
+        self.por_conexao = por_conexao
+        self._contexto = None
+        self._conn = None
+        self._mensagens = 0
+        self.recusados = {}
+
+    def _abrir(self):
+        self._contexto = mail.connect()
+        self._conn = self._contexto.__enter__()
+        self._mensagens = 0
+        host = self._conn.host
+        if host is not None:
+            original = host.sendmail
+
+            # o Flask-Mail descarta o retorno do sendmail (endereços recusados um a um)
+            def sendmail(*args, **kwargs):
+                self.recusados = original(*args, **kwargs) or {}
+                return self.recusados
+            host.sendmail = sendmail
+
+    def fechar(self):
+        if self._contexto is not None:
+            try:
+                self._contexto.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._contexto = self._conn = None
+
+    def enviar(self, mensagem):
+        if self._conn is None or self._mensagens >= self.por_conexao:
+            self.fechar()
+            self._abrir()
+        self.recusados = {}
+        self._conn.send(mensagem)
+        self._mensagens += 1
+        return self.recusados
+
+
+def _registrar_destinatarios(job_id, referencia, assunto, destinatarios):
+    """Cria (uma vez) as linhas de envio e devolve {email: id} dos que ainda estão pendentes."""
+    from app.models import EnvioEmail
+
+    existentes = {}
+    if job_id is not None:
+        existentes = {
+            envio.destinatario.lower(): envio
+            for envio in EnvioEmail.query.filter_by(job_id=job_id, referencia=referencia)
+        }
+
+    novos = [
+        EnvioEmail(job_id=job_id, referencia=referencia, assunto=assunto[:255], destinatario=email)
+        for email, _ in destinatarios if email.lower() not in existentes
+    ]
+    if novos:
+        db.session.add_all(novos)
+        db.session.commit()
+
+    pendentes = {}
+    for envio in list(existentes.values()) + novos:
+        if envio.situacao == EnvioEmail.PENDENTE:
+            pendentes[envio.destinatario.lower()] = envio.id
+    return pendentes
+
+
+def _marcar(ids, situacao, erro=None):
+    from app.models import EnvioEmail
+
+    if not ids:
+        return
+    envios = EnvioEmail.__table__
+    valores = {"situacao": situacao, "erro": (erro or None) and erro[:255],
+               "tentativas": envios.c.tentativas + 1}
+    if situacao == EnvioEmail.ENVIADO:
+        valores["enviado_em"] = datetime.utcnow()
+    with db.engine.begin() as conn:
+        conn.execute(update(envios).where(envios.c.id.in_(ids)).values(**valores))
+
+
+def enviar_em_lote(assunto, destinatarios, montar_html, referencia, job_id=None, modo=None, ao_progresso=None):
+    """
+    Envia `assunto` para os destinatários [(email, nome), ...].
+    - montar_html(nome): corpo da mensagem (nome=None no modo "bcc"), chamado
+      uma vez por mensagem, na hora do envio (ver utils/lembretes.py)
+    - referencia: agrupa os envios (ex: "evento:12"); com job_id permite retomar
+    Devolve (enviados, falhas) desta execução.
+    Levanta FalhaTemporaria se o SMTP cair ou responder 4xx — os pendentes
+    ficam gravados e são enviados na próxima tentativa da tarefa. Recusas 4xx
+    de um destinatário (ex.: greylisting 450/451) também o deixam pendente;
+    o lote segue e a FalhaTemporaria é levantada no fim. Só 5xx é definitivo.
+    """
+    from app.models import EnvioEmail
+
+    config = current_app.config
+    modo = modo or config.get("MAIL_MODO", "bcc")
+    if modo not in MODOS:
+        raise ValueError(f"MAIL_MODO inválido: {modo}")
+
+    destinatarios = normalizar_destinatarios(destinatarios)
+    pendentes = _registrar_destinatarios(job_id, referencia, assunto, destinatarios)
+    nomes = {email.lower(): nome for email, nome in destinatarios}
+    enderecos = [email for email, _ in destinatarios if email.lower() in pendentes]
+    if not enderecos:
+        return 0, 0
+
+    # as mensagens são geradas sob demanda (cada uma com a lista de endereços
+    # que cobre): no modo individual só um corpo fica em memória por vez
+    if modo == "bcc":
+        lote = max(1, int(config.get("MAIL_LOTE_BCC", 50)))
+        corpo = montar_html(None)
+        total = (len(enderecos) + lote - 1) // lote
+        mensagens = (
+            (Message(subject=assunto, bcc=grupo, html=corpo,
+                     extra_headers={"To": "undisclosed-recipients:;"}), grupo)
+            for grupo in (enderecos[i:i + lote] for i in range(0, len(enderecos), lote))
+        )
+    else:
+        total = len(enderecos)
+        mensagens = (
+            (Message(subject=assunto, recipients=[email], html=montar_html(nomes[email.lower()])), [email])
+            for email in enderecos
+        )
+
+    conexao = _Conexao(max(1, int(config.get("MAIL_POR_CONEXAO", 100))))
+    ritmo = _Ritmo(int(config.get("MAIL_LIMITE_POR_MINUTO", 0)))
+    enviados = falhas = adiados = 0
+
+    try:
+        for indice, (mensagem, grupo) in enumerate(mensagens, start=1):
+            ids = {email.lower(): pendentes[email.lower()] for email in grupo}
+            ritmo.aguardar(len(grupo))
+            try:
+                try:
+                    recusados = conexao.enviar(mensagem)
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    # conexão derrubada pelo servidor: reabre e tenta a mesma mensagem uma vez
+                    conexao.fechar()
+                    recusados = conexao.enviar(mensagem)
+            except smtplib.SMTPRecipientsRefused as e:
+                recusados = e.recipients
+            except smtplib.SMTPAuthenticationError:
+                raise
+            except smtplib.SMTPResponseException as e:
+                if 400 <= e.smtp_code < 500:
+                    raise FalhaTemporaria(f"SMTP {e.smtp_code}: {e.smtp_error!r}") from e
+                # recusa definitiva da mensagem (ex.: 552 tamanho): marca o grupo e segue
+                _marcar(list(ids.values()), EnvioEmail.FALHOU, f"SMTP {e.smtp_code}: {e.smtp_error!r}")
+                falhas += len(ids)
+                continue
+            except OSError as e:   # inclui SMTPServerDisconnected e falhas de rede
+                raise FalhaTemporaria(f"Conexão SMTP perdida: {e}") from e
+
+            recusados = {endereco.lower(): erro for endereco, erro in (recusados or {}).items()}
+            for endereco, (codigo, resposta) in recusados.items():
+                if endereco not in ids:
+                    continue
+                if 400 <= codigo < 500:
+                    # recusa temporária: continua pendente (com o erro anotado) para a próxima tentativa
+                    _marcar([ids.pop(endereco)], EnvioEmail.PENDENTE, f"SMTP {codigo}: {resposta!r}")
+                    adiados += 1
+                else:
+                    _marcar([ids.pop(endereco)], EnvioEmail.FALHOU, f"SMTP {codigo}: {resposta!r}")
+                    falhas += 1
+            _marcar(list(ids.values()), EnvioEmail.ENVIADO)
+            enviados += len(ids)
+
+            if ao_progresso:
+                ao_progresso(indice, total)
+    finally:
+        conexao.fechar()
+
+    if adiados:
+        raise FalhaTemporaria(f"{adiados} destinatário(s) recusado(s) temporariamente (4xx); "
+                              f"serão reenviados na próxima tentativa.")
+    return enviados, falhas
+
+
+def resumo_envios(job_id):
+    """Contagem por situação dos envios de uma tarefa."""
+    from sqlalchemy import func
+    from app.models import EnvioEmail
+
+    return dict(
+        db.session.query(EnvioEmail.situacao, func.count(EnvioEmail.id))
+        .filter(EnvioEmail.job_id == job_id)
+        .group_by(EnvioEmail.situacao)
+        .all()
+    )
@@ -0,0 +1,423 @@
+from collections import Counter
+
+from sqlalchemy import event, func, and_, case, inspect
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.extensions import db, cache
+from app.models import Member, Financeiro
+from app.models.estatisticas import MemberStatsMensal, FinanceiroStatsMensal
+
+# -----------------------------
+# 📊 Rollups mensais do dashboard
+# -----------------------------
+# As tabelas member_stats_monthly e financeiro_stats_monthly são mantidas
+# incrementalmente pelos eventos do SQLAlchemy abaixo, dentro da mesma
+# transação que grava o Member/Financeiro. Operações em massa
+# (Query.update/delete) não disparam esses eventos: nesses casos rode
+# `flask estatisticas reconstruir`.
+
+def _mes(d):
+    """Retorna a chave (ano, mes) de uma data, ou None."""
+    if d is None:
+        return None
+    return (d.year, d.month)
+
+
+def _valor_anterior(target, atributo):
+    """Valor do atributo antes do flush atual (ou o atual, se não mudou)."""
+    historico = inspect(target).attrs[atributo].history
+    if historico.deleted:
+        return historico.deleted[0]
+    if historico.added:
+        return None
+    return getattr(target, atributo)
+
+
+def _somar(connection, tabela, chave, **deltas):
+    """Soma `deltas` na linha `chave` do rollup, criando a linha se preciso."""
+    deltas = {col: valor for col, valor in deltas.items() if valor}
+    if not deltas:
+        return
+
+    # upsert atômico: duas gravações que abrem o mesmo mês ao mesmo tempo não
+    # colidem na chave primária (UPDATE + INSERT separados dariam IntegrityError
+    # no SQLite e deadlock por gap lock no InnoDB)
+    dialeto = connection.dialect.name
+    if dialeto in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialeto == "sqlite" else postgresql_insert
+        comando = insert(tabela).values(**chave, **deltas)
+        connection.execute(comando.on_conflict_do_update(
+            index_elements=list(chave),
+            set_={col: tabela.c[col] + comando.excluded[col] for col in deltas},
+        ))
+        return
+    if dialeto in ("mysql", "mariadb"):
+        comando = mysql_insert(tabela).values(**chave, **deltas)
+        connection.execute(comando.on_duplicate_key_update(
+            {col: tabela.c[col] + comando.inserted[col] for col in deltas}
+        ))
+        return
+
+    condicao = and_(*(tabela.c[col] == valor for col, valor in chave.items()))
+    resultado = connection.execute(
+        tabela.update()
+        .where(condicao)
+        .values({col: tabela.c[col] + valor for col, valor in deltas.items()})
+    )
+    if resultado.rowcount == 0:
+        connection.execute(tabela.insert().values(**chave, **deltas))
+
+
+# -----------------------------
+# 👥 Eventos de Member
+# -----------------------------
+_member_stats = MemberStatsMensal.__table__
+
+
+def _ajustar_member(connection, cadastro, saida, sinal):
+    chave = _mes(cadastro)
+    if chave:
+        _somar(connection, _member_stats, {"ano": chave[0], "mes": chave[1]}, cadastros=sinal)
+    chave = _mes(saida)
+    if chave:
+        _somar(connection, _member_stats, {"ano": chave[0], "mes": chave[1]}, saidas=sinal)
+
+
+@event.listens_for(Member, "after_insert")
+def _member_inserido(mapper, connection, target):
+    _ajustar_member(connection, target.data_cadastro, target.data_saida, 1)
+
+
+@event.listens_for(Member, "after_update")
+def _member_atualizado(mapper, connection, target):
+    antigo_cadastro = _valor_anterior(target, "data_cadastro")
+    antiga_saida = _valor_anterior(target, "data_saida")
+    if _mes(antigo_cadastro) == _mes(target.data_cadastro) and _mes(antiga_saida) == _mes(target.data_saida):
+        return
+    _ajustar_member(connection, antigo_cadastro, antiga_saida, -1)
+    _ajustar_member(connection, target.data_cadastro, target.data_saida, 1)
+
+
+@event.listens_for(Member, "after_delete")
+def _member_excluido(mapper, connection, target):
+    _ajustar_member(connection, target.data_cadastro, target.data_saida, -1)
+
+
+# -----------------------------
+# 💰 Eventos de Financeiro
+# -----------------------------
+_financeiro_stats = FinanceiroStatsMensal.__table__
+
+
+def _ajustar_financeiro(connection, data, tipo, valor, sinal):
+    chave = _mes(data)
+    if not chave or not tipo:
+        return
+    _somar(
+        connection, _financeiro_stats,
+        {"ano": chave[0], "mes": chave[1], "tipo": tipo},
+        total=sinal * float(valor or 0.0),
+        quantidade=sinal,
+    )
+
+
+@event.listens_for(Financeiro, "after_insert")
+def _financeiro_inserido(mapper, connection, target):
+    _ajustar_financeiro(connection, target.data, target.tipo, target.valor, 1)
+
+
+@event.listens_for(Financeiro, "after_update")
+def _financeiro_atualizado(mapper, connection, target):
+    antigo = (
+        _valor_anterior(target, "data"),
+        _valor_anterior(target, "tipo"),
+        _valor_anterior(target, "valor"),
+    )
+    if (_mes(antigo[0]), antigo[1], antigo[2]) == (_mes(target.data), target.tipo, target.valor):
+        return
+    _ajustar_financeiro(connection, *antigo, -1)
+    _ajustar_financeiro(connection, target.data, target.tipo, target.valor, 1)
+
+
+@event.listens_for(Financeiro, "after_delete")
+def _financeiro_excluido(mapper, connection, target):
+    _ajustar_financeiro(connection, target.data, target.tipo, target.valor, -1)
+
+
+def _carregar_valor_antigo(target, value, oldvalue, initiator):
+    """Sem efeito; existe só para ativar o active_history do atributo."""
+
+
+# 🔹 active_history garante que o valor antigo seja carregado antes de ser
+#    sobrescrito, mesmo quando o atributo estava expirado (ex.: após um commit)
+for _atributo in (Member.data_cadastro, Member.data_saida,
+                  Financeiro.data, Financeiro.tipo, Financeiro.valor):
+    event.listen(_atributo, "set", _carregar_valor_antigo, active_history=True)
+
+
+# -----------------------------
+# 🔄 Agregados "ao vivo" (usados na reconstrução e na verificação)
+# -----------------------------
+def _agregados_members():
+    """{(ano, mes): {"cadastros": n, "saidas": n}} calculado direto de members."""
+    agregados = {}
+
+    for coluna, campo in ((Member.data_cadastro, "cadastros"), (Member.data_saida, "saidas")):
+        linhas = (
+            db.session.query(
+                func.extract('year', coluna).label("ano"),
+                func.extract('month', coluna).label("mes"),
+                func.count(Member.id)
+            )
+            .filter(coluna.isnot(None))
+            .group_by("ano", "mes")
+            .all()
+        )
+        for ano, mes, quantidade in linhas:
+            chave = (int(ano), int(mes))
+            agregados.setdefault(chave, {"cadastros": 0, "saidas": 0})[campo] = int(quantidade)
+
+    return agregados
+
+
+def _agregados_financeiro():
+    """{(ano, mes, tipo): {"total": x, "quantidade": n}} calculado direto de financeiro."""
+    linhas = (
+        db.session.query(
+            func.extract('year', Financeiro.data).label("ano"),
+            func.extract('month', Financeiro.data).label("mes"),
+            Financeiro.tipo,
+            func.coalesce(func.sum(Financeiro.valor), 0.0),
+            func.count(Financeiro.id)
+        )
+        .filter(Financeiro.data.isnot(None))
+        .group_by("ano", "mes", Financeiro.tipo)
+        .all()
+    )
+    return {
+        (int(ano), int(mes), tipo): {"total": float(total), "quantidade": int(quantidade)}
+        for ano, mes, tipo, total, quantidade in linhas
+    }
+
+
+def reconstruir_estatisticas():
+    """Apaga e recalcula os rollups a partir das tabelas de origem."""
+    members = _agregados_members()
+    financeiro = _agregados_financeiro()
+
+    db.session.query(MemberStatsMensal).delete(synchronize_session=False)
+    db.session.query(FinanceiroStatsMensal).delete(synchronize_session=False)
+
+    if members:
+        db.session.execute(
+            _member_stats.insert(),
+            [{"ano": ano, "mes": mes, **valores} for (ano, mes), valores in members.items()]
+        )
+    if financeiro:
+        db.session.execute(
+            _financeiro_stats.insert(),
+            [{"ano": ano, "mes": mes, "tipo": tipo, **valores}
+             for (ano, mes, tipo), valores in financeiro.items()]
+        )
+    db.session.commit()
+    cache.invalidar(Member.__name__, Financeiro.__name__)
+
+    return len(members), len(financeiro)
+
+
+def verificar_estatisticas(tolerancia=0.005):
+    """
+    Compara os rollups com os agregados ao vivo.
+    Retorna uma lista de divergências (tabela, chave, campo, rollup, ao_vivo);
+    lista vazia significa que está tudo consistente.
+    """
+    divergencias = []
+
+    def comparar(tabela, esperado, atual, campos):
+        for chave in sorted(set(esperado) | set(atual), key=str):
+            for campo in campos:
+                valor_vivo = esperado.get(chave, {}).get(campo, 0)
+                valor_rollup = atual.get(chave, {}).get(campo, 0)
+                if abs(valor_vivo - valor_rollup) > tolerancia:
+                    divergencias.append((tabela, chave, campo, valor_rollup, valor_vivo))
+
+    comparar(
+        _member_stats.name,
+        _agregados_members(),
+        {(r.ano, r.mes): {"cadastros": r.cadastros, "saidas": r.saidas}
+         for r in MemberStatsMensal.query.all()},
+        ("cadastros", "saidas"),
+    )
+    comparar(
+        _financeiro_stats.name,
+        _agregados_financeiro(),
+        {(r.ano, r.mes, r.tipo): {"total": r.total, "quantidade": r.quantidade}
+         for r in FinanceiroStatsMensal.query.all()},
+        ("total", "quantidade"),
+    )
+
+    return divergencias
+
+
+# -----------------------------
+# 📈 Leituras usadas pelo dashboard
+# -----------------------------
+def crescimento_mensal():
+    """Linhas (ano, mes, cadastros, saidas) em ordem cronológica."""
+    return (
+        db.session.query(
+            MemberStatsMensal.ano, MemberStatsMensal.mes,
+            MemberStatsMensal.cadastros, MemberStatsMensal.saidas
+        )
+        .order_by(MemberStatsMensal.ano, MemberStatsMensal.mes)
+        .all()
+    )
+
+
+def financeiro_mensal(meses=6):
+    """
+    Totais de Entrada/Saída dos últimos `meses` meses com movimento.
+    Retorna [((ano, mes), {"Entrada": x, "Saída": y}), ...] em ordem cronológica.
+    """
+    chaves = (
+        db.session.query(FinanceiroStatsMensal.ano, FinanceiroStatsMensal.mes)
+        .filter(FinanceiroStatsMensal.tipo.in_(("Entrada", "Saída")))
+        .filter(FinanceiroStatsMensal.quantidade > 0)
+        .distinct()
+        .order_by(FinanceiroStatsMensal.ano.desc(), FinanceiroStatsMensal.mes.desc())
+        .limit(meses)
+        .all()
+    )
+    if not chaves:
+        return []
+
+    por_mes = {(ano, mes): {"Entrada": 0.0, "Saída": 0.0} for ano, mes in chaves}
+    inicio = min(por_mes)
+    linhas = (
+        db.session.query(FinanceiroStatsMensal)
+        .filter(FinanceiroStatsMensal.tipo.in_(("Entrada", "Saída")))
+        .filter(
+            (FinanceiroStatsMensal.ano > inicio[0]) |
+            ((FinanceiroStatsMensal.ano == inicio[0]) & (FinanceiroStatsMensal.mes >= inicio[1]))
+        )
+        .all()
+    )
+    for r in linhas:
+        if (r.ano, r.mes) in por_mes:
+            por_mes[(r.ano, r.mes)][r.tipo] = float(r.total)
+
+    return sorted(por_mes.items())
+
+
+def indicadores_por_ano(total_membros):
+    """
+    Entradas, saídas, movimentação, taxa e total de membros para cada ano de cadastro.
+
+    Faz um único GROUP BY (ano de cadastro, ano de saída) e calcula o total
+    acumulado em memória: o membro conta a partir do ano de cadastro e deixa
+    de contar no ano de saída.
+    """
+    grupos = (
+        db.session.query(
+            func.extract('year', Member.data_cadastro).label("ano_cadastro"),
+            func.extract('year', Member.data_saida).label("ano_saida"),
+            func.count(Member.id)
+        )
+        .group_by("ano_cadastro", "ano_saida")
+        .all()
+    )
+
+    entradas = Counter()
+    saidas = Counter()
+    variacao = Counter()   # +n no ano em que passa a contar, -n no ano em que deixa de contar
+    for ano_cadastro, ano_saida, quantidade in grupos:
+        ano_cadastro = int(ano_cadastro) if ano_cadastro is not None else None
+        ano_saida = int(ano_saida) if ano_saida is not None else None
+
+        if ano_saida is not None:
+            saidas[ano_saida] += quantidade
+        if ano_cadastro is None:
+            continue
+        entradas[ano_cadastro] += quantidade
+        variacao[ano_cadastro] += quantidade
+        if ano_saida is not None:
+            variacao[max(ano_cadastro, ano_saida)] -= quantidade
+
+    total_acumulado = {}
+    acumulado = 0
+    for ano in sorted(variacao):
+        acumulado += variacao[ano]
+        total_acumulado[ano] = acumulado
+
+    indicadores = {}
+    for ano in sorted(entradas):
+        movimentacao = entradas[ano] - saidas[ano]
+        taxa = None
+        if total_membros > 0:
+            taxa = round((movimentacao / total_membros) * 100, 1)
+
+        indicadores[ano] = {
+            "entradas": int(entradas[ano]),
+            "saidas": int(saidas[ano]),
+            "movimentacao": int(movimentacao),
+            "taxa": float(taxa) if taxa is not None else None,
+            "total_membros": int(total_acumulado[ano])
+        }
+
+    return indicadores
+
+
+# -----------------------------
+# 👥 Distribuições do relatório de membros
+# -----------------------------
+FAIXAS_ETARIAS = (("0-18", 18), ("19-35", 35), ("36-60", 60), ("60+", None))
+
+
+def _nascidos_ate(hoje, idade):
+    """Data de nascimento mais recente de quem já completou `idade` + 1 anos hoje."""
+    ano = hoje.year - idade - 1
+    try:
+        return hoje.replace(year=ano)
+    except ValueError:   # 29/02 em ano não bissexto
+        return hoje.replace(year=ano, day=28)
+
+
+def distribuicoes_membros(query, hoje=None):
+    """
+    Distribuições por sexo, situação, estado civil, função e faixa etária em
+    UMA consulta: agrupa pela combinação das cinco colunas (poucas linhas,
+    a faixa é um CASE sobre data_nascimento) e soma as marginais em Python.
+    """
+    from datetime import date
+
+    hoje = hoje or date.today()
+    faixa = case(
+        *[(Member.data_nascimento > _nascidos_ate(hoje, limite), nome)
+          for nome, limite in FAIXAS_ETARIAS if limite is not None],
+        else_=FAIXAS_ETARIAS[-1][0],
+    )
+    faixa = case((Member.data_nascimento.is_(None), None), else_=faixa).label("faixa")
+
+    colunas = (Member.sexo, Member.status, Member.estado_civil, Member.funcao)
+    linhas = (
+        query.with_entities(*colunas, faixa, func.count(Member.id))
+        .order_by(None)
+        .group_by(*colunas, faixa)
+        .all()
+    )
+
+    nomes = ("sexo", "status", "estado_civil", "funcao")
+    distribuicoes = {nome: Counter() for nome in nomes}
+    idades = Counter()
+    for *valores, faixa_etaria, quantidade in linhas:
+        for nome, valor in zip(nomes, valores):
+            distribuicoes[nome][valor or "Não informado"] += int(quantidade)
+        if faixa_etaria is not None:
+            idades[faixa_etaria] += int(quantidade)
+
+    resultado = {nome: list(contagem.items()) for nome, contagem in distribuicoes.items()}
+    resultado["idade"] = {nome: idades[nome] for nome, _ in FAIXAS_ETARIAS if idades[nome]}
+    resultado["total"] = sum(distribuicoes["sexo"].values())
+    return resultado
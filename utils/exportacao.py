@@ -0,0 +1,138 @@
+import csv
+import io
+from xml.sax.saxutils import escape
+
+from utils.streaming import agrupar, zip_stream
+
+# -----------------------------
+# 📤 Exportação de planilhas em streaming (CSV, XLSX, ODS)
+# -----------------------------
+# Todos os geradores recebem um cabeçalho e um iterável de linhas (listas de
+# valores str/int/float) e produzem blocos de bytes, sem materializar o
+# arquivo inteiro em memória.
+
+FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "ods": ("application/vnd.oasis.opendocument.spreadsheet-flat-xml", "fods"),   # ODS "plano" (XML, sem ZIP)
+}
+
+
+def csv_stream(cabecalho, linhas, delimiter=";"):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter)
+
+    def linha_csv(valores):
+        writer.writerow(valores)
+        texto = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return texto
+
+    yield from agrupar(_prefixar(linha_csv(cabecalho), (linha_csv(l) for l in linhas)))
+
+
+def _prefixar(primeiro, resto):
+    yield primeiro
+    yield from resto
+
+
+# -----------------------------
+# 📗 XLSX (SpreadsheetML mínimo, strings inline)
+# -----------------------------
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nome}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_celula(valor):
+    if isinstance(valor, bool) or valor is None:
+        valor = "" if valor is None else ("Sim" if valor else "Não")
+    if isinstance(valor, (int, float)):
+        return f"<c><v>{valor}</v></c>"
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(valor))}</t></is></c>'
+
+
+def _xlsx_planilha(cabecalho, linhas):
+    yield ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+           '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+    for valores in _prefixar(cabecalho, linhas):
+        yield "<row>" + "".join(_xlsx_celula(v) for v in valores) + "</row>"
+    yield "</sheetData></worksheet>"
+
+
+def xlsx_stream(cabecalho, linhas, nome_planilha="Relatorio"):
+    return zip_stream([
+        ("[Content_Types].xml", [_XLSX_CONTENT_TYPES.encode()]),
+        ("_rels/.rels", [_XLSX_RELS.encode()]),
+        ("xl/workbook.xml", [_XLSX_WORKBOOK.format(nome=escape(nome_planilha)).encode()]),
+        ("xl/_rels/workbook.xml.rels", [_XLSX_WORKBOOK_RELS.encode()]),
+        ("xl/worksheets/sheet1.xml", agrupar(_xlsx_planilha(cabecalho, linhas))),
+    ])
+
+
+# -----------------------------
+# 📘 ODS (OpenDocument "flat", um único XML — abre no LibreOffice/Excel)
+# -----------------------------
+def _ods_celula(valor):
+    if isinstance(valor, bool) or valor is None:
+        valor = "" if valor is None else ("Sim" if valor else "Não")
+    if isinstance(valor, (int, float)):
+        return (f'<table:table-cell office:value-type="float" office:value="{valor}">'
+                f'<text:p>{valor}</text:p></table:table-cell>')
+    return f'<table:table-cell office:value-type="string"><text:p>{escape(str(valor))}</text:p></table:table-cell>'
+
+
+def ods_stream(cabecalho, linhas, nome_planilha="Relatorio"):
+    def partes():
+        yield ('<?xml version="1.0" encoding="UTF-8"?>'
+               '<office:document xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+               'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+               'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+               'office:version="1.2" office:mimetype="application/vnd.oasis.opendocument.spreadsheet">'
+               f'<office:body><office:spreadsheet><table:table table:name="{escape(nome_planilha)}">')
+        for valores in _prefixar(cabecalho, linhas):
+            yield "<table:table-row>" + "".join(_ods_celula(v) for v in valores) + "</table:table-row>"
+        yield "</table:table></office:spreadsheet></office:body></office:document>"
+
+    return agrupar(partes())
+
+
+def planilha_stream(formato, cabecalho, linhas, nome_planilha="Relatorio"):
+    """Escolhe o gerador pelo formato ("csv", "xlsx" ou "ods")."""
+    if formato == "xlsx":
+        return xlsx_stream(cabecalho, linhas, nome_planilha)
+    if formato == "ods":
+        return ods_stream(cabecalho, linhas, nome_planilha)
+    return csv_stream(cabecalho, linhas)
@@ -0,0 +1,144 @@
+import io
+import os
+import hashlib
+
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# -----------------------------
+# 🖼️ Fotos de membros e usuários em variantes
+# -----------------------------
+# No envio, a foto original (muitas vezes 12 MP, direto da câmera) é
+# convertida numa "mestra" de até 1600 px e em variantes recortadas no
+# tamanho de uso, todas sem EXIF (localização GPS, modelo da câmera...):
+#
+#   uploads/fotos/ab/ab12cd34ef567890.jpg            mestra (é o que fica no banco)
+#   uploads/fotos/ab/ab12cd34ef567890-avatar.webp    listas, menus, perfil
+#   uploads/fotos/ab/ab12cd34ef567890-cartao.jpg     carteirinha (tela e PDF em lote)
+#   uploads/fotos/ab/ab12cd34ef567890-impressao.jpg  ficha em PDF
+#
+# O nome vem do SHA-256 do arquivo enviado: a mesma foto enviada de novo
+# reaproveita os arquivos, e a URL nunca muda de conteúdo (cache eterno).
+# Nos templates, `foto|foto_variante("avatar")` escolhe a variante e volta
+# para a própria foto quando ela não existe (fotos antigas; gere com
+# `flask fotos variantes`).
+
+PASTA_FOTOS = "fotos"
+LADO_MESTRA = 1600
+
+# variante -> (largura, altura, formato, extensão, opções do Pillow)
+VARIANTES = {
+    "avatar": (160, 160, "WEBP", ".webp", {"quality": 80, "method": 4}),
+    "cartao": (300, 375, "JPEG", ".jpg", {"quality": 85, "optimize": True, "progressive": True}),
+    "impressao": (600, 800, "JPEG", ".jpg", {"quality": 88, "optimize": True}),
+}
+
+# recorte levemente acima do centro: preserva o rosto em fotos de retrato
+CENTRO_RECORTE = (0.5, 0.35)
+
+
+class ErroImagem(Exception):
+    """Arquivo enviado não é uma imagem válida."""
+
+
+def _abrir(dados):
+    try:
+        imagem = Image.open(io.BytesIO(dados))
+        # JPEG grande: decodifica já reduzido (bem mais rápido que abrir os 12 MP e reduzir depois)
+        imagem.draft("RGB", (LADO_MESTRA, LADO_MESTRA))
+        imagem.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ErroImagem("O arquivo enviado não é uma imagem válida (use JPG, PNG ou WebP).") from e
+
+    # aplica a rotação do EXIF antes de descartá-lo
+    imagem = ImageOps.exif_transpose(imagem)
+    if imagem.mode in ("RGBA", "LA", "P"):
+        imagem = imagem.convert("RGBA")
+        fundo = Image.new("RGB", imagem.size, "white")
+        fundo.paste(imagem, mask=imagem.getchannel("A"))
+        return fundo
+    return imagem.convert("RGB")
+
+
+def _salvar(imagem, caminho, formato, opcoes):
+    # grava num temporário e renomeia: nunca se serve uma imagem pela metade
+    temporario = caminho + ".tmp"
+    imagem.save(temporario, formato, **opcoes)   # sem exif=...: os metadados não são copiados
+    os.replace(temporario, caminho)
+
+
+def caminho_variante(foto, variante):
+    """Caminho (relativo, como no banco) da variante de `foto`."""
+    base, _ = os.path.splitext(foto)
+    return f"{base}-{variante}{VARIANTES[variante][3]}"
+
+
+def gerar_variantes(imagem, destino_base, sobrescrever=False):
+    """Grava as variantes de uma imagem já aberta; `destino_base` é o caminho da foto sem extensão."""
+    for variante, (largura, altura, formato, extensao, opcoes) in VARIANTES.items():
+        destino = f"{destino_base}-{variante}{extensao}"
+        if os.path.exists(destino) and not sobrescrever:
+            continue
+        recorte = ImageOps.fit(imagem, (largura, altura), Image.LANCZOS, centering=CENTRO_RECORTE)
+        _salvar(recorte, destino, formato, opcoes)
+
+
+def salvar_foto(arquivo, pasta_uploads):
+    """
+    Processa o arquivo enviado (FileStorage) e devolve o caminho da mestra
+    relativo a `pasta_uploads` (ex.: "fotos/ab/ab12cd34ef567890.jpg").
+    """
+    dados = arquivo.read()
+    nome = hashlib.sha256(dados).hexdigest()[:16]
+    relativo = f"{PASTA_FOTOS}/{nome[:2]}/{nome}.jpg"
+    mestra = os.path.join(pasta_uploads, PASTA_FOTOS, nome[:2], f"{nome}.jpg")
+    if os.path.exists(mestra) and all(
+            os.path.exists(caminho_variante(mestra, variante)) for variante in VARIANTES):
+        return relativo   # mesma foto já processada
+
+    imagem = _abrir(dados)
+    os.makedirs(os.path.dirname(mestra), exist_ok=True)
+    reduzida = imagem.copy()
+    reduzida.thumbnail((LADO_MESTRA, LADO_MESTRA), Image.LANCZOS)
+    _salvar(reduzida, mestra, "JPEG", {"quality": 88, "optimize": True})
+    gerar_variantes(imagem, os.path.splitext(mestra)[0])
+    return relativo
+
+
+def remover_foto(pasta_uploads, foto):
+    """Apaga a foto e suas variantes (caminho relativo a `pasta_uploads`)."""
+    for relativo in [foto, *(caminho_variante(foto, variante) for variante in VARIANTES)]:
+        caminho = os.path.join(pasta_uploads, relativo)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def gerar_variantes_existentes(pasta_static, fotos):
+    """Cria as variantes que faltam para fotos já gravadas (caminhos relativos a static). Devolve (geradas, erros)."""
+    geradas, erros = 0, []
+    for foto in fotos:
+        caminho = os.path.join(pasta_static, foto)
+        if all(os.path.exists(caminho_variante(caminho, variante)) for variante in VARIANTES):
+            continue
+        try:
+            with open(caminho, "rb") as arquivo:
+                imagem = _abrir(arquivo.read())
+        except (OSError, ErroImagem) as e:
+            erros.append((foto, str(e)))
+            continue
+        gerar_variantes(imagem, os.path.splitext(caminho)[0])
+        geradas += 1
+    return geradas, erros
+
+
+def foto_variante(foto, variante="avatar"):
+    """
+    Filtro Jinja: caminho da variante (relativo a static) se ela existir,
+    senão a própria foto. Ex.: url_for('static', filename=membro.foto|foto_variante('avatar'))
+    """
+    if not foto:
+        return foto
+    candidata = caminho_variante(foto, variante)
+    if os.path.exists(os.path.join(current_app.static_folder, candidata)):
+        return candidata
+    return foto
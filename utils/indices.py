@@ -0,0 +1,87 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import Member, PublicLink, Evento, Financeiro, Log
+from utils.aniversarios import filtrar_mes
+
+# -----------------------------
+# 🔎 Consultor de índices
+# -----------------------------
+# Roda EXPLAIN nas consultas "canônicas" de cada blueprint, contra o banco
+# configurado, e aponta as que fazem varredura completa de tabela.
+
+
+def consultas_canonicas():
+    """Lista de (blueprint, descrição, query) representando os caminhos quentes."""
+    hoje = date.today()
+    agora = datetime.now()
+    inicio_semestre = hoje.replace(day=1) - timedelta(days=150)
+
+    return [
+        ("dashboard", "aniversariantes do mês",
+         filtrar_mes(Member.query, hoje.month).limit(5)),
+        ("dashboard", "eventos nos próximos 2 dias",
+         Evento.query.filter(Evento.data_inicio <= agora + timedelta(days=2), Evento.data_fim >= agora)),
+        ("financeiro", "resumo dos últimos 6 meses",
+         db.session.query(Financeiro.tipo, func.sum(Financeiro.valor))
+         .filter(Financeiro.data >= inicio_semestre, Financeiro.tipo.in_(("Entrada", "Saída")))
+         .group_by(Financeiro.tipo)),
+        ("financeiro", "relatório por tipo e período",
+         Financeiro.query.filter(Financeiro.tipo == "Entrada", Financeiro.data >= inicio_semestre)
+         .order_by(Financeiro.data.desc(), Financeiro.id.desc()).limit(50)),
+        ("member", "membros ativos",
+         db.session.query(func.count(Member.id)).filter(Member.data_saida.is_(None))),
+        ("member", "link de visitante ativo",
+         PublicLink.query.filter_by(tipo="visitante", ativo=True)
+         .order_by(PublicLink.data_criacao.desc()).limit(1)),
+        ("event", "lembretes dos próximos 3 dias",
+         Evento.query.filter(Evento.data_inicio >= agora, Evento.data_inicio <= agora + timedelta(days=3))),
+        ("logs", "listagem paginada",
+         Log.query.order_by(Log.datahora.desc()).limit(20)),
+        ("logs", "logs de um usuário",
+         Log.query.filter(Log.usuario == "admin").order_by(Log.datahora.desc()).limit(20)),
+        ("logs", "remoção de logs antigos (sem partições)",
+         db.session.query(Log.id).filter(Log.datahora < agora - timedelta(days=30)).limit(5000)),
+    ]
+
+
+def _explain(statement):
+    """Executa o EXPLAIN do dialeto atual e devolve (linhas do plano, varreduras completas)."""
+    conn = db.session.connection()
+    dialeto = conn.dialect.name
+    compilado = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+
+    if compilado.positional:
+        parametros = tuple(compilado.params[nome] for nome in compilado.positiontup)
+    else:
+        parametros = compilado.params
+
+    if dialeto == "sqlite":
+        linhas = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compilado), parametros).fetchall()
+        plano = [linha[-1] for linha in linhas]
+        completas = [p for p in plano if p.startswith("SCAN ") and " USING " not in p]
+    elif dialeto in ("mysql", "mariadb"):
+        resultado = conn.exec_driver_sql("EXPLAIN " + str(compilado), parametros)
+        linhas = [dict(zip(resultado.keys(), linha)) for linha in resultado.fetchall()]
+        plano = [f"{l.get('table')}: type={l.get('type')} key={l.get('key')} rows={l.get('rows')}"
+                 for l in linhas]
+        completas = [f"{l.get('table')} (type=ALL)" for l in linhas if l.get("type") == "ALL"]
+    elif dialeto == "postgresql":
+        plano = [l[0] for l in conn.exec_driver_sql("EXPLAIN " + str(compilado), parametros).fetchall()]
+        completas = [p.strip() for p in plano if "Seq Scan" in p]
+    else:
+        raise RuntimeError(f"Dialeto não suportado pelo consultor de índices: {dialeto}")
+
+    return plano, completas
+
+
+def analisar_indices():
+    """Retorna [(blueprint, descrição, plano, varreduras_completas), ...]."""
+    relatorio = []
+    for blueprint, descricao, query in consultas_canonicas():
+        plano, completas = _explain(query.statement)
+        relatorio.append((blueprint, descricao, plano, completas))
+    db.session.rollback()
+    return relatorio
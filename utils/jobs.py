@@ -0,0 +1,387 @@
+import os
+import json
+import time
+import random
+import atexit
+import shutil
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+# -----------------------------
+# ⏳ Fila de tarefas em segundo plano
+# -----------------------------
+# As tarefas ficam na tabela "jobs" do próprio banco do sistema, então
+# sobrevivem a reinícios e podem ser executadas por qualquer processo:
+# - `flask jobs worker` (recomendado: um serviço systemd dedicado);
+# - ou, com JOBS_WORKER_EMBUTIDO=True, por uma thread dentro do próprio
+#   processo web, iniciada no primeiro enfileiramento.
+#
+# A reserva é um UPDATE condicional (situacao='pendente' → 'executando'):
+# só um worker consegue pegar cada tarefa, em qualquer banco. Falhas são
+# reagendadas com espera exponencial até max_tentativas. Enquanto executa,
+# o worker atualiza atualizado_em (a cada progresso e por um temporizador);
+# tarefas sem batimento há mais de JOBS_TIMEOUT (worker morto) voltam para
+# a fila. Toda gravação do worker exige que ele ainda seja o dono da
+# reserva: se a tarefa foi devolvida e outro a pegou, o antigo para no
+# próximo progresso e não sobrescreve nada.
+#
+# Uma tarefa é uma função registrada com @fila_jobs.tarefa("nome") que recebe
+# um ContextoJob e os parâmetros enfileirados (JSON).
+
+
+class ContextoJob:
+    """O que a função da tarefa recebe para informar andamento e gravar o resultado."""
+
+    def __init__(self, fila, job_id, usuario, pasta, worker=None):
+        self._fila = fila
+        self.job_id = job_id
+        self.usuario = usuario
+        self.pasta = pasta
+        self.worker = worker
+        self.perdida = False   # a reserva passou para outro worker
+
+    def progresso(self, percentual, mensagem=None):
+        if self.perdida or not self._fila._atualizar(
+                self.job_id, dono=self.worker, progresso=max(0, min(100, int(percentual))), mensagem=mensagem):
+            self.perdida = True
+            raise TarefaPerdida(f"A tarefa {self.job_id} foi reservada por outro worker.")
+
+    def arquivo(self, nome):
+        """Caminho para gravar um arquivo de resultado dentro da pasta do job."""
+        os.makedirs(self.pasta, exist_ok=True)
+        return os.path.join(self.pasta, nome)
+
+
+class FalhaDefinitiva(Exception):
+    """Erro que não adianta tentar de novo (ex.: configuração inválida)."""
+
+
+class TarefaPerdida(Exception):
+    """A tarefa foi dada como abandonada e reservada por outro worker: este deve parar."""
+
+
+class FilaJobs:
+    """
+    Configuração:
+    - JOBS_THREADS: tarefas simultâneas por worker
+    - JOBS_TENTATIVAS: tentativas por tarefa (padrão de cada tarefa)
+    - JOBS_BACKOFF: espera base, em segundos, antes de tentar de novo (dobra a cada falha)
+    - JOBS_TIMEOUT: segundos sem batimento até uma tarefa "executando" ser considerada abandonada
+    - JOBS_INTERVALO: segundos entre consultas à fila quando ela está vazia
+    - JOBS_DIR: pasta dos arquivos de resultado (padrão: instance/jobs)
+    - JOBS_RETENCAO_DIAS: tarefas finalizadas (e arquivos) são apagadas depois disso
+    - JOBS_WORKER_EMBUTIDO: executa a fila numa thread do processo web
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self.threads = 2
+        self.tentativas = 3
+        self.backoff = 30
+        self.timeout = 1800
+        self.intervalo = 2.0
+        self.pasta = None
+        self.retencao_dias = 7
+        self.embutido = False
+
+        self._tarefas = {}
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._acordar = threading.Event()
+        self._threads = []
+        self._pid = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.threads = int(app.config.get("JOBS_THREADS", 2))
+        self.tentativas = int(app.config.get("JOBS_TENTATIVAS", 3))
+        self.backoff = float(app.config.get("JOBS_BACKOFF", 30))
+        self.timeout = int(app.config.get("JOBS_TIMEOUT", 1800))
+        self.intervalo = float(app.config.get("JOBS_INTERVALO", 2.0))
+        self.pasta = app.config.get("JOBS_DIR") or os.path.join(app.instance_path, "jobs")
+        self.retencao_dias = int(app.config.get("JOBS_RETENCAO_DIAS", 7))
+        self.embutido = app.config.get("JOBS_WORKER_EMBUTIDO", False)
+        app.extensions["fila_jobs"] = self
+        atexit.register(self.parar)
+
+    # -----------------------------
+    # 📌 Registro de tarefas
+    # -----------------------------
+    def tarefa(self, nome, descricao=None, max_tentativas=None):
+        def decorador(funcao):
+            self._tarefas[nome] = (funcao, max_tentativas, descricao or nome)
+            return funcao
+        return decorador
+
+    def descricao(self, tipo):
+        return self._tarefas[tipo][2] if tipo in self._tarefas else tipo
+
+    # -----------------------------
+    # ➕ Enfileirar
+    # -----------------------------
+    def enfileirar(self, tipo, usuario=None, usuario_id=None, atraso=0, **parametros):
+        """Grava a tarefa na fila e devolve o Job (já commitado)."""
+        from app.extensions import db
+        from app.models import Job
+
+        if tipo not in self._tarefas:
+            raise ValueError(f"Tarefa desconhecida: {tipo}")
+        _, max_tentativas, _ = self._tarefas[tipo]
+
+        job = Job(
+            tipo=tipo,
+            usuario=usuario,
+            usuario_id=usuario_id,
+            parametros=json.dumps(parametros, default=str),
+            max_tentativas=max_tentativas or self.tentativas,
+            executar_em=datetime.utcnow() + timedelta(seconds=atraso),
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        if self.embutido:
+            self.iniciar_embutido()
+        self._acordar.set()
+        return job
+
+    # -----------------------------
+    # 🔒 Reserva e execução
+    # -----------------------------
+    def _reservar(self, conn, worker):
+        from app.models import Job
+
+        jobs = Job.__table__
+        agora = datetime.utcnow()
+        candidatos = conn.execute(
+            select(jobs.c.id)
+            .where(jobs.c.situacao == Job.PENDENTE, jobs.c.executar_em <= agora)
+            .order_by(jobs.c.executar_em, jobs.c.id)
+            .limit(5)
+        ).scalars().all()
+
+        for job_id in candidatos:
+            reservado = conn.execute(
+                update(jobs)
+                .where(jobs.c.id == job_id, jobs.c.situacao == Job.PENDENTE)
+                .values(situacao=Job.EXECUTANDO, worker=worker, iniciado_em=agora, atualizado_em=agora,
+                        tentativas=jobs.c.tentativas + 1, erro=None)
+            ).rowcount
+            if reservado:
+                return job_id
+        return None
+
+    def executar_proximo(self, worker=None):
+        """Reserva e executa uma tarefa. Devolve o id executado ou None se a fila estiver vazia."""
+        from app.extensions import db
+
+        worker = worker or _nome_worker()
+        with self._app.app_context():
+            with db.engine.begin() as conn:
+                job_id = self._reservar(conn, worker)
+            if job_id is None:
+                return None
+            self._executar(job_id, worker)
+            return job_id
+
+    def _executar(self, job_id, worker):
+        from app.extensions import db
+        from app.models import Job
+
+        job = db.session.get(Job, job_id)
+        funcao = self._tarefas[job.tipo][0] if job.tipo in self._tarefas else None
+        contexto = ContextoJob(self, job.id, job.usuario, os.path.join(self.pasta, str(job.id)), worker)
+        parametros = job.params
+        db.session.remove()
+
+        terminou = threading.Event()
+        batimento = threading.Thread(target=self._bater, args=(contexto, terminou),
+                                     name=f"jobs-batimento-{job_id}", daemon=True)
+        batimento.start()
+        try:
+            if funcao is None:
+                raise FalhaDefinitiva(f"Tarefa desconhecida: {job.tipo}")
+            resultado = funcao(contexto, **parametros) or {}
+        except TarefaPerdida as e:
+            db.session.rollback()
+            print(f"Tarefa {job_id} interrompida: {e}")
+            return
+        except Exception as e:
+            db.session.rollback()
+            self._registrar_falha(job_id, e, worker)
+            return
+        finally:
+            terminou.set()
+            batimento.join()
+            db.session.remove()
+
+        self._atualizar(
+            job_id,
+            dono=worker,
+            situacao=Job.CONCLUIDO,
+            progresso=100,
+            concluido_em=datetime.utcnow(),
+            mensagem=resultado.get("mensagem"),
+            resultado_arquivo=resultado.get("arquivo"),
+            resultado_nome=resultado.get("nome"),
+        )
+
+    def _bater(self, contexto, terminou):
+        """Thread de batimento: mantém atualizado_em em dia durante tarefas longas sem progresso."""
+        intervalo = max(1.0, min(60.0, self.timeout / 4))
+        with self._app.app_context():
+            while not terminou.wait(intervalo):
+                try:
+                    if not self._atualizar(contexto.job_id, dono=contexto.worker):
+                        contexto.perdida = True   # a tarefa para no próximo progresso
+                        return
+                except Exception as e:   # banco indisponível: tenta no próximo intervalo
+                    print(f"Erro no batimento da tarefa {contexto.job_id}: {e}")
+
+    def _registrar_falha(self, job_id, erro, worker=None):
+        from app.extensions import db
+        from app.models import Job
+
+        job = db.session.get(Job, job_id)
+        definitiva = isinstance(erro, FalhaDefinitiva) or job.tentativas >= job.max_tentativas
+        valores = {"erro": f"{erro}\n\n{traceback.format_exc(limit=5)}", "worker": None}
+        if definitiva:
+            valores.update(situacao=Job.FALHOU, concluido_em=datetime.utcnow())
+        else:
+            # espera exponencial com um pouco de ruído para não sincronizar as novas tentativas
+            espera = self.backoff * (2 ** (job.tentativas - 1))
+            espera += random.uniform(0, espera / 4)
+            valores.update(situacao=Job.PENDENTE, executar_em=datetime.utcnow() + timedelta(seconds=espera))
+        db.session.remove()
+        self._atualizar(job_id, dono=worker, **valores)
+        print(f"Erro na tarefa {job_id}: {erro}")
+
+    def _atualizar(self, job_id, dono=None, **valores):
+        """
+        Grava `valores` no job. Com `dono`, só grava se a tarefa ainda está
+        reservada por ele (e renova o batimento). Devolve se alguma linha mudou.
+        """
+        from app.extensions import db
+        from app.models import Job
+
+        jobs = Job.__table__
+        condicao = [jobs.c.id == job_id]
+        if dono is not None:
+            condicao += [jobs.c.worker == dono, jobs.c.situacao == Job.EXECUTANDO]
+            valores.setdefault("atualizado_em", datetime.utcnow())
+        with db.engine.begin() as conn:
+            return conn.execute(update(jobs).where(*condicao).values(**valores)).rowcount > 0
+
+    def reenfileirar(self, job_id):
+        """Coloca de volta na fila uma tarefa que falhou, com as tentativas zeradas."""
+        from app.models import Job
+
+        self._atualizar(job_id, situacao=Job.PENDENTE, tentativas=0, progresso=0, erro=None,
+                        mensagem=None, concluido_em=None, executar_em=datetime.utcnow())
+        if self.embutido:
+            self.iniciar_embutido()
+        self._acordar.set()
+
+    def recuperar_abandonados(self):
+        """Devolve para a fila as tarefas 'executando' sem batimento há mais de JOBS_TIMEOUT (worker morreu)."""
+        from app.extensions import db
+        from app.models import Job
+
+        jobs = Job.__table__
+        limite = datetime.utcnow() - timedelta(seconds=self.timeout)
+        with self._app.app_context():
+            with db.engine.begin() as conn:
+                return conn.execute(
+                    update(jobs)
+                    .where(jobs.c.situacao == Job.EXECUTANDO,
+                           func.coalesce(jobs.c.atualizado_em, jobs.c.iniciado_em) < limite)
+                    .values(situacao=Job.PENDENTE, worker=None, executar_em=datetime.utcnow(),
+                            erro="Tarefa abandonada (worker interrompido); reenfileirada.")
+                ).rowcount
+
+    # -----------------------------
+    # 🧵 Worker
+    # -----------------------------
+    def _laco(self, indice):
+        worker = f"{_nome_worker()}-t{indice}"
+        ultima_verificacao = 0
+        while not self._parar.is_set():
+            try:
+                if indice == 0 and time.time() - ultima_verificacao > 60:
+                    self.recuperar_abandonados()
+                    ultima_verificacao = time.time()
+                if self.executar_proximo(worker) is not None:
+                    continue
+            except Exception as e:
+                print(f"Erro no worker de tarefas: {e}")
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+
+    def iniciar(self, threads=None):
+        """Inicia as threads do worker neste processo (idempotente por processo)."""
+        with self._trava:
+            if self._pid == os.getpid() and any(t.is_alive() for t in self._threads):
+                return
+            self._pid = os.getpid()
+            self._parar.clear()
+            self._threads = [
+                threading.Thread(target=self._laco, args=(i,), name=f"jobs-{i}", daemon=True)
+                for i in range(threads or self.threads)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def iniciar_embutido(self):
+        if self._pid != os.getpid() or not any(t.is_alive() for t in self._threads):
+            self.iniciar()
+
+    def parar(self, esperar=5):
+        self._parar.set()
+        self._acordar.set()
+        if self._pid == os.getpid():
+            for thread in self._threads:
+                thread.join(timeout=esperar)
+
+    def aguardar(self):
+        """Bloqueia até o worker ser interrompido (Ctrl+C / SIGTERM)."""
+        try:
+            while any(t.is_alive() for t in self._threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.parar(esperar=30)
+
+    # -----------------------------
+    # 🧹 Retenção
+    # -----------------------------
+    def limpar(self, dias=None):
+        """Apaga tarefas finalizadas há mais de `dias` e seus arquivos. Devolve a quantidade."""
+        from app.extensions import db
+        from app.models import Job
+
+        limite = datetime.utcnow() - timedelta(days=self.retencao_dias if dias is None else dias)
+        jobs = Job.__table__
+        with db.engine.begin() as conn:
+            ids = conn.execute(
+                select(jobs.c.id).where(jobs.c.situacao.in_([Job.CONCLUIDO, Job.FALHOU]),
+                                        jobs.c.concluido_em < limite)
+            ).scalars().all()
+            if ids:
+                conn.execute(jobs.delete().where(jobs.c.id.in_(ids)))
+        for job_id in ids:
+            shutil.rmtree(os.path.join(self.pasta, str(job_id)), ignore_errors=True)
+        return len(ids)
+
+    def tipos(self):
+        return sorted(self._tarefas)
+
+
+def _nome_worker():
+    return f"{socket.gethostname()}:{os.getpid()}"
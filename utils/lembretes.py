@@ -0,0 +1,87 @@
+import re
+
+from flask import current_app, url_for
+from itsdangerous import URLSafeSerializer, BadSignature
+from markupsafe import escape
+
+# -----------------------------
+# 📧 Corpo personalizado dos lembretes de eventos
+# -----------------------------
+# O template é carregado e compilado uma única vez por evento. Em seguida é
+# renderizado com marcadores no lugar do nome e do link pessoal, e o HTML é
+# quebrado nesses marcadores: para cada membro só falta escapar os dois
+# valores e juntar os pedaços, sem passar de novo pelo Jinja.
+# Se o template usar o nome de um jeito que os marcadores não cobrem
+# (ex.: {{ nome|upper }}), cai no template.render() por destinatário.
+
+TEMPLATE_LEMBRETE = "email/lembrete_evento.html"
+
+_MARCA_NOME = "\x00nome\x00"
+_MARCA_LINK = "\x00link\x00"
+_MARCAS = re.compile("(\x00nome\x00|\x00link\x00)")
+_SALT = "lembrete-evento"
+
+
+def _assinador():
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt=_SALT)
+
+
+def nome_do_convite(token):
+    """Nome do membro a partir do parâmetro ?para= do link pessoal (None se inválido)."""
+    if not token:
+        return None
+    try:
+        return _assinador().loads(token)
+    except BadSignature:
+        return None
+
+
+class CorpoLembrete:
+    """
+    Monta o HTML do lembrete de um evento para cada destinatário.
+    - url_base: endereço público do sistema (ex.: "https://sigi.igreja.org/")
+    Use como montar_html de enviar_em_lote: corpo(nome) -> str.
+    """
+
+    def __init__(self, evento, url_base):
+        self.template = current_app.jinja_env.get_template(TEMPLATE_LEMBRETE)
+        self.evento = evento
+        self._assinador = _assinador()
+
+        with current_app.test_request_context(base_url=url_base):
+            self.link_evento = url_for("event.evento_publico_token",
+                                       public_token=evento.public_token, _external=True)
+
+        # sem nome (modo bcc ou membro sem nome): mesmo corpo para todos
+        self._generico = self.template.render(evento=evento, nome=None, link=self.link_evento)
+        self._partes = self._compilar()
+
+    def link_pessoal(self, nome):
+        if not nome:
+            return self.link_evento
+        return f"{self.link_evento}?para={self._assinador.dumps(nome)}"
+
+    def _compilar(self):
+        """Quebra o HTML nos marcadores; devolve None se o atalho não for seguro para este template."""
+        partes = _MARCAS.split(self.template.render(evento=self.evento, nome=_MARCA_NOME, link=_MARCA_LINK))
+        if len(partes) < 2:
+            return None
+        # confere o atalho contra uma renderização de verdade
+        amostra = 'Maria "Teste" <&>'
+        if self._juntar(partes, amostra) != self._renderizar(amostra):
+            return None
+        return partes
+
+    def _juntar(self, partes, nome):
+        valores = {_MARCA_NOME: str(escape(nome)), _MARCA_LINK: str(escape(self.link_pessoal(nome)))}
+        return "".join(valores.get(parte, parte) for parte in partes)
+
+    def _renderizar(self, nome):
+        return self.template.render(evento=self.evento, nome=nome, link=self.link_pessoal(nome))
+
+    def __call__(self, nome):
+        if not nome:
+            return self._generico
+        if self._partes is None:
+            return self._renderizar(nome)
+        return self._juntar(self._partes, nome)
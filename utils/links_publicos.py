@@ -0,0 +1,50 @@
+from app.extensions import db, cache
+from app.models import PublicLink
+
+# -----------------------------
+# 🔗 Link público de cadastro de visitantes
+# -----------------------------
+# A listagem de membros só lê o hash em cache (fragmento invalidado a cada
+# commit que altera PublicLink). O link é criado uma única vez — pelo
+# comando `flask links visitante` ou pelo botão do administrador — e
+# trocado com rotacionar_link(), que desativa os anteriores.
+#
+# A invalidação só alcança o processo que fez o commit: os demais workers
+# (e a CLI) dependem da validade. Por isso ela é curta, e a ausência de
+# link não é guardada (um link recém-criado aparece na hora).
+
+TTL_LINK = 10   # segundos que outro processo pode mostrar um link já rotacionado
+
+
+@cache.fragmento("link_visitante", PublicLink, ttl=TTL_LINK)
+def _hash_ativo(tipo):
+    # usa o índice ix_public_links_tipo_ativo_data
+    link = (PublicLink.query
+            .filter_by(tipo=tipo, ativo=True)
+            .order_by(PublicLink.data_criacao.desc())
+            .first())
+    return link.hash if link else None
+
+
+def link_ativo(tipo="visitante"):
+    """Hash do link ativo mais recente do tipo, ou None se ainda não existir."""
+    return _hash_ativo(tipo)
+
+
+def garantir_link(tipo="visitante"):
+    """Cria o link se ainda não houver um ativo. Devolve (hash, criado)."""
+    atual = link_ativo(tipo)
+    if atual:
+        return atual, False
+    return rotacionar_link(tipo), True
+
+
+def rotacionar_link(tipo="visitante"):
+    """Desativa os links ativos do tipo e cria um novo. Devolve o novo hash."""
+    PublicLink.query.filter_by(tipo=tipo, ativo=True).update({"ativo": False}, synchronize_session=False)
+    novo = PublicLink(tipo=tipo, hash=PublicLink.gerar_hash())
+    db.session.add(novo)
+    db.session.commit()
+    # o UPDATE em massa não passa pelo flush; garante a invalidação
+    cache.invalidar("PublicLink")
+    return novo.hash
@@ -1,25 +1,316 @@
-from app.extensions import db
-from app.models.log import Log
-from datetime import datetime, timezone
-from flask import request
+import re
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Index, MetaData, Table, insert, select, text
+
+from app.extensions import auditoria, db
 
 def registrar_log(usuario, tarefa, resultado="sucesso"):
     """
-    Registra um log no banco de dados.
+    Registra um log de auditoria (gravado em lote pela thread de fundo).
     - usuario: e-mail ou identificador do usuário
     - tarefa: ação realizada (ex: login, logout, reset de senha)
     - resultado: 'sucesso', 'erro', 'info', etc.
     """
-    try:
-        log = Log(
-            usuario=usuario,
-            tarefa=tarefa,
-            resultado=resultado,
-            datahora=datetime.now(timezone.utc),
-            ip=request.remote_addr or "desconhecido"
-        )
-        db.session.add(log)
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Erro ao registrar log: {e}")
+    auditoria.registrar(usuario, tarefa, resultado)
+
+
+# -----------------------------
+# 🗂️ Partições mensais da tabela de logs
+# -----------------------------
+# - MySQL/MariaDB: particionamento nativo (RANGE COLUMNS por datahora),
+#   uma partição por mês + "pfuturo" para o que ainda não tem mês criado.
+# - SQLite: uma tabela por mês (logs_AAAAMM) e uma VIEW "logs" unindo todas;
+#   a leitura continua pelo modelo Log e a gravação vai direto para o mês.
+# - Demais bancos: remoção em lotes (DELETE limitado) como alternativa.
+#
+# A retenção apaga meses inteiros: um mês só sai quando todos os seus
+# registros passaram de LOG_RETENCAO_DIAS.
+
+MESES_FUTUROS = 2
+LOTE_REMOCAO = 5000
+TABELA_MENSAL = re.compile(r"^logs_(\d{4})(\d{2})$")
+
+
+def _inicio_mes(valor):
+    return datetime(valor.year, valor.month, 1)
+
+
+def _proximo_mes(inicio):
+    return datetime(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+
+
+def _chave(inicio):
+    return f"{inicio.year:04d}{inicio.month:02d}"
+
+
+def _agora():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _dialeto(conn):
+    return conn.dialect.name
+
+
+# -----------------------------
+# 🪶 SQLite: tabela por mês + VIEW
+# -----------------------------
+def _sqlite_particionado(conn):
+    tipo = conn.execute(
+        text("SELECT type FROM sqlite_master WHERE name = 'logs'")
+    ).scalar()
+    return tipo == "view"
+
+
+def _sqlite_meses(conn):
+    nomes = conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'logs\\_%' ESCAPE '\\'")
+    ).scalars()
+    meses = []
+    for nome in nomes:
+        achado = TABELA_MENSAL.match(nome)
+        if achado:
+            meses.append(datetime(int(achado.group(1)), int(achado.group(2)), 1))
+    return sorted(meses)
+
+
+def _sqlite_tabela(inicio):
+    from app.models.log import Log
+
+    nome = f"logs_{_chave(inicio)}"
+    tabela = Table(nome, MetaData(), *[c._copy() for c in Log.__table__.columns], sqlite_autoincrement=True)
+    Index(f"ix_{nome}_usuario_datahora", tabela.c.usuario, tabela.c.datahora)
+    return tabela
+
+
+def _sqlite_recriar_view(conn, meses):
+    from app.models.log import Log
+
+    colunas = ", ".join(c.name for c in Log.__table__.columns)
+    partes = [f"SELECT {colunas} FROM logs_{_chave(m)}" for m in meses]
+    conn.execute(text("DROP VIEW IF EXISTS logs"))
+    conn.execute(text("CREATE VIEW logs AS " + " UNION ALL ".join(partes)))
+
+
+def _sqlite_criar_mes(conn, inicio):
+    tabela = _sqlite_tabela(inicio)
+    tabela.create(conn, checkfirst=True)
+    return tabela
+
+
+def _sqlite_continuar_ids(conn, tabela):
+    """
+    Faz logs_AAAAMM continuar do maior id já usado em qualquer mês. Chamado
+    na hora de gravar (e não ao criar a tabela): meses criados com antecedência
+    não podem reaproveitar ids que o mês corrente ainda vai gerar, senão a
+    VIEW teria ids repetidos e o ORM fundiria linhas diferentes numa só.
+    """
+    ultimo_id = conn.execute(text(
+        "SELECT max(seq) FROM sqlite_sequence WHERE name LIKE 'logs\\_%' ESCAPE '\\'"
+    )).scalar()
+    if not ultimo_id:
+        return
+    atual = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :nome"),
+                         {"nome": tabela.name}).scalar()
+    if atual is None:
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:nome, :seq)"),
+                     {"nome": tabela.name, "seq": ultimo_id})
+    elif atual < ultimo_id:
+        conn.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = :nome"),
+                     {"nome": tabela.name, "seq": ultimo_id})
+
+
+def _sqlite_garantir_meses(conn, novos):
+    existentes = _sqlite_meses(conn)
+    faltando = [m for m in novos if m not in existentes]
+    if not faltando:
+        return existentes
+    for inicio in faltando:
+        _sqlite_criar_mes(conn, inicio)
+    meses = sorted(existentes + faltando)
+    _sqlite_recriar_view(conn, meses)
+    return meses
+
+
+def _sqlite_particionar(conn):
+    from app.models.log import Log
+
+    agora = _inicio_mes(_agora())
+    if _sqlite_particionado(conn):
+        return _sqlite_garantir_meses(conn, [agora])
+
+    logs = Log.__table__
+    meses = {
+        datetime(int(ano), int(mes), 1)
+        for ano, mes in conn.execute(text(
+            "SELECT DISTINCT strftime('%Y', datahora), strftime('%m', datahora) FROM logs"
+        ))
+        if ano
+    }
+    meses.add(agora)
+
+    for inicio in sorted(meses):
+        tabela = _sqlite_criar_mes(conn, inicio)
+        conn.execute(insert(tabela).from_select(
+            [c.name for c in logs.columns],
+            select(*logs.columns).where(logs.c.datahora >= inicio, logs.c.datahora < _proximo_mes(inicio)),
+        ))
+
+    logs.drop(conn)
+    _sqlite_recriar_view(conn, sorted(meses))
+    return sorted(meses)
+
+
+# -----------------------------
+# 🐬 MySQL/MariaDB: partições nativas
+# -----------------------------
+def _mysql_particoes(conn):
+    linhas = conn.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'logs' AND PARTITION_NAME IS NOT NULL"
+    )).scalars()
+    return list(linhas)
+
+
+def _mysql_definicao(inicio):
+    return f"PARTITION p{_chave(inicio)} VALUES LESS THAN ('{_proximo_mes(inicio):%Y-%m-%d %H:%M:%S}')"
+
+
+def _mysql_particionar(conn, meses_futuros):
+    agora = _inicio_mes(_agora())
+    futuros = [agora]
+    for _ in range(meses_futuros):
+        futuros.append(_proximo_mes(futuros[-1]))
+
+    particoes = _mysql_particoes(conn)
+    if not particoes:
+        menor = conn.execute(text("SELECT MIN(datahora) FROM logs")).scalar()
+        inicio = _inicio_mes(menor) if menor else agora
+        meses = [inicio]
+        while meses[-1] < futuros[-1]:
+            meses.append(_proximo_mes(meses[-1]))
+        definicoes = ", ".join(_mysql_definicao(m) for m in meses)
+        # a coluna de particionamento precisa fazer parte da chave primária
+        conn.execute(text("ALTER TABLE logs DROP PRIMARY KEY, ADD PRIMARY KEY (id, datahora)"))
+        conn.execute(text(
+            f"ALTER TABLE logs PARTITION BY RANGE COLUMNS(datahora) "
+            f"({definicoes}, PARTITION pfuturo VALUES LESS THAN (MAXVALUE))"
+        ))
+        return meses
+
+    existentes = {p for p in particoes if p != "pfuturo"}
+    novos = [m for m in futuros if f"p{_chave(m)}" not in existentes and m > _ultimo_mes_mysql(existentes)]
+    if novos:
+        definicoes = ", ".join(_mysql_definicao(m) for m in novos)
+        conn.execute(text(
+            f"ALTER TABLE logs REORGANIZE PARTITION pfuturo INTO "
+            f"({definicoes}, PARTITION pfuturo VALUES LESS THAN (MAXVALUE))"
+        ))
+    return sorted(_mes_da_particao(p) for p in existentes) + novos
+
+
+def _mes_da_particao(nome):
+    return datetime(int(nome[1:5]), int(nome[5:7]), 1)
+
+
+def _ultimo_mes_mysql(existentes):
+    return max((_mes_da_particao(p) for p in existentes), default=datetime.min)
+
+
+# -----------------------------
+# 🔧 API usada pela CLI, pela rota e pelo registrador
+# -----------------------------
+def particionar_logs(meses_futuros=MESES_FUTUROS):
+    """Converte a tabela de logs para partições mensais (se preciso) e cria os próximos meses."""
+    with db.engine.begin() as conn:
+        dialeto = _dialeto(conn)
+        if dialeto == "sqlite":
+            meses = _sqlite_particionar(conn)
+            futuro = _inicio_mes(_agora())
+            adiante = []
+            for _ in range(meses_futuros):
+                futuro = _proximo_mes(futuro)
+                adiante.append(futuro)
+            return _sqlite_garantir_meses(conn, meses + adiante)
+        if dialeto in ("mysql", "mariadb"):
+            return _mysql_particionar(conn, meses_futuros)
+    return None
+
+
+def inserir_logs(conn, registros):
+    """Grava um lote de logs; no SQLite particionado, cada registro vai para a tabela do seu mês."""
+    from app.models.log import Log
+
+    if _dialeto(conn) == "sqlite" and _sqlite_particionado(conn):
+        por_mes = {}
+        for registro in registros:
+            por_mes.setdefault(_inicio_mes(registro["datahora"]), []).append(registro)
+        _sqlite_garantir_meses(conn, list(por_mes))
+        for inicio, lote in por_mes.items():
+            tabela = _sqlite_tabela(inicio)
+            _sqlite_continuar_ids(conn, tabela)
+            conn.execute(tabela.insert(), lote)
+        return
+    conn.execute(Log.__table__.insert(), registros)
+
+
+def ids_repetidos_logs(limite=20):
+    """Ids que aparecem em mais de um registro de log (deve ser vazio, inclusive entre meses)."""
+    with db.engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT id, count(*) FROM logs GROUP BY id HAVING count(*) > 1 ORDER BY id LIMIT :limite"
+        ), {"limite": limite}).all()
+
+
+def purgar_logs(dias=None):
+    """
+    Remove os logs mais antigos que `dias` (padrão: LOG_RETENCAO_DIAS).
+    Retorna (meses_removidos, linhas_removidas) — com partições, as linhas
+    não são contadas (o mês inteiro é descartado de uma vez).
+    """
+    from flask import current_app
+    from app.models.log import Log
+
+    if dias is None:
+        dias = current_app.config.get("LOG_RETENCAO_DIAS", 30)
+    limite = _agora() - timedelta(days=dias)
+
+    with db.engine.begin() as conn:
+        dialeto = _dialeto(conn)
+
+        if dialeto == "sqlite" and _sqlite_particionado(conn):
+            meses = _sqlite_meses(conn)
+            atual = _inicio_mes(_agora())
+            if atual not in meses:
+                meses.append(atual)
+            # o mês corrente guarda a sequência antes que os meses com os maiores ids sejam apagados
+            _sqlite_continuar_ids(conn, _sqlite_criar_mes(conn, atual))
+            vencidos = [m for m in meses if _proximo_mes(m) <= limite and m != atual]
+            _sqlite_recriar_view(conn, sorted(m for m in meses if m not in vencidos))
+            for inicio in vencidos:
+                conn.execute(text(f"DROP TABLE logs_{_chave(inicio)}"))
+            return [_chave(m) for m in vencidos], None
+
+        if dialeto in ("mysql", "mariadb"):
+            particoes = _mysql_particoes(conn)
+            if particoes:
+                vencidas = [
+                    p for p in particoes
+                    if p != "pfuturo" and _proximo_mes(_mes_da_particao(p)) <= limite
+                ]
+                if vencidas:
+                    conn.execute(text(f"ALTER TABLE logs DROP PARTITION {', '.join(vencidas)}"))
+                return [p[1:] for p in vencidas], None
+
+    # sem partições: DELETE em lotes curtos, cada um na sua transação
+    logs = Log.__table__
+    total = 0
+    while True:
+        with db.engine.begin() as conn:
+            ids = conn.execute(
+                select(logs.c.id).where(logs.c.datahora < limite).limit(LOTE_REMOCAO)
+            ).scalars().all()
+            if not ids:
+                return [], total
+            total += conn.execute(logs.delete().where(logs.c.id.in_(ids))).rowcount
+
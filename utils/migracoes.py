@@ -0,0 +1,32 @@
+import re
+
+from sqlalchemy import inspect
+
+from app.extensions import db
+from utils.logs import TABELA_MENSAL
+from utils.busca import FTS_DOCUMENTOS, FTS_MEMBROS, FULLTEXT_DOCUMENTOS, FULLTEXT_MEMBROS, TABELA_DOCUMENTOS
+
+# -----------------------------
+# 🧬 Filtro do Alembic (flask db migrate)
+# -----------------------------
+# Objetos criados fora dos modelos — tabelas mensais de logs, tabelas FTS do
+# SQLite, a tabela de busca de documentos e os índices FULLTEXT — não podem
+# aparecer no autogenerate, senão a migration gerada tentaria removê-los
+# (ou recriar "logs" sobre a VIEW).
+
+_TABELAS_FTS = re.compile(rf"^({FTS_MEMBROS}|{FTS_DOCUMENTOS})(_\w+)?$")
+_TABELAS_EXTERNAS = {TABELA_DOCUMENTOS}
+_INDICES_EXTERNOS = {FULLTEXT_MEMBROS, FULLTEXT_DOCUMENTOS}
+
+
+def incluir_no_autogenerate(objeto, nome, tipo, refletido, comparado):
+    nome = nome or ""
+    if tipo == "index":
+        return nome not in _INDICES_EXTERNOS
+    if tipo != "table":
+        return True
+    if nome in _TABELAS_EXTERNAS or TABELA_MENSAL.match(nome) or _TABELAS_FTS.match(nome):
+        return False
+    if nome == "logs" and not refletido and comparado is None:
+        return "logs" not in inspect(db.engine).get_view_names()
+    return True
@@ -1,4 +1,5 @@
 from flask import request
+from sqlalchemy import and_, or_
 
 def paginate_query(query, per_page=10):
     """
@@ -8,3 +9,74 @@ def paginate_query(query, per_page=10):
     """
     page = request.args.get("page", 1, type=int)
     return query.paginate(page=page, per_page=per_page)
+
+
+
+class KeysetPagination:
+    """Resultado de `paginate_keyset` (navegação por cursores, sem OFFSET)."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+
+
+def _cursor(item, colunas):
+    valores = (getattr(item, c.key) for c in colunas)
+    return "|".join(v.isoformat() if hasattr(v, "isoformat") else str(v) for v in valores)
+
+
+def _ler_cursor(cursor, colunas):
+    valores = []
+    for texto, coluna in zip(cursor.split("|"), colunas):
+        tipo = coluna.type.python_type
+        valores.append(tipo.fromisoformat(texto) if hasattr(tipo, "fromisoformat") else tipo(texto))
+    if len(valores) != len(colunas):
+        raise ValueError("cursor inválido")
+    return valores
+
+
+def _comparar_tupla(colunas, valores, menor=True):
+    """(c1, c2, ...) < (v1, v2, ...) — ou > — escrito de forma portável."""
+    condicoes = []
+    for i, (coluna, valor) in enumerate(zip(colunas, valores)):
+        iguais = [c == v for c, v in zip(colunas[:i], valores[:i])]
+        condicoes.append(and_(*iguais, coluna < valor if menor else coluna > valor))
+    return or_(*condicoes)
+
+
+def paginate_keyset(query, colunas, per_page=50):
+    """
+    Paginação por chave (keyset) em ordem decrescente de `colunas`.
+    - query: objeto query ainda sem ORDER BY
+    - colunas: colunas que formam uma chave única, ex.: (Financeiro.data, Financeiro.id)
+    Lê os cursores `apos` (próxima página) e `antes` (página anterior) da URL;
+    o custo de cada página é o mesmo, não importa quão longe se navegue.
+    """
+    apos = request.args.get("apos")
+    antes = request.args.get("antes")
+
+    try:
+        if antes:
+            query = query.filter(_comparar_tupla(colunas, _ler_cursor(antes, colunas), menor=False))
+        elif apos:
+            query = query.filter(_comparar_tupla(colunas, _ler_cursor(apos, colunas)))
+    except (TypeError, ValueError):
+        apos = antes = None
+
+    if antes:
+        itens = query.order_by(*(c.asc() for c in colunas)).limit(per_page + 1).all()
+        tem_mais = len(itens) > per_page
+        itens = list(reversed(itens[:per_page]))
+        prev_cursor = _cursor(itens[0], colunas) if tem_mais else None
+        next_cursor = _cursor(itens[-1], colunas) if itens else None
+    else:
+        itens = query.order_by(*(c.desc() for c in colunas)).limit(per_page + 1).all()
+        tem_mais = len(itens) > per_page
+        itens = itens[:per_page]
+        next_cursor = _cursor(itens[-1], colunas) if tem_mais else None
+        prev_cursor = _cursor(itens[0], colunas) if apos and itens else None
+
+    return KeysetPagination(itens, next_cursor=next_cursor, prev_cursor=prev_cursor)
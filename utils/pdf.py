@@ -0,0 +1,276 @@
+import os
+import sys
+import atexit
+import shutil
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as TempoEsgotado
+from concurrent.futures.process import BrokenProcessPool
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# -----------------------------
+# 🖨️ Geração de PDF fora da thread da requisição
+# -----------------------------
+# O HTML continua sendo renderizado pelo Jinja na requisição; só a conversão
+# HTML → PDF (WeasyPrint, a parte cara) vai para um pool de processos.
+# O resultado fica num cache em disco endereçado pelo conteúdo:
+#   <PDF_CACHE_DIR>/<escopo>/<sha256(template + html)>.pdf
+# HTML igual → mesmo arquivo, devolvido na hora. Quando um Member muda, os
+# escopos "membro_<id>" e "membros" são apagados no commit.
+#
+# Este módulo é importado pelos processos do pool: não importe o app aqui.
+
+
+def _renderizar(html, base_url):
+    """Executado dentro do processo do pool."""
+    from weasyprint import HTML
+    return HTML(string=html, base_url=base_url).write_pdf()
+
+
+class ErroPDF(Exception):
+    """O PDF não ficou pronto em PDF_TIMEOUT (o pool foi reiniciado)."""
+
+
+def _e_interpretador_python(caminho):
+    """sys.executable é o Python? (no mod_wsgi é o binário do Apache)"""
+    return bool(caminho) and os.path.basename(caminho).lower().startswith(("python", "pypy"))
+
+
+class RenderizadorPDF:
+    """
+    Configuração:
+    - PDF_PROCESSOS: tamanho do pool (0 = renderiza na própria thread)
+    - PDF_CONTEXTO: "spawn" (padrão), "forkserver" ou "fork"
+    - PDF_PYTHON: interpretador dos processos do pool (necessário no mod_wsgi,
+      onde sys.executable aponta para o Apache; sem ele, o pool é desligado
+      e o PDF é gerado na própria thread)
+    - PDF_TIMEOUT: segundos de espera por PDF
+    - PDF_CACHE_DIR: pasta do cache (padrão: instance/pdf_cache)
+    - PDF_CACHE_MAX_MB: limite do cache; os arquivos mais antigos saem primeiro
+    """
+
+    def __init__(self, app=None):
+        self.processos = 2
+        self.contexto = "spawn"
+        self.python = None
+        self.timeout = 60
+        self.pasta = None
+        self.max_bytes = 200 * 1024 * 1024
+
+        self._pool = None
+        self._pid = None
+        self._trava = threading.Lock()
+        self._gravacoes = 0
+        self.hits = 0
+        self.misses = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.processos = int(app.config.get("PDF_PROCESSOS", 2))
+        self.contexto = app.config.get("PDF_CONTEXTO", "spawn")
+        self.python = app.config.get("PDF_PYTHON")
+        self.timeout = float(app.config.get("PDF_TIMEOUT", 60))
+        self.pasta = app.config.get("PDF_CACHE_DIR") or os.path.join(app.instance_path, "pdf_cache")
+        self.max_bytes = int(app.config.get("PDF_CACHE_MAX_MB", 200)) * 1024 * 1024
+        if (self.processos > 0 and self.contexto != "fork" and not self.python
+                and not _e_interpretador_python(sys.executable)):
+            # spawn/forkserver executariam o Apache no lugar do Python: todo PDF falharia
+            app.logger.warning(
+                "PDF_PYTHON não definido e sys.executable (%s) não é um Python: "
+                "gerando PDFs na própria thread (PDF_PROCESSOS=0).", sys.executable,
+            )
+            self.processos = 0
+        app.extensions["renderizador_pdf"] = self
+        self._registrar_eventos()
+        atexit.register(self.encerrar)
+
+    # -----------------------------
+    # 📄 API de uso
+    # -----------------------------
+    def gerar(self, template, html, escopo="geral", base_url=None):
+        """Devolve os bytes do PDF para o HTML já renderizado de `template`."""
+        chave = hashlib.sha256(f"{template}\0{base_url or ''}\0{html}".encode("utf-8")).hexdigest()
+        caminho = os.path.join(self.pasta, escopo, f"{chave}.pdf")
+
+        try:
+            with open(caminho, "rb") as arquivo:
+                dados = arquivo.read()
+            self._contar("hits")
+            return dados
+        except FileNotFoundError:
+            self._contar("misses")
+
+        dados = self._converter(html, base_url)
+        self._salvar(caminho, dados)
+        return dados
+
+    def converter_varios(self, htmls, base_url=None, ao_concluir=None):
+        """
+        Converte vários HTMLs em paralelo no pool, sem passar pelo cache.
+        Devolve os PDFs na mesma ordem; `ao_concluir(indice)` é chamado a cada parte pronta.
+        """
+        if self.processos <= 0:
+            resultados = []
+            for indice, html in enumerate(htmls):
+                resultados.append(_renderizar(html, base_url))
+                if ao_concluir:
+                    ao_concluir(indice)
+            return resultados
+
+        pool = self._obter_pool()
+        futuros = {pool.submit(_renderizar, html, base_url): indice for indice, html in enumerate(htmls)}
+        resultados = [None] * len(htmls)
+        try:
+            for futuro in as_completed(futuros, timeout=self.timeout * max(1, len(htmls))):
+                indice = futuros[futuro]
+                resultados[indice] = futuro.result()
+                if ao_concluir:
+                    ao_concluir(indice)
+        except TempoEsgotado:
+            self._descartar_pool()
+            raise ErroPDF("As carteirinhas não ficaram prontas a tempo.")
+        except BrokenProcessPool:
+            # refaz, uma a uma, só as partes que ficaram sem resultado
+            with self._trava:
+                self._pool = None
+            for indice, html in enumerate(htmls):
+                if resultados[indice] is None:
+                    resultados[indice] = self._converter(html, base_url)
+                    if ao_concluir:
+                        ao_concluir(indice)
+        return resultados
+
+    def invalidar(self, *escopos):
+        for escopo in escopos:
+            shutil.rmtree(os.path.join(self.pasta, escopo), ignore_errors=True)
+
+    def stats(self):
+        with self._trava:
+            return {
+                "processos": self.processos,
+                "pid": os.getpid(),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def encerrar(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    # -----------------------------
+    # ⚙️ Pool de processos
+    # -----------------------------
+    def _obter_pool(self):
+        with self._trava:
+            if self._pool is None or self._pid != os.getpid():
+                contexto = multiprocessing.get_context(self.contexto)
+                if self.python:
+                    contexto.set_executable(self.python)
+                self._pool = ProcessPoolExecutor(max_workers=self.processos, mp_context=contexto)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _descartar_pool(self):
+        """Mata os processos do pool (um WeasyPrint travado não libera a vaga sozinho); o próximo uso recria."""
+        with self._trava:
+            pool, self._pool = self._pool, None
+        if pool is None or self._pid != os.getpid():
+            return
+        for processo in list((pool._processes or {}).values()):
+            processo.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _esperar(self, futuro):
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TempoEsgotado:
+            self._descartar_pool()
+            raise ErroPDF(f"O PDF não ficou pronto em {self.timeout:.0f} s. Tente novamente.")
+
+    def _converter(self, html, base_url):
+        if self.processos <= 0:
+            return _renderizar(html, base_url)
+        try:
+            return self._esperar(self._obter_pool().submit(_renderizar, html, base_url))
+        except BrokenProcessPool:
+            # um processo morreu (ex.: falta de memória): recria o pool e tenta de novo uma vez
+            with self._trava:
+                self._pool = None
+            return self._esperar(self._obter_pool().submit(_renderizar, html, base_url))
+
+    # -----------------------------
+    # 💾 Cache em disco
+    # -----------------------------
+    def _salvar(self, caminho, dados):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(dados)
+        os.replace(temporario, caminho)   # atômico: leitores nunca veem arquivo pela metade
+
+        with self._trava:
+            self._gravacoes += 1
+            podar = self._gravacoes % 20 == 0
+        if podar:
+            self._podar()
+
+    def _podar(self):
+        arquivos = []
+        for raiz, _, nomes in os.walk(self.pasta):
+            for nome in nomes:
+                caminho = os.path.join(raiz, nome)
+                try:
+                    info = os.stat(caminho)
+                except FileNotFoundError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, caminho))
+
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+
+    def _contar(self, campo):
+        with self._trava:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    # -----------------------------
+    # 🔄 Invalidação quando membros mudam
+    # -----------------------------
+    def _registrar_eventos(self):
+        if event.contains(Session, "after_commit", self._apos_commit):
+            return
+        event.listen(Session, "after_flush", self._apos_flush)
+        event.listen(Session, "after_commit", self._apos_commit)
+        event.listen(Session, "after_rollback", self._apos_rollback)
+
+    def _apos_flush(self, session, flush_context):
+        alterados = session.info.setdefault("pdf_membros_alterados", set())
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if type(obj).__name__ == "Member":
+                alterados.add(obj.id)
+
+    def _apos_commit(self, session):
+        alterados = session.info.pop("pdf_membros_alterados", None)
+        if alterados:
+            self.invalidar("membros", *(f"membro_{i}" for i in alterados if i is not None))
+
+    def _apos_rollback(self, session):
+        session.info.pop("pdf_membros_alterados", None)
+
+
+def escopo_membro(membro_id):
+    return f"membro_{membro_id}"
+
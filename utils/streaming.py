@@ -0,0 +1,72 @@
+import zlib
+import zipfile
+
+# -----------------------------
+# 🌊 Helpers para respostas em streaming
+# -----------------------------
+TAMANHO_BLOCO = 64 * 1024
+
+
+class _SaidaEmBlocos:
+    """
+    Arquivo "somente escrita" que acumula bytes até serem drenados.
+    Não tem tell()/seek(), então o zipfile grava em modo não-pesquisável
+    (cabeçalhos com data descriptor), o que permite gerar o ZIP em streaming.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, dados):
+        self._buffer += dados
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def drenar(self):
+        dados = bytes(self._buffer)
+        self._buffer.clear()
+        return dados
+
+
+def agrupar(chunks, tamanho=TAMANHO_BLOCO):
+    """Junta pedaços pequenos (str ou bytes) em blocos de ~`tamanho` bytes."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        if len(buffer) >= tamanho:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def gzip_stream(chunks, nivel=6):
+    """Comprime um iterável de bytes em formato gzip, bloco a bloco."""
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)   # wbits=31 → cabeçalho gzip
+    for chunk in chunks:
+        dados = compressor.compress(chunk)
+        if dados:
+            yield dados
+    yield compressor.flush()
+
+
+def zip_stream(entradas, compressao=zipfile.ZIP_DEFLATED):
+    """
+    Gera um arquivo ZIP em streaming.
+    - entradas: iterável de (nome_no_zip, iterável_de_bytes)
+    """
+    saida = _SaidaEmBlocos()
+    with zipfile.ZipFile(saida, "w", compression=compressao) as zf:
+        for nome, chunks in entradas:
+            with zf.open(nome, "w", force_zip64=True) as destino:
+                for chunk in chunks:
+                    destino.write(chunk)
+                    dados = saida.drenar()
+                    if dados:
+                        yield dados
+            dados = saida.drenar()
+            if dados:
+                yield dados
+    yield saida.drenar()
@@ -0,0 +1,143 @@
+import smtplib
+from datetime import datetime, date, timedelta
+
+from flask import current_app
+
+from app.extensions import fila_jobs
+from utils.envio_email import enviar_em_lote, resumo_envios
+from utils.jobs import FalhaDefinitiva
+from utils.lembretes import CorpoLembrete
+from utils.logs import registrar_log
+
+# -----------------------------
+# 📋 Tarefas executadas pela fila (utils/jobs.py)
+# -----------------------------
+# Cada função recebe o ContextoJob e os parâmetros enfileirados, e devolve
+# um dict opcional com "mensagem" e, se houver download, "arquivo" e "nome".
+# Este módulo é importado no create_app para registrar as tarefas.
+
+
+# -----------------------------
+# 📧 Lembretes de eventos próximos
+# -----------------------------
+@fila_jobs.tarefa("lembretes_eventos", "Lembretes de eventos", max_tentativas=5)
+def lembretes_eventos(contexto, dias=3, url_base=None):
+    from app.models import Evento, Member, User
+
+    # endereço do sistema para os links: MAIL_URL_BASE, se configurado; senão o
+    # capturado na requisição que enfileirou (vem do cabeçalho Host, não confiável)
+    url_base = current_app.config.get("MAIL_URL_BASE") or url_base or "http://localhost/"
+
+    hoje = datetime.now()
+    limite = hoje + timedelta(days=dias)
+
+    eventos = Evento.query.filter(
+        Evento.data_inicio >= hoje,
+        Evento.data_inicio <= limite
+    ).all()
+    if not eventos:
+        return {"mensagem": "Nenhum evento próximo para enviar lembrete."}
+
+    # ✅ membros com e-mail + administrador
+    destinatarios = [(m.email, m.nome) for m in Member.query.filter(Member.email != None).all()]
+    admin = User.query.filter_by(role="admin").first()
+    if admin and admin.email:
+        destinatarios.append((admin.email, admin.nome))
+
+    for numero, ev in enumerate(eventos):
+        def progresso(feitas, total, numero=numero):
+            contexto.progresso((numero + feitas / total) * 100 / len(eventos), f"Enviando lembrete: {ev.titulo}")
+
+        try:
+            _, recusados = enviar_em_lote(
+                f"Lembrete: {ev.titulo} está chegando!",
+                destinatarios,
+                CorpoLembrete(ev, url_base),
+                referencia=f"evento:{ev.id}",
+                job_id=contexto.job_id,
+                ao_progresso=progresso,
+            )
+        except smtplib.SMTPAuthenticationError as e:
+            raise FalhaDefinitiva(f"Falha de autenticação no SMTP: {e}") from e
+        registrar_log(contexto.usuario or "sistema", f"Enviou lembrete do evento: {ev.titulo}",
+                      "sucesso" if not recusados else "erro")
+
+    # totais considerando também tentativas anteriores desta mesma tarefa
+    resumo = resumo_envios(contexto.job_id)
+    return {"mensagem": f"{len(eventos)} evento(s): {resumo.get('enviado', 0)} destinatário(s) aceitos "
+                        f"pelo servidor, {resumo.get('falhou', 0)} recusado(s)."}
+
+
+# -----------------------------
+# 💾 Backup do banco (dump → compressor → arquivo, em streaming)
+# -----------------------------
+@fila_jobs.tarefa("backup_banco", "Backup do banco", max_tentativas=2)
+def backup_banco(contexto, compressao="deflate"):
+    from app.extensions import db
+    from utils.backup import ErroBackup, salvar_backup
+
+    url = db.engine.url
+    marcos = {"proximo": 0}
+
+    def progresso(total):
+        # o tamanho final não é conhecido; atualiza a cada 5 MB gravados
+        if total >= marcos["proximo"]:
+            marcos["proximo"] = total + 5 * 1024 * 1024
+            contexto.progresso(50, f"Exportando e compactando... {total / 1024 / 1024:.1f} MB")
+
+    try:
+        contexto.progresso(5, f"Exportando o banco ({url.get_backend_name()})...")
+        caminho, nome, tamanho = salvar_backup(url, contexto.pasta, compressao, ao_progresso=progresso)
+    except ErroBackup as e:
+        registrar_log(contexto.usuario or "desconhecido", f"Erro ao gerar backup do banco: {e}", "erro")
+        raise FalhaDefinitiva(str(e)) from e
+    except Exception:
+        registrar_log(contexto.usuario or "desconhecido", "Erro ao gerar backup do banco", "erro")
+        raise
+
+    registrar_log(contexto.usuario or "desconhecido", f"Gerou backup do banco ({nome})", "sucesso")
+    return {"mensagem": f"Backup gerado ({tamanho / 1024 / 1024:.1f} MB).", "arquivo": caminho, "nome": nome}
+
+
+@fila_jobs.tarefa("backup_incremental", "Backup incremental (banco + uploads)", max_tentativas=2)
+def backup_incremental(contexto, compressao="deflate"):
+    from app.extensions import db
+    from utils.backup import ErroBackup
+    from utils.backup_agendado import executar_ciclo
+
+    # mesmo ciclo do agendador: verificação, retenção e histórico incluídos
+    try:
+        registro = executar_ciclo(current_app, db.engine.url, compressao, ao_progresso=contexto.progresso,
+                                  usuario=contexto.usuario or "desconhecido")
+    except ErroBackup as e:
+        raise FalhaDefinitiva(str(e)) from e
+
+    verificacao = ("restauração de teste ok" if registro["verificacao"] == "ok"
+                   else f"verificação falhou: {registro['erro']}")
+    # o snapshot fica no repositório (BACKUP_DIR), não na pasta da tarefa
+    return {"mensagem": f"Snapshot {registro['snapshot']} ({registro['tamanho'] / 1024 / 1024:.1f} MB, "
+                        f"{registro['uploads_bytes_novos'] / 1024 / 1024:.1f} MB de uploads novos); "
+                        f"{verificacao}; {len(registro['removidos'])} snapshot(s) antigo(s) removido(s)."}
+
+
+# -----------------------------
+# 🪪 Carteirinhas em lote (PDF para impressão)
+# -----------------------------
+@fila_jobs.tarefa("carteiras_lote", "Carteirinhas em lote")
+def carteiras_lote(contexto, status=None, funcao=None, validade_ate=None):
+    from utils.carteiras import gerar_pdf_carteiras
+
+    validade = date.fromisoformat(validade_ate) if validade_ate else None
+    nome = f"carteirinhas_{date.today():%Y%m%d}.pdf"
+    destino = contexto.arquivo(nome)
+
+    contexto.progresso(0, "Montando as carteirinhas...")
+    total = gerar_pdf_carteiras(
+        destino, status=status, funcao=funcao, validade_ate=validade,
+        ao_progresso=lambda prontas, partes: contexto.progresso(
+            min(99, prontas * 100 / partes), f"{prontas} de {partes} parte(s) prontas"
+        ),
+    )
+    if not total:
+        return {"mensagem": "Nenhum membro corresponde aos filtros."}
+    return {"mensagem": f"PDF pronto com {total} carteirinha(s).", "arquivo": destino, "nome": nome}
@@ -0,0 +1,119 @@
+import os
+import time
+import threading
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+# -----------------------------
+# 👤 Cache do usuário logado (user_loader do Flask-Login)
+# -----------------------------
+# O Flask-Login chama o user_loader em toda requisição autenticada (inclusive
+# nas chamadas AJAX do dashboard). Aqui guardamos, por processo, uma cópia
+# das colunas do usuário por alguns segundos e a religamos à sessão do
+# SQLAlchemy com merge(load=False) — sem consulta ao banco. O objeto volta
+# "persistente": alterações em current_user continuam sendo gravadas.
+#
+# O hash da senha não fica no cache: se alguém o acessar (troca de senha),
+# o SQLAlchemy busca só essa coluna no banco.
+#
+# As telas de usuários e de perfil chamam invalidar() ao editar, ativar/
+# desativar ou excluir; nos outros processos do servidor a mudança vale
+# quando o item expira (LOGIN_CACHE_TTL segundos).
+
+_FORA_DO_CACHE = {"password_hash"}
+
+
+class CacheUsuarios:
+    """
+    Configuração:
+    - LOGIN_CACHE_TTL: segundos que o usuário fica em cache (0 = desligado)
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 10
+        self._dados = {}    # id -> (colunas, expira)
+        self._lock = threading.Lock()
+        self._contadores = {"hits": 0, "misses": 0, "invalidacoes": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = int(app.config.get("LOGIN_CACHE_TTL", 10))
+        app.extensions["cache_usuarios"] = self
+
+    # 🔹 API de uso
+    def carregar(self, user_id):
+        """Usuário ativo com esse id (ligado à sessão atual) ou None."""
+        from app.extensions import db
+        from app.models import User
+
+        user_id = int(user_id)
+        colunas = self._obter(user_id)
+        if colunas is None:
+            self._contar("misses")
+            usuario = db.session.get(User, user_id)
+            if usuario is None:
+                return None
+            colunas = self._guardar(usuario)
+        else:
+            self._contar("hits")
+            copia = User(**colunas)
+            make_transient_to_detached(copia)
+            usuario = db.session.merge(copia, load=False)
+
+        # usuário desativado perde a sessão na próxima requisição
+        if colunas.get("ativo") is False:
+            return None
+        return usuario
+
+    def invalidar(self, user_id=None):
+        """Remove um usuário do cache (ou todos, sem argumento)."""
+        with self._lock:
+            if user_id is None:
+                self._dados.clear()
+            else:
+                self._dados.pop(int(user_id), None)
+            self._contadores["invalidacoes"] += 1
+
+    def stats(self):
+        with self._lock:
+            contadores = dict(self._contadores)
+            itens = len(self._dados)
+        total = contadores["hits"] + contadores["misses"]
+        return {
+            "pid": os.getpid(),
+            "ttl": self.ttl,
+            "itens": itens,
+            **contadores,
+            "hit_ratio": round(contadores["hits"] / total, 3) if total else None,
+        }
+
+    # 🔹 Internos
+    def _obter(self, user_id):
+        if not self.ttl:
+            return None
+        with self._lock:
+            item = self._dados.get(user_id)
+            if item is None:
+                return None
+            colunas, expira = item
+            if expira < time.monotonic():
+                del self._dados[user_id]
+                return None
+            return colunas
+
+    def _guardar(self, usuario):
+        colunas = {
+            coluna.key: getattr(usuario, coluna.key)
+            for coluna in inspect(type(usuario)).column_attrs
+            if coluna.key not in _FORA_DO_CACHE
+        }
+        if self.ttl:
+            with self._lock:
+                self._dados[usuario.id] = (colunas, time.monotonic() + self.ttl)
+        return colunas
+
+    def _contar(self, campo):
+        with self._lock:
+            self._contadores[campo] += 1